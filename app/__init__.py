@@ -1,41 +1,101 @@
+import click
 from flask import Flask
-from flask_migrate import Migrate
-import os
 from dotenv import load_dotenv
 
-def create_app():
+from app.config import Config, engine_options
+
+def serves_requests():
+    """
+    True when this process will serve requests: under a WSGI server, or
+    `flask run` (in the reloader's child process only when reloading)
+    """
+    ctx = click.get_current_context(silent=True)
+    if ctx is None:
+        return True
+    if ctx.info_name != 'run':
+        return False
+    from flask.cli import get_debug_flag
+    from werkzeug.serving import is_running_from_reloader
+
+    reload = ctx.params.get('reload')
+    if reload is None:
+        reload = get_debug_flag()
+    return not reload or is_running_from_reloader()
+
+def create_app(config=None):
+    """
+    Application factory
+
+    Settings come from the environment (see app/config.py); ``config`` is an
+    optional mapping applied on top, e.g. for tests and benchmarks.
+
+    Kept cheap for cold starts: Flask-Migrate (and Alembic) is only set up
+    for `flask` commands, and Flask-Mail is imported and initialized on the
+    first email (see app/email_service.py). Run
+    benchmarks/bench_cold_start.py to check the start-up budget.
+    """
     # Load environment variables from .env file
     load_dotenv()
     
     app = Flask(__name__)
-    
-    # Basic config
-    app.config['SECRET_KEY'] = 'dev'  # Replace with env variable later
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///budgetbeyond.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-    # Email configuration
-    # For development - using Gmail SMTP (you can change this)
-    app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-    app.config['MAIL_PORT'] = 587
-    app.config['MAIL_USE_TLS'] = True
-    app.config['MAIL_USE_SSL'] = False
-    
-    # Email credentials (you'll need to set these)
-    app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')  # Will be None for testing
-    app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD') 
-    app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER') or 'noreply@budgetbeyond.com'
+    app.config.from_object(Config())
+    if config:
+        app.config.update(config)
+        # Pool options depend on the URI, so size them for an overridden one
+        if 'SQLALCHEMY_DATABASE_URI' in config and 'SQLALCHEMY_ENGINE_OPTIONS' not in config:
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.logger.setLevel(app.config['LOG_LEVEL'])
 
     # Initialize extensions
     from app.models import db
-    from app.email_service import init_mail
+    from app.passwords import init_password_hasher
+    from app.database import configure_engines, log_engine_config
+    from app.sharding import init_sharding
     
+    init_sharding(app)
     db.init_app(app)
-    migrate = Migrate(app, db)
-    init_mail(app)
+    configure_engines(app)
+    log_engine_config(app)
+    init_password_hasher(app)
+
+    # Only `flask` commands (flask db ...) need migrations; the CLI builds the
+    # app inside a click context, while WSGI servers and workers do not
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    # Keeps expense_monthly_rollup in step with expense writes
+    from app import rollups  # noqa: F401
+
+    # FTS5 search tables and triggers, also created by db.create_all
+    from app import search  # noqa: F401
+
+    # Per-user data versions for conditional GETs, fingerprinted static URLs
+    from app.caching import init_caching
+    init_caching(app)
+
+    # Opt-in Server-Timing headers, /metrics and slow request profiles
+    from app.instrumentation import init_instrumentation
+    init_instrumentation(app)
+
+    # gzip/brotli responses and precompressed static files; registered after
+    # instrumentation so its after_request hook runs first
+    from app.compression import init_compression
+    init_compression(app)
+
+    # Deliver outbox mail queued before this start; `flask` commands other
+    # than `flask run` leave it to `flask send-emails`
+    if serves_requests():
+        from app.email_worker import start_worker
+        start_worker(app)
 
     # Import and register routes
-    from app import routes
+    from app import routes, api
     app.register_blueprint(routes.bp)
+    app.register_blueprint(api.bp)
+
+    # Register CLI commands
+    from app.cli import register_commands
+    register_commands(app)
 
     return app
\ No newline at end of file
@@ -0,0 +1,435 @@
+"""
+=======================================================
+Budget Beyond - JSON API Routes
+=======================================================
+JSON endpoints used by dashboard charts, scripts and the mobile client.
+All routes share the session authentication of the HTML pages, but answer
+with a JSON 401 (not signed in) or 403 (email not verified) error instead
+of redirecting.
+
+/api/v1/<kind> (expenses, bills, tasks) is a REST interface with list,
+create, read, patch and delete, plus /api/v1/<kind>/batch, which applies
+an array of create/update/delete operations in a single transaction.
+=======================================================
+"""
+
+from datetime import date
+
+from flask import Blueprint, jsonify, request, session, current_app, url_for
+from flask_wtf.csrf import validate_csrf
+import wtforms
+
+from app.auth import api_login_required, api_email_verification_required
+from app.models import db, Bill, BillReminder
+from app.recurrence import materialize_recurrences
+from app.resources import RESOURCES, ValidationError
+from app.search import search, SEARCH_INDEXES
+from app.forms import EXPENSE_CATEGORIES
+from app.importer import import_expenses, detect_format, open_text, ImportFormatError, IMPORT_FORMATS
+from app.money import Money
+from app.summaries import expense_summary, SUMMARY_GROUPS
+from app.forecast import spending_forecast
+
+# Create Blueprint for JSON API routes
+bp = Blueprint('api', __name__, url_prefix='/api')
+
+
+def error_response(message, status=400):
+    """Return a JSON error body with the given HTTP status"""
+    return jsonify({'error': message}), status
+
+
+def csrf_error():
+    """
+    Reject a cross-site form post to a cookie-authenticated upload
+
+    A browser only sends X-Requested-With from same-origin scripts, so its
+    presence is enough; otherwise the request must carry the Flask-WTF CSRF
+    token (X-CSRFToken header or csrf_token field), as the HTML forms do.
+    Returns an error response, or None if the request may proceed.
+    """
+    if not current_app.config.get('WTF_CSRF_ENABLED', True) or request.headers.get('X-Requested-With'):
+        return None
+    try:
+        validate_csrf(request.headers.get('X-CSRFToken') or request.form.get('csrf_token'))
+    except wtforms.ValidationError as e:
+        return error_response(str(e), 403)
+    return None
+
+
+def parse_date_arg(name):
+    """Parse an optional YYYY-MM-DD query argument; raises ValueError if malformed"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a date in YYYY-MM-DD format")
+
+
+@bp.route('/expenses/summary')
+@api_login_required
+@api_email_verification_required
+def expenses_summary():
+    """
+    Spending totals for the signed-in user
+
+    Query parameters:
+    - group: 'category' (default) or 'month'
+    - from / to: optional inclusive YYYY-MM-DD bounds
+    """
+    group = request.args.get('group', 'category')
+    if group not in SUMMARY_GROUPS:
+        return error_response(f"'group' must be one of: {', '.join(SUMMARY_GROUPS)}")
+
+    try:
+        start = parse_date_arg('from')
+        end = parse_date_arg('to')
+    except ValueError as e:
+        return error_response(str(e))
+
+    rows = expense_summary(session['user_id'], group=group, start=start, end=end)
+    return jsonify({
+        'group': group,
+        'from': start.isoformat() if start else None,
+        'to': end.isoformat() if end else None,
+        'rows': rows,
+        'total': float(Money(sum(row['total_cents'] for row in rows))),
+        'total_cents': sum(row['total_cents'] for row in rows),
+        'count': sum(row['count'] for row in rows),
+    })
+
+
+@bp.route('/expenses/forecast')
+@api_login_required
+@api_email_verification_required
+def expenses_forecast():
+    """
+    Month-end projection, moving averages and unusual expenses for the
+    signed-in user (see app/forecast.py); amounts are in cents
+
+    Each category has its moving average of daily spend over the last
+    FORECAST_WINDOW_DAYS and its value on each of those days (trend_cents).
+    """
+    forecast = spending_forecast(session['user_id'])
+    return jsonify(dict(
+        forecast,
+        as_of=forecast['as_of'].isoformat(),
+        anomalies=[dict(anomaly, date=anomaly['date'].isoformat()) for anomaly in forecast['anomalies']],
+    ))
+
+
+@bp.route('/search')
+@api_login_required
+@api_email_verification_required
+def search_records():
+    """
+    Ranked full-text search over the user's expenses, bills and tasks
+
+    Query parameters:
+    - q: search words (each matches as a prefix)
+    - kind: optional 'expenses', 'bills' or 'tasks'
+    - limit: optional, at most SEARCH_RESULTS_LIMIT
+
+    Snippets are HTML with matched words wrapped in <mark>.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return error_response("'q' is required")
+    kind = request.args.get('kind')
+    if kind is not None and kind not in SEARCH_INDEXES:
+        return error_response(f"'kind' must be one of: {', '.join(SEARCH_INDEXES)}")
+    max_limit = current_app.config['SEARCH_RESULTS_LIMIT']
+    limit = max(1, min(request.args.get('limit', max_limit, type=int), max_limit))
+
+    results = search(session['user_id'], query, kinds=[kind] if kind else None, limit=limit)
+    response = jsonify({
+        'query': query,
+        'results': [
+            {
+                'kind': hit['kind'],
+                'id': hit['id'],
+                'title': hit['title'],
+                'date': hit['date'].isoformat() if hit['date'] else None,
+                'amount': str(hit['amount']) if hit['amount'] is not None else None,
+                'snippet': str(hit['snippet']),
+                'rank': hit['rank'],
+            }
+            for hit in results
+        ],
+    })
+    # Echoes q next to the user's records; never compressed (see app/compression.py)
+    response.cache_control.no_transform = True
+    return response
+
+
+@bp.route('/expenses/import', methods=['POST'])
+@api_login_required
+@api_email_verification_required
+def expenses_import():
+    """
+    Bulk-import expenses from an uploaded bank export
+
+    Multipart form fields (send an X-Requested-With header or the CSRF
+    token, see csrf_error):
+    - file: the CSV or OFX export
+    - format: optional 'csv' or 'ofx' (guessed from the file name otherwise)
+    - default_category: category for rows without one (default 'Other')
+
+    Responds with imported/skipped/error counts, timing and rows_per_second.
+    """
+    error = csrf_error()
+    if error is not None:
+        return error
+
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return error_response("'file' is required")
+
+    file_format = request.form.get('format') or detect_format(upload.filename)
+    if file_format not in IMPORT_FORMATS:
+        return error_response(f"'format' must be one of: {', '.join(IMPORT_FORMATS)}")
+    default_category = request.form.get('default_category', 'Other')
+    if default_category not in EXPENSE_CATEGORIES:
+        return error_response(f"'default_category' must be one of: {', '.join(EXPENSE_CATEGORIES)}")
+
+    try:
+        result = import_expenses(
+            session['user_id'], open_text(upload.stream),
+            file_format=file_format, default_category=default_category
+        )
+    except ImportFormatError as e:
+        return error_response(str(e))
+    return jsonify(result.to_dict())
+
+
+# ==========================================================================
+# REST API v1
+# ==========================================================================
+
+BATCH_OPERATIONS = ('create', 'update', 'delete')
+
+
+def get_resource(kind):
+    """The Resource for a URL segment, or None"""
+    return RESOURCES.get(kind)
+
+
+def validation_response(error, status=400):
+    return jsonify({'error': 'Invalid data', 'fields': error.errors}), status
+
+
+def delete_records(resource, records):
+    """Delete records in the session; bills also lose their reminder records"""
+    if resource.model is Bill and records:
+        # SQLite does not enforce the ON DELETE CASCADE, and bill ids can be reused
+        BillReminder.query.filter(
+            BillReminder.bill_id.in_([record.id for record in records])
+        ).delete(synchronize_session=False)
+    for record in records:
+        db.session.delete(record)
+
+
+@bp.route('/v1/<kind>', methods=['GET'])
+@api_login_required
+@api_email_verification_required
+def list_records(kind):
+    """
+    One keyset page of the user's records
+
+    Same ordering and ``after``/``before``/``per_page`` parameters as the HTML
+    lists; follow ``next_cursor`` to page through everything.
+    """
+    from app.routes import list_page, bills_horizon
+
+    resource = get_resource(kind)
+    if resource is None:
+        return error_response('Not found', 404)
+
+    user_id = session['user_id']
+    if resource.model is Bill and materialize_recurrences(bills_horizon(), user_id=user_id):
+        db.session.commit()
+
+    page = list_page(resource.model, user_id)
+    return jsonify({
+        'items': [resource.serialize(record) for record in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    })
+
+
+@bp.route('/v1/<kind>', methods=['POST'])
+@api_login_required
+@api_email_verification_required
+def create_record(kind):
+    """Create one record from a JSON object; responds 201 with the record"""
+    resource = get_resource(kind)
+    if resource is None:
+        return error_response('Not found', 404)
+
+    try:
+        values = resource.validate(request.get_json(silent=True))
+    except ValidationError as e:
+        return validation_response(e)
+
+    record = resource.model(user_id=session['user_id'], **values)
+    db.session.add(record)
+    db.session.flush()
+    # Serialize before committing so the response needs no reload query
+    body = resource.serialize(record)
+    db.session.commit()
+
+    response = jsonify(body)
+    response.status_code = 201
+    response.headers['Location'] = url_for('api.get_record', kind=kind, record_id=body['id'])
+    return response
+
+
+def find_record(resource, record_id):
+    """The signed-in user's record with this id, or None"""
+    return resource.model.query.filter_by(id=record_id, user_id=session['user_id']).first()
+
+
+@bp.route('/v1/<kind>/<int:record_id>', methods=['GET'])
+@api_login_required
+@api_email_verification_required
+def get_record(kind, record_id):
+    resource = get_resource(kind)
+    record = find_record(resource, record_id) if resource else None
+    if record is None:
+        return error_response('Not found', 404)
+    return jsonify(resource.serialize(record))
+
+
+@bp.route('/v1/<kind>/<int:record_id>', methods=['PATCH'])
+@api_login_required
+@api_email_verification_required
+def update_record(kind, record_id):
+    """Change the given fields of one record"""
+    resource = get_resource(kind)
+    record = find_record(resource, record_id) if resource else None
+    if record is None:
+        return error_response('Not found', 404)
+
+    try:
+        values = resource.validate(request.get_json(silent=True), partial=True)
+    except ValidationError as e:
+        return validation_response(e)
+
+    for attribute, value in values.items():
+        setattr(record, attribute, value)
+    db.session.flush()
+    body = resource.serialize(record)
+    db.session.commit()
+    return jsonify(body)
+
+
+@bp.route('/v1/<kind>/<int:record_id>', methods=['DELETE'])
+@api_login_required
+@api_email_verification_required
+def delete_record(kind, record_id):
+    resource = get_resource(kind)
+    record = find_record(resource, record_id) if resource else None
+    if record is None:
+        return error_response('Not found', 404)
+
+    delete_records(resource, [record])
+    db.session.commit()
+    return '', 204
+
+
+@bp.route('/v1/<kind>/batch', methods=['POST'])
+@api_login_required
+@api_email_verification_required
+def batch_records(kind):
+    """
+    Apply many operations in one transaction
+
+    Body: ``{"operations": [{"op": "create", "data": {...}},
+    {"op": "update", "id": 5, "data": {...}}, {"op": "delete", "id": 7}]}``
+
+    Every operation is validated before anything is written, and the target
+    records are loaded with a single query. If any operation is invalid,
+    nothing is applied and the response lists the errors by index.
+    Otherwise all operations are committed together and ``results`` holds
+    one entry per operation.
+    """
+    resource = get_resource(kind)
+    if resource is None:
+        return error_response('Not found', 404)
+
+    body = request.get_json(silent=True)
+    operations = body.get('operations') if isinstance(body, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return error_response("'operations' must be a non-empty array")
+    limit = current_app.config['API_BATCH_MAX_OPERATIONS']
+    if len(operations) > limit:
+        return error_response(f'A batch may contain at most {limit} operations', 413)
+
+    # Load every record the batch refers to in one query
+    ids = {
+        operation.get('id') for operation in operations
+        if isinstance(operation, dict) and type(operation.get('id')) is int
+    }
+    records = {}
+    if ids:
+        records = {
+            record.id: record for record in
+            resource.model.query.filter(resource.model.user_id == session['user_id'], resource.model.id.in_(ids))
+        }
+
+    # Validate everything up front
+    plan = []
+    errors = []
+    deleted = set()
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        if op not in BATCH_OPERATIONS:
+            errors.append({'index': index, 'error': f"'op' must be one of: {', '.join(BATCH_OPERATIONS)}"})
+            continue
+
+        record = None
+        if op != 'create':
+            record_id = operation.get('id')
+            record = records.get(record_id) if type(record_id) is int else None
+            if record is None or record.id in deleted:
+                errors.append({'index': index, 'error': 'Not found'})
+                continue
+            if op == 'delete':
+                deleted.add(record.id)
+
+        values = None
+        if op != 'delete':
+            try:
+                values = resource.validate(operation.get('data'), partial=(op == 'update'))
+            except ValidationError as e:
+                errors.append({'index': index, 'error': 'Invalid data', 'fields': e.errors})
+                continue
+        plan.append((op, record, values))
+
+    if errors:
+        return jsonify({'error': 'No operations were applied', 'errors': errors}), 400
+
+    # Apply everything in one transaction
+    touched = []
+    doomed = []
+    for op, record, values in plan:
+        if op == 'create':
+            record = resource.model(user_id=session['user_id'], **values)
+            db.session.add(record)
+        elif op == 'update':
+            for attribute, value in values.items():
+                setattr(record, attribute, value)
+        else:
+            doomed.append(record)
+        touched.append((op, record))
+    delete_records(resource, doomed)
+    db.session.flush()
+
+    results = [
+        {'op': op, 'id': record.id, 'item': resource.serialize(record) if op != 'delete' else None}
+        for op, record in touched
+    ]
+    db.session.commit()
+    return jsonify({'results': results})
@@ -1,5 +1,63 @@
+from collections import OrderedDict
 from functools import wraps
-from flask import request, redirect, url_for, session, make_response, flash
+import threading
+import time
+from flask import request, redirect, url_for, session, make_response, flash, g, current_app, jsonify
+
+# Process-wide LRU cache of user_id -> expires_at for verified users, so the
+# verification check can skip the database on most requests. Only True is
+# cached: verification never reverts, and another worker may verify a user
+# this process last saw unverified.
+_email_verified_cache = OrderedDict()
+_email_verified_lock = threading.Lock()
+
+def get_current_user():
+    """
+    Return the signed-in User, loading it at most once per request.
+
+    The user is cached on flask.g so the decorators and the view share one
+    identity query. Returns None when nobody is signed in.
+    """
+    if 'current_user' not in g:
+        from app.models import db, User
+        user_id = session.get('user_id')
+        g.current_user = db.session.get(User, user_id) if user_id is not None else None
+    return g.current_user
+
+def current_user_email_verified():
+    """
+    Return whether the signed-in user's email is verified, using the short-TTL cache.
+
+    Returns None if nobody is signed in or the user no longer exists.
+    """
+    user_id = session.get('user_id')
+    now = time.monotonic()
+    with _email_verified_lock:
+        expires_at = _email_verified_cache.get(user_id)
+        if expires_at is not None:
+            if expires_at > now:
+                _email_verified_cache.move_to_end(user_id)
+                return True
+            del _email_verified_cache[user_id]
+
+    user = get_current_user()
+    if user is None:
+        return None
+
+    if user.email_verified:
+        ttl = current_app.config['EMAIL_VERIFIED_CACHE_TTL']
+        size = current_app.config['EMAIL_VERIFIED_CACHE_SIZE']
+        with _email_verified_lock:
+            _email_verified_cache[user_id] = now + ttl
+            _email_verified_cache.move_to_end(user_id)
+            while len(_email_verified_cache) > size:
+                _email_verified_cache.popitem(last=False)
+    return user.email_verified
+
+def invalidate_email_verified(user_id):
+    """Drop a user's cached verification status (call after it changes)"""
+    with _email_verified_lock:
+        _email_verified_cache.pop(user_id, None)
 
 def login_required(f):
     """
@@ -34,12 +92,42 @@ def email_verification_required(f):
         if 'user_id' not in session:
             return redirect(url_for('main.signin'))
         
-        # Check if user's email is verified
-        from app.models import User
-        user = User.query.get(session['user_id'])
-        if user and not user.email_verified:
+        # Check if user's email is verified (cached; loads the user at most once)
+        if current_user_email_verified() is False:
             flash('Please verify your email address before accessing this page.', 'warning')
             return redirect(url_for('main.verify_email_notice'))
         
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+def api_login_required(f):
+    """
+    JSON counterpart of @login_required for /api routes.
+    Returns a 401 error body instead of redirecting to the signin page.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+def api_email_verification_required(f):
+    """
+    JSON counterpart of @email_verification_required for /api routes.
+    Returns 401 if nobody is signed in (or the user no longer exists) and
+    403 if the email is not verified, instead of redirecting.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Authentication required'}), 401
+
+        verified = current_user_email_verified()
+        if verified is None:
+            return jsonify({'error': 'Authentication required'}), 401
+        if not verified:
+            return jsonify({'error': 'Email address not verified'}), 403
+
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,242 @@
+"""
+HTTP caching for Budget Beyond.
+
+Conditional list pages
+    Every user has a ``data_version`` counter that is bumped whenever any of
+    their expenses, bills, tasks or recurring bills change. It is a column
+    of ``user``, or with sharding a ``user_data_version`` row in the user's
+    shard, so data writes stay off the central database. A session
+    ``after_flush`` hook does this automatically for ORM writes, in the same
+    transaction; code that writes with Core statements (bulk imports) calls
+    ``bump_data_version`` itself. Views decorated with ``conditional_page``
+    build an ETag from that version and answer ``304 Not Modified`` before
+    running their list queries or rendering anything.
+
+Fingerprinted static files
+    ``url_for('static', ...)`` appends a content hash (``?v=<hash>``), and
+    responses for such URLs are sent with a far-future, immutable
+    Cache-Control header. Editing a file changes its URL, so browsers never
+    need to revalidate static assets.
+"""
+import hashlib
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from functools import wraps
+
+from flask import current_app, request, session, make_response
+from sqlalchemy import event, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import db, User, UserDataVersion, Expense, Bill, BillRecurrence, Task
+from app.sharding import sharding_enabled, shard_for_user, shard_bind
+
+# Models whose rows appear on a user's pages
+TRACKED_MODELS = (Expense, Bill, BillRecurrence, Task)
+
+
+# ==========================================================================
+# PER-USER DATA VERSIONS
+# ==========================================================================
+
+def bump_data_version(session, user_ids):
+    """Increment data_version for the given users in ``session``'s transaction"""
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if not user_ids:
+        return
+    now = datetime.utcnow()
+    if not sharding_enabled():
+        table = User.__table__
+        session.connection().execute(
+            update(table)
+            .where(table.c.id.in_(user_ids))
+            .values(data_version=table.c.data_version + 1, data_updated_at=now)
+        )
+        return
+
+    # Each user's version lives in their own shard, whichever shard is active
+    by_shard = defaultdict(list)
+    for user_id in user_ids:
+        by_shard[shard_for_user(user_id)].append(user_id)
+    table = UserDataVersion.__table__
+    for shard_user_ids in by_shard.values():
+        stmt = sqlite_insert(table).values([
+            {'user_id': user_id, 'data_version': 1, 'data_updated_at': now} for user_id in shard_user_ids
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id'],
+            set_={'data_version': table.c.data_version + 1, 'data_updated_at': stmt.excluded.data_updated_at}
+        )
+        session.connection(bind_arguments=shard_bind(shard_user_ids[0])).execute(stmt)
+
+
+def data_version(user):
+    """(data_version, data_updated_at) of a user"""
+    if not sharding_enabled():
+        return user.data_version, user.data_updated_at
+    table = UserDataVersion.__table__
+    row = db.session.execute(
+        db.select(table.c.data_version, table.c.data_updated_at).where(table.c.user_id == user.id),
+        bind_arguments=shard_bind(user.id)
+    ).first()
+    return (row.data_version, row.data_updated_at) if row else (0, None)
+
+
+def changed_user_ids(session):
+    """Users whose pages are affected by the objects in a flush"""
+    user_ids = set()
+    for obj in session.new | session.deleted:
+        if isinstance(obj, TRACKED_MODELS):
+            user_ids.add(obj.user_id)
+        elif isinstance(obj, User) and obj in session.new:
+            user_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, TRACKED_MODELS + (User,)) and session.is_modified(obj):
+            user_ids.add(obj.id if isinstance(obj, User) else obj.user_id)
+    return user_ids
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_on_flush(session, flush_context):
+    user_ids = changed_user_ids(session)
+    if user_ids:
+        bump_data_version(session, user_ids)
+
+
+# ==========================================================================
+# CONDITIONAL GET FOR LIST PAGES
+# ==========================================================================
+
+def page_validators(user):
+    """
+    (etag, last_modified) for a user's page at the current moment
+
+    Besides the data version, the ETag covers the deploy (templates and
+    static files), the day (recurring bills appear by date) and a window of
+    half the CSRF token lifetime, so a page revived by a 304 never carries a
+    form token that is about to expire.
+    """
+    csrf_window = max(int(current_app.config.get('WTF_CSRF_TIME_LIMIT') or 3600) // 2, 1)
+    window = int(time.time()) // csrf_window
+    version, updated_at = data_version(user)
+    parts = [
+        current_app.extensions['build_id'], request.full_path, user.id,
+        version, date.today().isoformat(), window,
+    ]
+    etag = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+
+    last_modified = max(
+        updated_at or user.created_at or datetime.utcfromtimestamp(0),
+        datetime.utcfromtimestamp(window * csrf_window),
+        datetime.combine(date.today(), datetime.min.time()),
+    )
+    return etag, last_modified.replace(microsecond=0)
+
+
+def conditional_page(view):
+    """
+    Answer GETs with 304 Not Modified when the user's data has not changed
+
+    Place below @login_required. POSTs, and GETs with a flash message
+    waiting to be shown, always run the view.
+    """
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        from app.auth import get_current_user
+
+        if (request.method != 'GET' or not current_app.config['CONDITIONAL_GET_ENABLED']
+                or session.get('_flashes')):
+            return view(*args, **kwargs)
+
+        user = get_current_user()
+        if user is None:
+            return view(*args, **kwargs)
+
+        etag, last_modified = page_validators(user)
+        if request.if_none_match:
+            # Weak comparison: compression turns the ETag into W/"..." (app/compression.py)
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            since = request.if_modified_since
+            not_modified = since is not None and since.replace(tzinfo=None) >= last_modified
+
+        response = current_app.response_class(status=304) if not_modified else make_response(view(*args, **kwargs))
+        if response.status_code in (200, 304):
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # Always revalidate; the page is only ever stored in the user's own browser
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+        return response
+    return decorated_function
+
+
+# ==========================================================================
+# FINGERPRINTED STATIC FILES
+# ==========================================================================
+
+def file_digest(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def static_fingerprint(app, filename):
+    """Content hash of a static file, cached per app (rechecked by mtime in debug)"""
+    path = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.stat(path).st_mtime_ns if app.debug else None
+    except OSError:
+        return None
+    cache = app.extensions['static_fingerprints']
+    cached = cache.get(filename)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        fingerprint = file_digest(path)
+    except OSError:
+        return None
+    cache[filename] = (mtime, fingerprint)
+    return fingerprint
+
+
+def compute_build_id(app):
+    """Fingerprint of the deployed templates and static files, the same in every worker"""
+    digest = hashlib.sha1()
+    for folder in (app.template_folder and os.path.join(app.root_path, app.template_folder), app.static_folder):
+        if not folder:
+            continue
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                digest.update(f'{os.path.relpath(os.path.join(root, name), folder)}:{stat.st_size}:{stat.st_mtime_ns};'.encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def init_caching(app):
+    """Register static URL fingerprinting and long-lived static cache headers"""
+    app.extensions['build_id'] = compute_build_id(app)
+    app.extensions['static_fingerprints'] = {}
+
+    @app.url_defaults
+    def add_static_fingerprint(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            fingerprint = static_fingerprint(app, values['filename'])
+            if fingerprint:
+                values['v'] = fingerprint
+
+    @app.after_request
+    def cache_fingerprinted_static(response):
+        if request.endpoint == 'static' and request.args.get('v') and response.status_code in (200, 304):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = app.config['STATIC_MAX_AGE']
+            response.cache_control.immutable = True
+            response.expires = None
+        return response
@@ -0,0 +1,180 @@
+"""
+Flask CLI commands for Budget Beyond maintenance tasks.
+
+Run with `flask --app run <command>`.
+"""
+import json
+import os
+import time
+
+import click
+from flask import current_app
+
+from app.models import db
+from app.sharding import use_shard, shard_for_user
+
+
+@click.command('send-emails')
+@click.option('--once', is_flag=True, help='Drain the outbox once and exit instead of polling.')
+def send_emails_command(once):
+    """Deliver queued outbox emails from this process"""
+    from app.email_worker import drain_outbox
+
+    app = current_app._get_current_object()
+    interval = app.config['EMAIL_WORKER_POLL_INTERVAL']
+    while True:
+        sent = drain_outbox(app)
+        if sent:
+            click.echo(f'Sent {sent} email(s)')
+        if once:
+            return
+        time.sleep(interval)
+
+
+@click.command('rebuild-rollups')
+@click.option('--check', is_flag=True, help='Only compare the rollups with the expense table; do not rewrite.')
+def rebuild_rollups_command(check):
+    """Backfill expense_monthly_rollup and verify it against the raw expenses"""
+    from app.rollups import rebuild_rollups, find_mismatches
+
+    if not check:
+        rebuild_rollups()
+        click.echo('Rebuilt expense_monthly_rollup')
+
+    mismatches = find_mismatches()
+    for key, expected, actual in mismatches[:20]:
+        click.echo(f'  {key}: expected {expected}, found {actual}')
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} rollup row(s) do not match the expense table')
+    click.echo('Rollups match the expense table')
+
+
+@click.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Recreate the FTS5 search tables and reindex expenses, bills and tasks"""
+    from app.search import rebuild_search_index
+
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('Full-text search tables are only used with SQLite')
+    started = time.perf_counter()
+    counts = rebuild_search_index()
+    for kind, count in counts.items():
+        click.echo(f'  {kind}: {count} row(s)')
+    click.echo(f'Rebuilt the search index in {time.perf_counter() - started:.2f}s')
+
+
+@click.command('split-shards')
+@click.option('--prune', is_flag=True, help='Delete the copied rows from the central database afterwards.')
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Rows per insert.')
+def split_shards_command(prune, batch_size):
+    """Create the shard databases and copy each user's rows into their shard"""
+    from app.sharding import split_database, prune_central, ShardRoutingError
+
+    if not current_app.config['SHARDING_ENABLED']:
+        raise click.ClickException('Sharding is off; set SHARDING_ENABLED=true and SHARD_COUNT first')
+    started = time.perf_counter()
+    try:
+        counts = split_database(batch_size)
+    except ShardRoutingError as e:
+        raise click.ClickException(str(e))
+
+    for table, (copied, total) in counts.items():
+        note = f' ({total - copied} orphaned row(s) left behind)' if copied != total else ''
+        click.echo(f'  {table}: {copied} row(s){note}')
+    click.echo(f"Split into {current_app.config['SHARD_COUNT']} shard(s) in {time.perf_counter() - started:.2f}s")
+    if prune:
+        prune_central()
+        click.echo('Deleted the copied rows from the central database')
+
+
+@click.command('precompress-static')
+def precompress_static_command():
+    """Write .gz (and .br, with brotli installed) copies of compressible static files"""
+    from app.compression import precompress_static
+
+    written = precompress_static(current_app._get_current_object())
+    for path, encoding, original, compressed in written:
+        click.echo(f'  {os.path.relpath(path)} [{encoding}]: {original} -> {compressed} bytes')
+    click.echo(f'Wrote {len(written)} precompressed file(s)')
+
+
+@click.command('import-expenses')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--email', required=True, help='Email of the user the expenses belong to.')
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ofx']), help='File format (default: from extension).')
+@click.option('--default-category', default='Other', show_default=True, help='Category for rows without one.')
+@click.option('--batch-size', type=int, help='Rows per insert batch (default: IMPORT_BATCH_SIZE).')
+def import_expenses_command(path, email, file_format, default_category, batch_size):
+    """Stream a CSV or OFX bank export into a user's expenses"""
+    from app.models import User
+    from app.importer import import_expenses, detect_format, open_text, ImportFormatError
+
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        raise click.ClickException(f'No user with email {email}')
+
+    with open(path, 'rb') as binary, use_shard(shard_for_user(user.id)):
+        try:
+            result = import_expenses(
+                user.id, open_text(binary),
+                file_format=file_format or detect_format(path),
+                default_category=default_category,
+                batch_size=batch_size
+            )
+        except ImportFormatError as e:
+            raise click.ClickException(str(e))
+
+    for error in result.errors:
+        click.echo(f"  row {error['row']}: {error['error']}")
+    click.echo(
+        f'Imported {result.imported}, skipped {result.skipped}, rejected {result.error_count} '
+        f'in {result.seconds:.2f}s ({result.rows_per_second:.0f} rows/sec)'
+    )
+
+
+@click.command('send-bill-reminders')
+@click.option('--days', type=int, help='Remind about bills due within this many days (default: BILL_REMINDER_DAYS).')
+@click.option('--date', 'today', type=click.DateTime(['%Y-%m-%d']), help='Run as if today were this date.')
+def send_bill_reminders_command(days, today):
+    """Queue one digest email per user for their unpaid bills due soon"""
+    from app.reminders import send_bill_reminders
+
+    started = time.perf_counter()
+    users, bills = send_bill_reminders(today=today.date() if today else None, days=days)
+    click.echo(f'Reminded {users} user(s) about {bills} bill(s) in {time.perf_counter() - started:.2f}s')
+
+
+@click.command('score-spending')
+@click.option('--date', 'today', type=click.DateTime(['%Y-%m-%d']), help='Score as if today were this date.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True),
+              help='Write one JSON line per user to this file.')
+@click.option('--batch-size', type=int, help='Users per query (default: FORECAST_BATCH_SIZE).')
+def score_spending_command(today, output, batch_size):
+    """Forecast month-end spending and flag unusual expenses for every user"""
+    from app.forecast import score_all_users
+
+    started = time.perf_counter()
+    users = flagged = 0
+    out = open(output, 'w') if output else None
+    try:
+        for result in score_all_users(today=today.date() if today else None, batch_size=batch_size):
+            users += 1
+            flagged += len(result['anomalies'])
+            if out:
+                out.write(json.dumps(result, default=str) + '\n')
+    finally:
+        if out:
+            out.close()
+    click.echo(f'Scored {users} user(s), {flagged} unusual expense(s) in {time.perf_counter() - started:.2f}s')
+
+
+def register_commands(app):
+    """Attach the maintenance commands to the app's CLI"""
+    app.cli.add_command(send_emails_command)
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(precompress_static_command)
+    app.cli.add_command(split_shards_command)
+    app.cli.add_command(import_expenses_command)
+    app.cli.add_command(send_bill_reminders_command)
+    app.cli.add_command(score_spending_command)
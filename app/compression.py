@@ -0,0 +1,295 @@
+"""
+Response compression for Budget Beyond.
+
+Pages, JSON and CSV responses are compressed after the view runs, using
+the best encoding the client accepts (``Accept-Encoding``): brotli when the
+optional ``brotli`` package is installed, otherwise gzip.
+
+- Bodies smaller than COMPRESSION_MIN_SIZE are sent as they are.
+- Streamed responses (exports) are compressed chunk by chunk, flushing
+  after each one, so downloads still start immediately.
+- Responses that are already encoded, not a text type (images, .gz
+  downloads), partial (206), bodiless (304, HEAD) or marked no-transform are
+  left alone.
+- Pages that could echo attacker-chosen input next to a secret are sent
+  uncompressed, since the compressed size would leak the secret a byte at a
+  time (BREACH): HTML carrying a CSRF token in answer to a request with a
+  query string or a form body, and /search (which echoes ``q`` next to the
+  user's records) via no-transform.
+
+Static files are precompressed once with ``flask precompress-static``,
+which writes ``.br``/``.gz`` files next to the originals. The static view
+serves a fresh variant when the client accepts it, so CSS costs no CPU per
+request; files without a variant fall back to on-the-fly compression.
+
+Bytes sent and saved are reported per endpoint in /metrics when
+instrumentation is on (see app/instrumentation.py).
+"""
+import gzip
+import mimetypes
+import os
+import time
+import zlib
+
+from flask import current_app, g, request, send_from_directory
+from werkzeug.security import safe_join
+
+from app.instrumentation import record, record_compression
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript', 'text/xml',
+    'application/json', 'application/javascript', 'application/x-ndjson', 'application/xml',
+    'image/svg+xml',
+}
+
+# Static file extensions worth precompressing
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.html', '.xml')
+
+# Content-Encoding -> file suffix of the precompressed variant
+VARIANT_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def supported_encodings():
+    """Encodings this process can produce, best first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding(available=None):
+    """The best encoding in ``available`` that the request accepts, or None"""
+    accept = request.accept_encodings
+    best = accept.best_match(available or supported_encodings())
+    return best if best and accept[best] > 0 else None
+
+
+def compress_bytes(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=config['GZIP_LEVEL'], mtime=0)
+
+
+class StreamCompressor:
+    """Incremental gzip or brotli encoder that flushes after every chunk"""
+
+    def __init__(self, encoding, config):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=config['BROTLI_QUALITY'])
+        else:
+            self._compressor = zlib.compressobj(config['GZIP_LEVEL'], zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        if self.encoding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def compress_stream(chunks, compressor, charset, done):
+    """
+    Compress an iterable of response chunks as it is consumed
+
+    ``done(original_bytes, compressed_bytes)`` runs when the stream ends or is
+    closed early.
+    """
+    original = compressed = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            if not chunk:
+                continue
+            original += len(chunk)
+            data = compressor.compress(chunk)
+            if data:
+                compressed += len(data)
+                yield data
+        data = compressor.finish()
+        compressed += len(data)
+        yield data
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        done(original, compressed)
+
+
+def reflects_input_with_csrf_token(response):
+    """True for an HTML page with a CSRF token, rendered for a request that carried input"""
+    if response.mimetype != 'text/html':
+        return False
+    if current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token') not in g:
+        return False
+    return bool(request.query_string) or request.method not in ('GET', 'HEAD')
+
+
+def should_compress(response):
+    if request.method == 'HEAD' or response.status_code != 200:
+        return False
+    if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+    if response.cache_control.no_transform or reflects_input_with_csrf_token(response):
+        return False
+    length = response.content_length
+    return length is None or length >= current_app.config['COMPRESSION_MIN_SIZE']
+
+
+def weaken_etag(response):
+    """A compressed body is a different representation; keep only a weak validator"""
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def compress_response(response):
+    """after_request hook: compress the body if the client and response allow it"""
+    if not should_compress(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    config = current_app.config
+    endpoint = request.endpoint or 'unmatched'
+    app = current_app._get_current_object()
+
+    if response.is_streamed or response.direct_passthrough:
+        def done(original, compressed):
+            record_compression(app, endpoint, encoding, original, compressed)
+
+        response.response = compress_stream(
+            response.response, StreamCompressor(encoding, config), 'utf-8', done
+        )
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+        response.headers.pop('Accept-Ranges', None)
+    else:
+        data = response.get_data()
+        start = time.perf_counter()
+        compressed = compress_bytes(data, encoding, config)
+        record('compress', time.perf_counter() - start)
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+        record_compression(app, endpoint, encoding, len(data), len(compressed))
+
+    response.headers['Content-Encoding'] = encoding
+    weaken_etag(response)
+    return response
+
+
+# ==========================================================================
+# PRECOMPRESSED STATIC FILES
+# ==========================================================================
+
+def static_variants(app, filename):
+    """
+    {encoding: (variant filename, original size, variant size)} for the
+    precompressed files of a static file that are at least as new as it
+
+    Cached per app like static fingerprints (rechecked by mtime in debug), so
+    run ``flask precompress-static`` before starting the app.
+    """
+    path = safe_join(app.static_folder, filename)
+    if path is None:
+        return {}
+    cache = app.extensions['static_variants']
+    cached = cache.get(filename)
+    if cached is not None and not app.debug:
+        return cached[1]
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {}
+    if cached is not None and cached[0] == stat.st_mtime_ns:
+        return cached[1]
+
+    variants = {}
+    for encoding, suffix in VARIANT_SUFFIXES.items():
+        try:
+            variant_stat = os.stat(path + suffix)
+        except OSError:
+            continue
+        if variant_stat.st_mtime_ns >= stat.st_mtime_ns:
+            variants[encoding] = (filename + suffix, stat.st_size, variant_stat.st_size)
+    cache[filename] = (stat.st_mtime_ns, variants)
+    return variants
+
+
+def serve_static(filename):
+    """The static view, answering with a precompressed variant when one fits"""
+    app = current_app._get_current_object()
+    variants = static_variants(app, filename)
+    encoding = negotiate_encoding([encoding for encoding in ('br', 'gzip') if encoding in variants]) if variants else None
+    if encoding is None:
+        response = app.send_static_file(filename)
+        if variants:
+            response.vary.add('Accept-Encoding')
+        return response
+
+    variant, original_size, variant_size = variants[encoding]
+    response = send_from_directory(
+        app.static_folder, variant,
+        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        max_age=app.get_send_file_max_age(filename)
+    )
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    if response.status_code == 200:
+        record_compression(app, 'static', encoding, original_size, variant_size)
+    return response
+
+
+def precompress_static(app, encodings=None, min_size=None):
+    """
+    Write .gz (and .br, if brotli is installed) next to each compressible
+    static file; returns a list of (path, encoding, original, compressed)
+
+    Variants that would not be smaller are skipped, and up-to-date ones are
+    left untouched.
+    """
+    encodings = encodings or supported_encodings()
+    min_size = app.config['COMPRESSION_MIN_SIZE'] if min_size is None else min_size
+    config = dict(app.config, GZIP_LEVEL=9, BROTLI_QUALITY=11)  # build time, so use the best ratio
+    written = []
+    for root, dirs, files in os.walk(app.static_folder):
+        for name in sorted(files):
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            if stat.st_size < min_size:
+                continue
+            data = None
+            for encoding in encodings:
+                target = path + VARIANT_SUFFIXES[encoding]
+                if os.path.exists(target) and os.stat(target).st_mtime_ns >= stat.st_mtime_ns:
+                    continue
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                compressed = compress_bytes(data, encoding, config)
+                if len(compressed) >= len(data):
+                    continue
+                with open(target, 'wb') as f:
+                    f.write(compressed)
+                written.append((path, encoding, len(data), len(compressed)))
+    return written
+
+
+def init_compression(app):
+    """Register response compression and precompressed static serving"""
+    if not app.config['COMPRESSION_ENABLED']:
+        return
+    app.extensions['static_variants'] = {}
+    app.after_request(compress_response)
+    if app.has_static_folder:
+        app.view_functions['static'] = serve_static
@@ -0,0 +1,167 @@
+"""
+Application configuration loaded from the environment.
+
+``create_app`` loads ``.env`` first (python-dotenv), then builds a Config
+from ``os.environ``. Every setting has a development default, so the app
+still runs from a fresh checkout with no environment at all.
+"""
+import os
+
+
+def env_str(name, default=None):
+    return os.environ.get(name, default)
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value not in (None, '') else default
+
+
+def is_sqlite_memory(uri):
+    return uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') in ('sqlite:', 'sqlite:/'))
+
+
+def engine_options(uri):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the database URI
+
+    Pool size, overflow, pre-ping and recycle are sized per process, so a
+    deployment running N gunicorn workers holds at most
+    N * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+    """
+    if is_sqlite_memory(uri):
+        # In-memory SQLite uses a single static connection; pool sizing does not apply
+        return {}
+    return {
+        'pool_size': env_int('DB_POOL_SIZE', 5),
+        'max_overflow': env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': env_float('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': env_bool('DB_POOL_PRE_PING', True),
+    }
+
+
+class Config:
+    """Settings read from the environment; applied with app.config.from_object"""
+
+    def __init__(self):
+        # Basic config
+        self.SECRET_KEY = env_str('SECRET_KEY', 'dev')
+        self.LOG_LEVEL = env_str('LOG_LEVEL', 'INFO')
+
+        # Database
+        self.SQLALCHEMY_DATABASE_URI = env_str('DATABASE_URL', 'sqlite:///budgetbeyond.db')
+        self.SQLALCHEMY_ENGINE_OPTIONS = engine_options(self.SQLALCHEMY_DATABASE_URI)
+        self.SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+        # SQLite connection PRAGMAs (see app/database.py); set a value to '' to skip it
+        self.SQLITE_PRAGMAS_ENABLED = env_bool('SQLITE_PRAGMAS_ENABLED', True)
+        self.SQLITE_JOURNAL_MODE = env_str('SQLITE_JOURNAL_MODE', 'WAL')
+        self.SQLITE_SYNCHRONOUS = env_str('SQLITE_SYNCHRONOUS', 'NORMAL')
+        self.SQLITE_BUSY_TIMEOUT = env_str('SQLITE_BUSY_TIMEOUT', '5000')  # milliseconds
+        self.SQLITE_CACHE_SIZE = env_str('SQLITE_CACHE_SIZE', '-20000')  # negative = KiB
+        self.SQLITE_MMAP_SIZE = env_str('SQLITE_MMAP_SIZE', '268435456')  # bytes
+
+        # Per-user shards for expenses, bills and tasks (see app/sharding.py);
+        # SHARD_DATABASE_URL is formatted with the shard number
+        self.SHARDING_ENABLED = env_bool('SHARDING_ENABLED', False)
+        self.SHARD_COUNT = env_int('SHARD_COUNT', 8)
+        self.SHARD_DATABASE_URL = env_str('SHARD_DATABASE_URL', 'sqlite:///budgetbeyond-shard{shard}.db')
+
+        # Password hashing (see app/passwords.py)
+        self.BCRYPT_ROUNDS = env_int('BCRYPT_ROUNDS', 12)
+        self.PASSWORD_HASH_WORKERS = env_int('PASSWORD_HASH_WORKERS', 2)
+        self.PASSWORD_HASH_MAX_QUEUE = env_int('PASSWORD_HASH_MAX_QUEUE', 8)
+        self.PASSWORD_HASH_POLICY = env_str('PASSWORD_HASH_POLICY', 'wait')  # 'wait' or 'reject'
+        self.PASSWORD_HASH_TIMEOUT = env_float('PASSWORD_HASH_TIMEOUT', 5)
+
+        # Seconds a user's email-verified status may be served from cache
+        self.EMAIL_VERIFIED_CACHE_TTL = env_float('EMAIL_VERIFIED_CACHE_TTL', 30)
+        self.EMAIL_VERIFIED_CACHE_SIZE = env_int('EMAIL_VERIFIED_CACHE_SIZE', 10000)  # users per process
+
+        # History list pagination
+        self.LIST_PAGE_SIZE = env_int('LIST_PAGE_SIZE', 25)
+        self.LIST_MAX_PAGE_SIZE = env_int('LIST_MAX_PAGE_SIZE', 100)
+
+        # HTTP caching (see app/caching.py)
+        self.CONDITIONAL_GET_ENABLED = env_bool('CONDITIONAL_GET_ENABLED', True)
+        self.STATIC_MAX_AGE = env_int('STATIC_MAX_AGE', 31536000)  # one year, for fingerprinted URLs
+
+        # Most results returned by /search and /api/search (see app/search.py)
+        self.SEARCH_RESULTS_LIMIT = env_int('SEARCH_RESULTS_LIMIT', 50)
+
+        # Response compression (see app/compression.py); brotli is used when the package is installed
+        self.COMPRESSION_ENABLED = env_bool('COMPRESSION_ENABLED', True)
+        self.COMPRESSION_MIN_SIZE = env_int('COMPRESSION_MIN_SIZE', 500)  # bytes
+        self.GZIP_LEVEL = env_int('GZIP_LEVEL', 6)
+        self.BROTLI_QUALITY = env_int('BROTLI_QUALITY', 4)
+
+        # Largest operations array accepted by /api/v1/<kind>/batch
+        self.API_BATCH_MAX_OPERATIONS = env_int('API_BATCH_MAX_OPERATIONS', 500)
+
+        # Rows per executemany batch for bulk expense imports (see app/importer.py)
+        self.IMPORT_BATCH_SIZE = env_int('IMPORT_BATCH_SIZE', 500)
+
+        # Rows fetched per round trip when streaming exports (see app/exporter.py)
+        self.EXPORT_YIELD_PER = env_int('EXPORT_YIELD_PER', 1000)
+
+        # Email configuration
+        # For development - using Gmail SMTP (you can change this)
+        self.MAIL_SERVER = env_str('MAIL_SERVER', 'smtp.gmail.com')
+        self.MAIL_PORT = env_int('MAIL_PORT', 587)
+        self.MAIL_USE_TLS = env_bool('MAIL_USE_TLS', True)
+        self.MAIL_USE_SSL = env_bool('MAIL_USE_SSL', False)
+
+        # Email credentials (you'll need to set these)
+        self.MAIL_USERNAME = env_str('MAIL_USERNAME')  # Will be None for testing
+        self.MAIL_PASSWORD = env_str('MAIL_PASSWORD')
+        self.MAIL_DEFAULT_SENDER = env_str('MAIL_DEFAULT_SENDER') or 'noreply@budgetbeyond.com'
+
+        # Outbox delivery (see app/email_worker.py)
+        # Set EMAIL_WORKER_ENABLED=false when running `flask send-emails` as a separate process
+        self.EMAIL_WORKER_ENABLED = env_bool('EMAIL_WORKER_ENABLED', True)
+        self.EMAIL_WORKER_THREADS = env_int('EMAIL_WORKER_THREADS', 2)
+        self.EMAIL_WORKER_POLL_INTERVAL = env_float('EMAIL_WORKER_POLL_INTERVAL', 5)
+        self.EMAIL_WORKER_BATCH_SIZE = env_int('EMAIL_WORKER_BATCH_SIZE', 20)
+        self.EMAIL_MAX_ATTEMPTS = env_int('EMAIL_MAX_ATTEMPTS', 5)
+        self.EMAIL_RETRY_BACKOFF = env_float('EMAIL_RETRY_BACKOFF', 30)
+        self.EMAIL_RETRY_BACKOFF_MAX = env_float('EMAIL_RETRY_BACKOFF_MAX', 3600)
+        self.EMAIL_SEND_LEASE = env_int('EMAIL_SEND_LEASE', 300)
+
+        # Bill reminder digests (see app/reminders.py)
+        self.BILL_REMINDER_DAYS = env_int('BILL_REMINDER_DAYS', 3)
+        self.BILL_REMINDER_BATCH_SIZE = env_int('BILL_REMINDER_BATCH_SIZE', 1000)  # users per commit
+
+        # Days ahead that recurring bill occurrences are generated (see app/recurrence.py)
+        self.BILL_RECURRENCE_HORIZON_DAYS = env_int('BILL_RECURRENCE_HORIZON_DAYS', 60)
+
+        # Spending forecasts and anomaly flags (see app/forecast.py)
+        self.FORECAST_HISTORY_DAYS = env_int('FORECAST_HISTORY_DAYS', 365)
+        self.FORECAST_WINDOW_DAYS = env_int('FORECAST_WINDOW_DAYS', 30)  # moving average window and anomaly lookback
+        self.FORECAST_ANOMALY_Z = env_float('FORECAST_ANOMALY_Z', 3.0)
+        self.FORECAST_MIN_SAMPLES = env_int('FORECAST_MIN_SAMPLES', 5)  # expenses a category needs before flagging
+        self.FORECAST_BATCH_SIZE = env_int('FORECAST_BATCH_SIZE', 1000)  # users per query in `flask score-spending`
+
+        # Request instrumentation: Server-Timing, /metrics, slow request profiles (see app/instrumentation.py)
+        self.INSTRUMENTATION_ENABLED = env_bool('INSTRUMENTATION_ENABLED', False)
+        self.SERVER_TIMING_ENABLED = env_bool('SERVER_TIMING_ENABLED', True)
+        self.METRICS_TOKEN = env_str('METRICS_TOKEN')  # if set, /metrics requires "Authorization: Bearer <token>"
+        self.SLOW_REQUEST_THRESHOLD = env_float('SLOW_REQUEST_THRESHOLD', 1.0)  # seconds
+        self.PROFILE_SAMPLE_RATE = env_float('PROFILE_SAMPLE_RATE', 0.0)  # fraction of requests run under cProfile
+        self.PROFILE_DIR = env_str('PROFILE_DIR')  # defaults to instance/profiles
+
+        # Persistent SMTP connections (see app/mail_transport.py)
+        self.MAIL_POOL_SIZE = env_int('MAIL_POOL_SIZE', 2)
+        self.MAIL_POOL_MAX_IDLE = env_float('MAIL_POOL_MAX_IDLE', 60)
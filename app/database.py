@@ -0,0 +1,82 @@
+"""
+Engine configuration for Budget Beyond.
+
+SQLite's defaults (rollback journal, full fsync on every commit, no busy
+timeout) make concurrent requests fail with ``database is locked`` and make
+readers wait behind writers. ``configure_engines`` registers a connect hook
+that applies the PRAGMAs below to every new SQLite connection:
+
+- journal_mode=WAL      readers no longer block on, or block, the writer
+- synchronous=NORMAL    fsync at checkpoints instead of on every commit
+- busy_timeout          wait for the write lock instead of failing at once
+- cache_size/mmap_size  keep hot pages in memory
+
+Every value can be overridden from the environment (see create_app).
+"""
+from sqlalchemy import event
+
+from app.models import db
+
+# PRAGMA name -> app config key
+SQLITE_PRAGMAS = [
+    ('journal_mode', 'SQLITE_JOURNAL_MODE'),
+    ('synchronous', 'SQLITE_SYNCHRONOUS'),
+    ('busy_timeout', 'SQLITE_BUSY_TIMEOUT'),
+    ('cache_size', 'SQLITE_CACHE_SIZE'),
+    ('mmap_size', 'SQLITE_MMAP_SIZE'),
+]
+
+
+def sqlite_pragmas_from_config(config):
+    """The PRAGMAs to apply, skipping any whose config value is empty"""
+    return [
+        (pragma, config[key])
+        for pragma, key in SQLITE_PRAGMAS
+        if config.get(key) not in (None, '')
+    ]
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    """Run ``PRAGMA name=value`` for each pair on a raw DB-API connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in pragmas:
+            cursor.execute(f'PRAGMA {pragma}={value}')
+    finally:
+        cursor.close()
+
+
+def configure_engines(app):
+    """Attach the PRAGMA connect hook to each of the app's SQLite engines"""
+    if not app.config['SQLITE_PRAGMAS_ENABLED']:
+        return
+
+    pragmas = sqlite_pragmas_from_config(app.config)
+
+    def on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', on_connect)
+
+
+def log_engine_config(app):
+    """Log the effective database URL and connection pool once at startup"""
+    with app.app_context():
+        engine = db.engine
+        options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+        pool = engine.pool
+        details = ', '.join(f'{key}={value}' for key, value in sorted(options.items()))
+        app.logger.info(
+            'Database %s using %s%s',
+            engine.url.render_as_string(hide_password=True),
+            type(pool).__name__,
+            f' ({details})' if details else ''
+        )
+        if app.config['SHARDING_ENABLED']:
+            app.logger.info(
+                'Sharding per-user tables over %d shard(s) at %s',
+                app.config['SHARD_COUNT'], app.config['SHARD_DATABASE_URL']
+            )
@@ -1,19 +1,166 @@
-from flask import current_app, render_template
+import threading
+
+from flask import current_app
 from flask_mail import Mail, Message
 import os
 
+from app.instrumentation import timed
+from app.models import db, OutboxEmail
+
 mail = Mail()
 
+_mail_lock = threading.Lock()
+
 def init_mail(app):
-    """Initialize Flask-Mail with the app"""
-    mail.init_app(app)
+    """
+    Initialize Flask-Mail and its pooled SMTP transport with the app, once
+
+    Called on first use (templates, the SMTP pool) rather than by
+    create_app, so processes that never send email skip Flask-Mail.
+    """
+    from app.mail_transport import init_pool
+
+    if 'mail_pool' in app.extensions:
+        return
+    with _mail_lock:
+        if 'mail_pool' not in app.extensions:
+            mail.init_app(app)
+            init_pool(app)
+
+def queue_outbox(messages):
+    """
+    Add outbox rows for Messages to the session without committing
+
+    For callers that must commit the emails atomically with their own writes
+    (e.g. bill reminder records); they commit and then call notify_worker.
+    """
+    default_sender = current_app.config['MAIL_DEFAULT_SENDER']
+    emails = [
+        OutboxEmail(
+            subject=msg.subject,
+            sender=msg.sender or default_sender,
+            recipients=','.join(msg.recipients),
+            body=msg.body or '',
+            html=msg.html
+        )
+        for msg in messages
+    ]
+    db.session.add_all(emails)
+    return emails
+
+def enqueue_messages(messages):
+    """
+    Queue Messages in the outbox instead of sending them on the request thread.
+
+    All rows are committed in one transaction before returning, so the emails
+    survive a restart; the background worker (app/email_worker.py) delivers
+    them with retries.
+    """
+    from app.email_worker import notify_worker
+
+    try:
+        with timed('email'):
+            emails = queue_outbox(messages)
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    notify_worker(current_app._get_current_object())
+    return emails
+
+def enqueue_message(msg):
+    """Queue a single Message in the outbox"""
+    return enqueue_messages([msg])[0]
+
+# ==========================================================================
+# EMAIL TEMPLATES
+# ==========================================================================
+
+# Each email is a text template plus an optional HTML template under
+# app/templates/email/. HTML templates are autoescaped; text ones are not.
+EMAIL_TEMPLATES = {
+    'verification': ('Please verify your email - Budget Beyond', 'email/verification.txt', 'email/verification.html'),
+    'welcome': ('Welcome to Budget Beyond!', 'email/welcome.txt', 'email/welcome.html'),
+    'password_reset': ('Password Reset - Budget Beyond', 'email/password_reset.txt', None),
+    'bill_reminder': ('Upcoming bills - Budget Beyond', 'email/bill_reminder.txt', 'email/bill_reminder.html'),
+}
+
+class EmailTemplate:
+    """A compiled subject/text/HTML template set for one kind of email"""
+
+    def __init__(self, subject, text_template, html_template=None):
+        self.subject = subject
+        self.text_template = text_template
+        self.html_template = html_template
+
+    def render(self, **context):
+        """Render one email; returns (body, html)"""
+        body = self.text_template.render(context)
+        html = self.html_template.render(context) if self.html_template else None
+        return body, html
+
+    def render_many(self, contexts):
+        """Render one (body, html) pair per context dict in a single pass"""
+        render_text = self.text_template.render
+        render_html = self.html_template.render if self.html_template else None
+        return [
+            (render_text(context), render_html(context) if render_html else None)
+            for context in contexts
+        ]
+
+    def build_messages(self, recipients, sender=None):
+        """
+        Build one Message per recipient
+
+        ``recipients`` is a list of (email_address, context) pairs.
+        """
+        rendered = self.render_many([context for _, context in recipients])
+        return [
+            Message(subject=self.subject, sender=sender, recipients=[address], body=body, html=html)
+            for (address, _), (body, html) in zip(recipients, rendered)
+        ]
+
+def get_email_template(name):
+    """
+    Return the compiled EmailTemplate called ``name``
+
+    Templates are compiled once per app and cached, so repeat sends skip both
+    the Jinja loader and its auto-reload file checks.
+    """
+    cache = current_app.extensions.setdefault('email_templates', {})
+    template = cache.get(name)
+    if template is None:
+        # Messages without a sender read Flask-Mail's default sender
+        init_mail(current_app._get_current_object())
+        subject, text_name, html_name = EMAIL_TEMPLATES[name]
+        env = current_app.jinja_env
+        template = EmailTemplate(
+            subject,
+            env.get_template(text_name),
+            env.get_template(html_name) if html_name else None
+        )
+        cache[name] = template
+    return template
+
+def render_email(name, recipient, **context):
+    """Render a single templated email into a Message ready to queue"""
+    with timed('email'):
+        return get_email_template(name).build_messages([(recipient, context)])[0]
+
+# ==========================================================================
+# TRANSACTIONAL EMAILS
+# ==========================================================================
+
 
 def send_verification_email(user_email, user_name, verification_token):
     """Send email verification email to new users"""
     try:
+        # Create verification URL
+        verification_url = f"http://127.0.0.1:5000/verify-email/{verification_token}"
+
         # For development/testing - print to console
         if current_app.config.get('TESTING') or not current_app.config.get('MAIL_USERNAME'):
-            verification_url = f"http://127.0.0.1:5000/verify-email/{verification_token}"
             print(f"\n[EMAIL] VERIFICATION EMAIL (would be sent to {user_email}):")
             print(f"Subject: Please verify your email - Budget Beyond")
             print(f"To: {user_email}")
@@ -22,75 +169,12 @@ def send_verification_email(user_email, user_name, verification_token):
             print("[EMAIL] Verification email would be sent successfully!\n")
             return True
         
-        # Create verification URL
-        verification_url = f"http://127.0.0.1:5000/verify-email/{verification_token}"
-        
-        msg = Message(
-            subject='Please verify your email - Budget Beyond',
-            sender=current_app.config['MAIL_DEFAULT_SENDER'],
-            recipients=[user_email]
-        )
-        
-        # Email body
-        msg.body = f"""
-Hello {user_name},
-
-Welcome to Budget Beyond!
-
-To complete your registration and secure your account, please verify your email address by clicking the link below:
-
-{verification_url}
-
-This verification link will expire in 1 hour for security reasons.
-
-If you did not create an account with Budget Beyond, please ignore this email.
-
-Best regards,
-The Budget Beyond Team
-
----
-This is an automated message. Please do not reply to this email.
-        """
-        
-        # HTML version
-        msg.html = f"""
-<html>
-<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-        <h2 style="color: #2c3e50;">Welcome to Budget Beyond!</h2>
-        
-        <p>Hello <strong>{user_name}</strong>,</p>
-        
-        <p>Thank you for creating an account with Budget Beyond. To complete your registration and secure your account, please verify your email address.</p>
-        
-        <div style="text-align: center; margin: 30px 0;">
-            <a href="{verification_url}" 
-               style="background-color: #3498db; color: white; padding: 15px 30px; text-decoration: none; border-radius: 5px; display: inline-block; font-weight: bold;">
-                Verify My Email Address
-            </a>
-        </div>
-        
-        <p><strong>Important:</strong> This verification link will expire in 1 hour for security reasons.</p>
-        
-        <p>If the button above doesn't work, you can copy and paste this link into your browser:</p>
-        <p style="word-break: break-all; background-color: #f8f9fa; padding: 10px; border-radius: 3px;">{verification_url}</p>
-        
-        <p>If you did not create an account with Budget Beyond, please ignore this email.</p>
-        
-        <p>Best regards,<br>The Budget Beyond Team</p>
-        
-        <hr style="border: 1px solid #eee; margin: 20px 0;">
-        <p style="font-size: 12px; color: #666;">This is an automated message. Please do not reply to this email.</p>
-    </div>
-</body>
-</html>
-        """
-        
-        mail.send(msg)
+        msg = render_email('verification', user_email, user_name=user_name, verification_url=verification_url)
+        enqueue_message(msg)
         return True
         
     except Exception as e:
-        print(f"Failed to send verification email: {str(e)}")
+        print(f"Failed to queue verification email: {str(e)}")
         return False
 
 def send_welcome_email(user_email, user_name):
@@ -105,109 +189,22 @@ def send_welcome_email(user_email, user_name):
             print("[EMAIL] Welcome email would be sent successfully!\n")
             return True
         
-        msg = Message(
-            subject='Welcome to Budget Beyond!',
-            sender=current_app.config['MAIL_DEFAULT_SENDER'],
-            recipients=[user_email]
-        )
-        
-        # Email body (you can create an HTML template later)
-        msg.body = f"""
-Hello {user_name},
-
-Welcome to Budget Beyond! 🎉
-
-Thank you for creating an account with us. You're now ready to take control of your finances and manage your budget like never before.
-
-Here's what you can do with Budget Beyond:
-• Track your expenses and income
-• Set up bill reminders
-• Create and manage budgets
-• Monitor your financial goals
-
-To get started, simply log in to your account at: http://127.0.0.1:5000/login
-
-If you have any questions or need assistance, feel free to reach out to our support team.
-
-Best regards,
-The Budget Beyond Team
-
----
-This is an automated message. Please do not reply to this email.
-        """
-        
-        # Optional: HTML version
-        msg.html = f"""
-<html>
-<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-        <h2 style="color: #2c3e50;">Welcome to Budget Beyond! 🎉</h2>
-        
-        <p>Hello <strong>{user_name}</strong>,</p>
-        
-        <p>Thank you for creating an account with us. You're now ready to take control of your finances and manage your budget like never before.</p>
-        
-        <h3 style="color: #34495e;">Here's what you can do with Budget Beyond:</h3>
-        <ul>
-            <li>💰 Track your expenses and income</li>
-            <li>📅 Set up bill reminders</li>
-            <li>📊 Create and manage budgets</li>
-            <li>🎯 Monitor your financial goals</li>
-        </ul>
-        
-        <p>
-            <a href="http://127.0.0.1:5000/login" 
-               style="background-color: #3498db; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                Get Started Now
-            </a>
-        </p>
-        
-        <p>If you have any questions or need assistance, feel free to reach out to our support team.</p>
-        
-        <p>Best regards,<br>The Budget Beyond Team</p>
-        
-        <hr style="border: 1px solid #eee; margin: 20px 0;">
-        <p style="font-size: 12px; color: #666;">This is an automated message. Please do not reply to this email.</p>
-    </div>
-</body>
-</html>
-        """
-        
-        mail.send(msg)
+        msg = render_email('welcome', user_email, user_name=user_name, login_url="http://127.0.0.1:5000/login")
+        enqueue_message(msg)
         return True
         
     except Exception as e:
-        print(f"Failed to send email: {str(e)}")
+        print(f"Failed to queue email: {str(e)}")
         return False
 
 def send_password_reset_email(user_email, reset_token):
     """Send password reset email (for future use)"""
     try:
-        msg = Message(
-            subject='Password Reset - Budget Beyond',
-            sender=current_app.config['MAIL_DEFAULT_SENDER'],
-            recipients=[user_email]
-        )
-        
-        msg.body = f"""
-Hello,
-
-You have requested to reset your password for Budget Beyond.
-
-Click the link below to reset your password:
-http://127.0.0.1:5000/reset-password/{reset_token}
-
-This link will expire in 1 hour for security reasons.
-
-If you did not request this password reset, please ignore this email.
-
-Best regards,
-The Budget Beyond Team
-        """
-        
-        mail.send(msg)
+        reset_url = f"http://127.0.0.1:5000/reset-password/{reset_token}"
+        msg = render_email('password_reset', user_email, reset_url=reset_url)
+        enqueue_message(msg)
         return True
         
     except Exception as e:
-        print(f"Failed to send password reset email: {str(e)}")
+        print(f"Failed to queue password reset email: {str(e)}")
         return False
\ No newline at end of file
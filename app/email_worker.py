@@ -0,0 +1,246 @@
+"""
+Background delivery for the email outbox.
+
+Request handlers only insert rows into ``outbox_email`` (see
+``email_service.enqueue_message``). A small pool of worker threads drains the
+outbox, sending each message over SMTP and retrying failures with
+exponential backoff. The outbox lives in the database, so queued mail
+survives restarts; a row that was mid-send when a worker died is picked up
+again once its lease expires, and marked failed instead once it has used
+up EMAIL_MAX_ATTEMPTS.
+
+Each claimed batch goes out over one pooled SMTP connection (see
+app/mail_transport.py). With EMAIL_WORKER_ENABLED the pool starts with the
+app (WSGI servers and ``flask run``) and again in every forked child, so
+mail left over from before a restart goes out without waiting for a new
+enqueue; otherwise run ``flask send-emails`` as a separate process.
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, and_, update
+
+from app.instrumentation import record_email_batch
+from app.models import db, OutboxEmail
+
+
+def claim_batch(limit, lease_seconds, max_attempts):
+    """
+    Claim up to ``limit`` due outbox rows for this worker
+
+    A row is due when it is pending and its next attempt time has passed, or
+    when it is stuck in 'sending' past its lease. Claiming is a conditional
+    UPDATE, so two workers can never claim the same row. Stuck rows that
+    already had ``max_attempts`` attempts (the message keeps killing the
+    worker) are marked failed instead of being claimed again.
+    """
+    now = datetime.utcnow()
+    expired = and_(OutboxEmail.status == 'sending', OutboxEmail.next_attempt_at <= now)
+    db.session.execute(
+        update(OutboxEmail)
+        .where(expired, OutboxEmail.attempts >= max_attempts)
+        .values(status='failed', last_error='Send lease expired on the last attempt')
+    )
+    due = and_(
+        or_(OutboxEmail.status == 'pending', OutboxEmail.status == 'sending'),
+        OutboxEmail.next_attempt_at <= now,
+        OutboxEmail.attempts < max_attempts
+    )
+    candidate_ids = [row.id for row in (
+        db.session.query(OutboxEmail.id)
+        .filter(due)
+        .order_by(OutboxEmail.next_attempt_at, OutboxEmail.id)
+        .limit(limit)
+    )]
+
+    claimed = []
+    for email_id in candidate_ids:
+        result = db.session.execute(
+            update(OutboxEmail)
+            .where(OutboxEmail.id == email_id, due)
+            .values(
+                status='sending',
+                attempts=OutboxEmail.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=lease_seconds)
+            )
+        )
+        if result.rowcount == 1:
+            claimed.append(email_id)
+    db.session.commit()
+
+    if not claimed:
+        return []
+    return OutboxEmail.query.filter(OutboxEmail.id.in_(claimed)).order_by(OutboxEmail.id).all()
+
+
+def build_message(email):
+    """Turn an outbox row into a Flask-Mail Message"""
+    from flask_mail import Message
+
+    return Message(
+        subject=email.subject,
+        sender=email.sender,
+        recipients=email.recipient_list,
+        body=email.body,
+        html=email.html
+    )
+
+
+def retry_delay(attempts, base_seconds, max_seconds):
+    """Exponential backoff with a little jitter: base, 2*base, 4*base, ..."""
+    delay = min(base_seconds * (2 ** max(attempts - 1, 0)), max_seconds)
+    return delay + random.uniform(0, delay * 0.1)
+
+
+def deliver_batch(app, emails, send):
+    """
+    Send claimed emails and record the outcome of each one
+
+    ``send`` is called with a list of Message objects and must return a list
+    of exceptions (or None for success) in the same order.
+    """
+    config = app.config
+    messages = [build_message(email) for email in emails]
+    start = time.perf_counter()
+    results = send(messages)
+    failed = sum(1 for error in results if error is not None)
+    record_email_batch(app, time.perf_counter() - start, len(results) - failed, failed)
+    now = datetime.utcnow()
+
+    sent = 0
+    for email, error in zip(emails, results):
+        if error is None:
+            email.status = 'sent'
+            email.sent_at = now
+            email.last_error = None
+            sent += 1
+        elif email.attempts >= config['EMAIL_MAX_ATTEMPTS']:
+            email.status = 'failed'
+            email.last_error = str(error)
+            print(f"Giving up on email {email.id} after {email.attempts} attempts: {error}")
+        else:
+            delay = retry_delay(email.attempts, config['EMAIL_RETRY_BACKOFF'], config['EMAIL_RETRY_BACKOFF_MAX'])
+            email.status = 'pending'
+            email.next_attempt_at = now + timedelta(seconds=delay)
+            email.last_error = str(error)
+    db.session.commit()
+    return sent
+
+
+def send_pooled(messages):
+    """Send a batch of messages over one pooled SMTP connection"""
+    from app.mail_transport import get_pool
+
+    return get_pool().send_batch(messages)
+
+
+def drain_outbox(app, batch_size=None, send=send_pooled):
+    """Deliver every email that is currently due; returns the number sent"""
+    batch_size = batch_size or app.config['EMAIL_WORKER_BATCH_SIZE']
+    total = 0
+    with app.app_context():
+        while True:
+            emails = claim_batch(batch_size, app.config['EMAIL_SEND_LEASE'], app.config['EMAIL_MAX_ATTEMPTS'])
+            if not emails:
+                return total
+            total += deliver_batch(app, emails, send)
+
+
+class EmailWorkerPool:
+    """A fixed pool of daemon threads that drain the outbox"""
+
+    def __init__(self, app, threads=2, poll_interval=5.0):
+        self.app = app
+        self.pid = os.getpid()
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._workers = []
+
+    def start(self):
+        for i in range(self.threads):
+            worker = threading.Thread(target=self._run, name=f'email-worker-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def notify(self):
+        """Wake the workers up because new mail was queued"""
+        self._wakeup.set()
+
+    def stop(self, timeout=10.0):
+        self._stopping.set()
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                drain_outbox(self.app)
+            except Exception as e:
+                print(f"Email worker error: {str(e)}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+_pool_lock = threading.Lock()
+
+# Apps whose worker pool was started in this process, restarted after a fork
+_started_apps = []
+
+
+def start_worker(app):
+    """
+    Start the app's worker pool unless it is running in this process;
+    returns the pool, or None when EMAIL_WORKER_ENABLED is off
+
+    A pool inherited through fork (gunicorn --preload) has no threads; the
+    child starts a new one right after the fork (see _restart_after_fork).
+    """
+    if not app.config['EMAIL_WORKER_ENABLED']:
+        return None
+
+    pool = app.extensions.get('email_worker')
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            pool = app.extensions.get('email_worker')
+            if pool is None or pool.pid != os.getpid():
+                pool = EmailWorkerPool(
+                    app,
+                    threads=app.config['EMAIL_WORKER_THREADS'],
+                    poll_interval=app.config['EMAIL_WORKER_POLL_INTERVAL']
+                )
+                pool.start()
+                app.extensions['email_worker'] = pool
+                if app not in _started_apps:
+                    _started_apps.append(app)
+    return pool
+
+
+def _restart_after_fork():
+    """Start the worker pools of a forked child, which inherits none of the threads"""
+    global _pool_lock
+    # Another thread may have held the lock at the moment of the fork
+    _pool_lock = threading.Lock()
+    for app in _started_apps:
+        with app.app_context():
+            # Connections opened by the parent must not be shared with it
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+        start_worker(app)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def notify_worker(app):
+    """Start the app's worker pool if needed and wake it up"""
+    pool = start_worker(app)
+    if pool is not None:
+        pool.notify()
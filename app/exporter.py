@@ -0,0 +1,128 @@
+"""
+Streaming export of a user's expenses, bills and tasks.
+
+Rows are read with ``yield_per`` (``stream_results``), so only one fetch
+batch of plain column tuples is in memory at a time; no ORM objects are
+built. They are encoded as CSV or JSON Lines into small chunks and handed to
+a Flask streaming response, optionally through an incremental gzip
+compressor. Memory use is constant however long the history is, and the
+header row goes out before the first query batch is fetched.
+"""
+import csv
+import io
+import json
+import zlib
+
+from app.models import db, Expense, Bill, Task
+from app.money import Money
+from app.pagination import ordering
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+# Bytes of encoded output collected before a chunk is yielded
+CHUNK_SIZE = 64 * 1024
+
+
+def _date(value):
+    return value.isoformat() if value is not None else None
+
+
+def _money(cents):
+    return str(Money(cents))
+
+
+# kind -> (model, [(field name, column, formatter)])
+EXPORTS = {
+    'expenses': (Expense, [
+        ('id', Expense.id, None),
+        ('date', Expense.date, _date),
+        ('category', Expense.category, None),
+        ('amount', Expense.amount_cents, _money),
+        ('notes', Expense.notes, None),
+    ]),
+    'bills': (Bill, [
+        ('id', Bill.id, None),
+        ('name', Bill.name, None),
+        ('due_date', Bill.due_date, _date),
+        ('amount', Bill.amount_cents, _money),
+        ('paid', Bill.paid, None),
+    ]),
+    'tasks': (Task, [
+        ('id', Task.id, None),
+        ('title', Task.title, None),
+        ('due_date', Task.due_date, _date),
+        ('completed', Task.completed, None),
+    ]),
+}
+
+
+def iter_export_rows(kind, user_id, yield_per=1000):
+    """Yield one dict per record, in the same order as the history lists"""
+    model, fields = EXPORTS[kind]
+    statement = (
+        db.select(*[column for _, column, _ in fields])
+        .where(model.user_id == user_id)
+        .order_by(*ordering(model.sort_keys()))
+        .execution_options(yield_per=yield_per)
+    )
+    names = [name for name, _, _ in fields]
+    formatters = [formatter for _, _, formatter in fields]
+    for row in db.session.execute(statement):
+        yield {
+            name: formatter(value) if formatter and value is not None else value
+            for name, formatter, value in zip(names, formatters, row)
+        }
+
+
+def iter_csv(kind, rows):
+    """Encode rows as CSV text chunks, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _, _ in EXPORTS[kind][1]])
+    # Send the header straight away so the download starts immediately
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for row in rows:
+        writer.writerow(row.values())
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_jsonl(kind, rows):
+    """Encode rows as JSON Lines text chunks"""
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row, separators=(',', ':')) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield ''.join(lines)
+
+
+def iter_gzip(chunks, level=6):
+    """Compress a stream of byte chunks on the fly into one gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(kind, file_format, user_id, compress=False, yield_per=1000):
+    """Byte chunks for a complete export file"""
+    rows = iter_export_rows(kind, user_id, yield_per)
+    encode = iter_jsonl if file_format == 'jsonl' else iter_csv
+    chunks = (text.encode('utf-8') for text in encode(kind, rows))
+    return iter_gzip(chunks) if compress else chunks
@@ -0,0 +1,301 @@
+"""
+Spending forecasts and anomaly flags.
+
+A user's expenses from the last FORECAST_HISTORY_DAYS are read as columns
+(user id, expense id, day number, category, amount in cents) by one query
+on ``ix_expense_user_id_date``; no Expense ORM objects are loaded. Each
+(user, category) then gets:
+
+- a moving average: average daily spend over the trailing
+  FORECAST_WINDOW_DAYS, with its value on each of the last window days as
+  a trend line for the dashboard;
+- a month-end projection: spent so far this month plus the moving average
+  for every day left in the month;
+- anomaly flags: expenses from the last window whose z-score against the
+  category's mean and standard deviation over the whole history is at least
+  FORECAST_ANOMALY_Z. Categories with fewer than FORECAST_MIN_SAMPLES
+  expenses, or no spread at all, are never flagged.
+
+``score_numpy`` computes everything for any number of users at once with
+``bincount``/``cumsum`` over (user, category) group codes. ``score_python``
+is the same computation as a plain loop, kept as the reference and
+baseline for benchmarks/bench_forecast.py; both return identical results.
+NumPy is imported on first use, so it does not slow down app start-up.
+
+``flask score-spending`` scores every user, shard by shard, in batches of
+FORECAST_BATCH_SIZE users per query, for a nightly cron job.
+"""
+import calendar
+import math
+from collections import defaultdict
+from datetime import date, timedelta
+
+from flask import current_app
+from sqlalchemy import Integer, cast, func
+
+from app.models import db, Expense
+from app.sharding import each_shard
+
+COLUMNS = ('user_id', 'id', 'day', 'category', 'amount_cents')
+
+# Day numbers count days since 1970-01-01; this is its julianday()
+EPOCH = date(1970, 1, 1)
+EPOCH_JULIAN_DAY = 2440587.5
+
+
+def day_number(value):
+    return (value - EPOCH).days
+
+
+def from_day_number(number):
+    return EPOCH + timedelta(days=number)
+
+
+def forecast_options(config):
+    """Keyword arguments of the scoring functions, from app config"""
+    return {
+        'window': config['FORECAST_WINDOW_DAYS'],
+        'z_threshold': config['FORECAST_ANOMALY_Z'],
+        'min_samples': config['FORECAST_MIN_SAMPLES'],
+    }
+
+
+def expense_columns(today, history_days, first_user_id, last_user_id):
+    """
+    Expenses of users ``first_user_id``..``last_user_id`` dated in the
+    ``history_days`` up to ``today``, as {column name: list} (see COLUMNS)
+    """
+    day = cast(func.julianday(Expense.date) - EPOCH_JULIAN_DAY, Integer)
+    rows = db.session.execute(
+        db.select(Expense.user_id, Expense.id, day, Expense.category, Expense.amount_cents)
+        .where(
+            Expense.user_id.between(first_user_id, last_user_id),
+            Expense.date > today - timedelta(days=history_days),
+            Expense.date <= today
+        )
+    ).all()
+    if not rows:
+        return {name: [] for name in COLUMNS}
+    return dict(zip(COLUMNS, map(list, zip(*rows))))
+
+
+def _window_days(today, window):
+    """Day numbers of today, the 1st of the month, the window start and the trend start"""
+    today_number = day_number(today)
+    recent_start = today_number - window + 1
+    # The first trend point averages the window that ends on recent_start
+    return today_number, day_number(today.replace(day=1)), recent_start, recent_start - window + 1
+
+
+# ==========================================================================
+# SCORING
+# ==========================================================================
+
+def score_numpy(columns, today, window, z_threshold, min_samples, trend=True):
+    """Score every user in ``columns`` with vectorized NumPy operations"""
+    import numpy as np
+
+    if not columns['id']:
+        return []
+    today_number, month_start, recent_start, trend_start = _window_days(today, window)
+    rows = len(columns['id'])
+    user_ids = np.fromiter(columns['user_id'], dtype=np.int64, count=rows)
+    days = np.fromiter(columns['day'], dtype=np.int64, count=rows)
+    amounts = np.fromiter(columns['amount_cents'], dtype=np.float64, count=rows)
+    # A dict lookup per row is several times faster than np.unique on strings
+    categories = sorted(set(columns['category']))
+    codes = {category: code for code, category in enumerate(categories)}
+    category_codes = np.fromiter(map(codes.__getitem__, columns['category']), dtype=np.int64, count=rows)
+
+    # One group per (user, category) present, in user then category order
+    keys, group = np.unique(user_ids * len(categories) + category_codes, return_inverse=True)
+    size = len(keys)
+
+    count = np.bincount(group, minlength=size)
+    mean = np.bincount(group, weights=amounts, minlength=size) / count
+    deviation = amounts - mean[group]
+    std = np.sqrt(np.bincount(group, weights=deviation * deviation, minlength=size) / count)
+    this_month = days >= month_start
+    month_to_date = np.bincount(group[this_month], weights=amounts[this_month], minlength=size)
+
+    recent = days >= recent_start
+    window_total = np.bincount(group[recent], weights=amounts[recent], minlength=size)
+    trends = None
+    if trend:
+        # Daily totals per group over the trend span, then every trailing
+        # window sum at once from their running total
+        span = today_number - trend_start + 1
+        inside = days >= trend_start
+        daily = np.bincount(
+            group[inside] * span + (days[inside] - trend_start),
+            weights=amounts[inside], minlength=size * span
+        ).reshape(size, span)
+        running = np.zeros((size, span + 1))
+        np.cumsum(daily, axis=1, out=running[:, 1:])
+        trends = ((running[:, window:] - running[:, :-window]) / window).tolist()
+
+    eligible = (count >= min_samples) & (std > 0)
+    candidates = np.flatnonzero(recent & eligible[group])
+    z = deviation[candidates] / std[group[candidates]]
+    flagged = candidates[z >= z_threshold]
+    flagged_z = z[z >= z_threshold]
+
+    groups = zip(
+        (keys // len(categories)).tolist(), [categories[code] for code in (keys % len(categories)).tolist()],
+        count.tolist(), mean.tolist(), std.tolist(), month_to_date.tolist(), window_total.tolist(),
+        trends or [None] * size
+    )
+    anomalies = [
+        (columns['user_id'][row], columns['id'][row], columns['day'][row], columns['category'][row],
+         columns['amount_cents'][row], z)
+        for row, z in zip(flagged.tolist(), flagged_z.tolist())
+    ]
+    return _assemble(groups, anomalies, today, window)
+
+
+def score_python(columns, today, window, z_threshold, min_samples, trend=True):
+    """Score every user in ``columns`` with a plain loop over the rows (the benchmark baseline)"""
+    today_number, month_start, recent_start, trend_start = _window_days(today, window)
+    rows = list(zip(*(columns[name] for name in COLUMNS)))
+
+    index = {}
+    stats = []  # per group: [user_id, category, count, total, month_to_date, window_total, {day: total}]
+    row_groups = []
+    for user_id, _, day, category, amount in rows:
+        group = index.get((user_id, category))
+        if group is None:
+            group = index[(user_id, category)] = len(stats)
+            stats.append([user_id, category, 0, 0, 0, 0, defaultdict(int)])
+        entry = stats[group]
+        entry[2] += 1
+        entry[3] += amount
+        if day >= month_start:
+            entry[4] += amount
+        if day >= recent_start:
+            entry[5] += amount
+        if day >= trend_start:
+            entry[6][day] += amount
+        row_groups.append(group)
+
+    means = [entry[3] / entry[2] for entry in stats]
+    squares = [0.0] * len(stats)
+    for (_, _, _, _, amount), group in zip(rows, row_groups):
+        deviation = amount - means[group]
+        squares[group] += deviation * deviation
+    stds = [math.sqrt(squares[group] / entry[2]) for group, entry in enumerate(stats)]
+
+    groups = []
+    for group, (user_id, category, count, _, month_to_date, window_total, daily) in enumerate(stats):
+        trends = None
+        if trend:
+            trends = []
+            total = sum(daily.get(day, 0) for day in range(trend_start, recent_start))
+            for day in range(recent_start, today_number + 1):
+                total += daily.get(day, 0)
+                trends.append(total / window)
+                total -= daily.get(day - window + 1, 0)
+        groups.append((user_id, category, count, means[group], stds[group], month_to_date, window_total, trends))
+
+    anomalies = []
+    for (user_id, expense_id, day, category, amount), group in zip(rows, row_groups):
+        std = stds[group]
+        if day < recent_start or stats[group][2] < min_samples or not std > 0:
+            continue
+        z = (amount - means[group]) / std
+        if z >= z_threshold:
+            anomalies.append((user_id, expense_id, day, category, amount, z))
+    return _assemble(groups, anomalies, today, window)
+
+
+def _assemble(groups, anomalies, today, window):
+    """
+    Per-user result dicts, ordered by user id, from the scorers' output
+
+    ``groups`` holds (user_id, category, count, mean, std, month_to_date,
+    window_total, trend or None) and ``anomalies`` holds (user_id, id, day,
+    category, amount_cents, z).
+    """
+    days_left = calendar.monthrange(today.year, today.month)[1] - today.day
+    results = {}
+    for user_id, category, count, mean, std, month_to_date, window_total, trend in groups:
+        result = results.get(user_id)
+        if result is None:
+            result = results[user_id] = empty_forecast(user_id, today)
+        month_to_date = int(month_to_date)
+        projected = month_to_date + round(window_total * days_left / window)
+        result['categories'].append({
+            'category': category,
+            'count': count,
+            'mean_cents': round(mean, 2),
+            'std_cents': round(std, 2),
+            'moving_average_cents': round(window_total / window, 2),
+            'month_to_date_cents': month_to_date,
+            'projected_cents': projected,
+            'trend_cents': [round(value, 2) for value in trend] if trend is not None else None,
+        })
+        result['month_to_date_cents'] += month_to_date
+        result['projected_cents'] += projected
+
+    for user_id, expense_id, day, category, amount, z in anomalies:
+        results[user_id]['anomalies'].append({
+            'id': expense_id,
+            'date': from_day_number(day),
+            'category': category,
+            'amount_cents': int(amount),
+            'z': round(z, 2),
+        })
+
+    for result in results.values():
+        result['categories'].sort(key=lambda row: row['category'])
+        result['anomalies'].sort(key=lambda row: (-row['z'], row['id']))
+    return [results[user_id] for user_id in sorted(results)]
+
+
+def empty_forecast(user_id, today):
+    return {
+        'user_id': user_id,
+        'as_of': today,
+        'days_left': calendar.monthrange(today.year, today.month)[1] - today.day,
+        'month_to_date_cents': 0,
+        'projected_cents': 0,
+        'categories': [],
+        'anomalies': [],
+    }
+
+
+def score(columns, today, trend=True):
+    """Score ``columns`` with the app's forecast settings"""
+    return score_numpy(columns, today, trend=trend, **forecast_options(current_app.config))
+
+
+# ==========================================================================
+# ENTRY POINTS
+# ==========================================================================
+
+def spending_forecast(user_id, today=None):
+    """One user's forecast, with per-category trend lines"""
+    today = today or date.today()
+    columns = expense_columns(today, current_app.config['FORECAST_HISTORY_DAYS'], user_id, user_id)
+    results = score(columns, today)
+    return results[0] if results else empty_forecast(user_id, today)
+
+
+def score_all_users(today=None, batch_size=None):
+    """
+    Yield the forecast (without trend lines) of every user with expenses in
+    the history window, in user id order within each shard
+
+    Each batch of ``batch_size`` users (default FORECAST_BATCH_SIZE) is
+    read with one range query and scored at once.
+    """
+    today = today or date.today()
+    batch_size = batch_size or current_app.config['FORECAST_BATCH_SIZE']
+    history_days = current_app.config['FORECAST_HISTORY_DAYS']
+    for _ in each_shard():
+        user_ids = db.session.execute(
+            db.select(Expense.user_id).distinct().order_by(Expense.user_id)
+        ).scalars().all()
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            columns = expense_columns(today, history_days, batch[0], batch[-1])
+            yield from score(columns, today, trend=False)
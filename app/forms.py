@@ -1,6 +1,12 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, EmailField, SubmitField, FloatField, DateField, TextAreaField, SelectField
-from wtforms.validators import DataRequired, Email, EqualTo, Length
+from flask_wtf.file import FileField, FileRequired, FileAllowed
+from wtforms import StringField, PasswordField, EmailField, SubmitField, DateField, TextAreaField, SelectField, IntegerField
+from wtforms.validators import DataRequired, Email, EqualTo, Length, NumberRange, Optional
+
+from app.money import Money, MoneyField
+
+# Shared by ExpenseForm and the bulk importer (app/importer.py)
+EXPENSE_CATEGORIES = ['Food', 'Transportation', 'Utilities', 'Entertainment', 'Other']
 
 class SignupForm(FlaskForm):
     first_name = StringField('First Name', validators=[
@@ -44,16 +50,12 @@ class SigninForm(FlaskForm):
 
 class ExpenseForm(FlaskForm):
     category = SelectField('Category', choices=[
-        ('Food', 'Food'),
-        ('Transportation', 'Transportation'),
-        ('Utilities', 'Utilities'),
-        ('Entertainment', 'Entertainment'),
-        ('Other', 'Other')
+        (category, category) for category in EXPENSE_CATEGORIES
     ], validators=[DataRequired()])
 
-    amount = FloatField('Amount', validators=[
+    amount = MoneyField('Amount', validators=[
         DataRequired(),
-        Length(min=0, message='Amount must be positive')
+        NumberRange(min=Money(0), message='Amount must be positive')
     ])
 
     date = DateField('Date', validators=[DataRequired()])
@@ -62,15 +64,27 @@ class ExpenseForm(FlaskForm):
 
     submit = SubmitField('Add Expense')
 
+class ImportExpensesForm(FlaskForm):
+    file = FileField('Bank Export', validators=[
+        FileRequired(),
+        FileAllowed(['csv', 'ofx', 'qfx'], 'Upload a CSV or OFX file')
+    ])
+
+    default_category = SelectField('Category for rows without one', choices=[
+        (category, category) for category in EXPENSE_CATEGORIES
+    ], default='Other', validators=[DataRequired()])
+
+    submit = SubmitField('Import')
+
 class BillForm(FlaskForm):
     name = StringField('Bill Name', validators=[
         DataRequired(),
         Length(max=100)
     ])
 
-    amount = FloatField('Amount', validators=[
+    amount = MoneyField('Amount', validators=[
         DataRequired(),
-        Length(min=0, message='Amount must be positive')
+        NumberRange(min=Money(0), message='Amount must be positive')
     ])
 
     due_date = DateField('Due Date', validators=[DataRequired()])
@@ -80,6 +94,21 @@ class BillForm(FlaskForm):
         ('Unpaid', 'Unpaid')
     ], validators=[DataRequired()])
 
+    repeat = SelectField('Repeats', choices=[
+        ('', 'Does not repeat'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+        ('yearly', 'Yearly'),
+        ('days', 'Every N days')
+    ], default='')
+
+    repeat_every = IntegerField('Every', default=1, validators=[
+        Optional(),
+        NumberRange(min=1, max=365, message='Must be between 1 and 365')
+    ])
+
+    repeat_until = DateField('Until (optional)', validators=[Optional()])
+
     submit = SubmitField('Add Bill')
 
 class TaskForm(FlaskForm):
@@ -0,0 +1,308 @@
+"""
+Streaming bulk import of expenses from bank exports.
+
+Files are parsed one record at a time (CSV rows or OFX <STMTTRN> blocks),
+validated against the same rules as ExpenseForm, and inserted with Core
+``executemany`` in batches of IMPORT_BATCH_SIZE rows. Only one batch is held
+in memory at a time, so memory stays flat however large the file is.
+
+The whole import runs in a single transaction: either every valid row is
+stored or, if the database write fails, none are. Core inserts bypass the
+ORM flush hooks, so each batch applies its own rollup deltas (see
+app/rollups.py) and bumps the user's data version (app/caching.py).
+"""
+import csv
+import io
+import re
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from app.caching import bump_data_version
+from app.forms import EXPENSE_CATEGORIES
+from app.models import db, Expense
+from app.money import Money
+from app.rollups import apply_deltas, year_month
+
+IMPORT_FORMATS = ('csv', 'ofx')
+
+# Same limit as ExpenseForm.notes
+MAX_NOTES_LENGTH = 200
+
+# Per-row error details kept for the report; the count is always exact
+MAX_REPORTED_ERRORS = 50
+
+CSV_DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%d.%m.%Y')
+
+
+class ImportFormatError(ValueError):
+    """Raised when a file cannot be read as the requested format at all"""
+
+
+class RowError(ValueError):
+    """Raised for a single record that fails validation"""
+
+
+class ImportResult:
+    """Counts and timing for one import run"""
+
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    @property
+    def processed(self):
+        return self.imported + self.skipped + self.error_count
+
+    @property
+    def rows_per_second(self):
+        return self.processed / self.seconds if self.seconds > 0 else 0.0
+
+    def add_error(self, location, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': location, 'error': message})
+
+    def to_dict(self):
+        return {
+            'imported': self.imported,
+            'skipped': self.skipped,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def detect_format(filename):
+    """Guess the import format from a file name"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return 'ofx' if extension in ('ofx', 'qfx') else 'csv'
+
+
+def open_text(binary_stream):
+    """Wrap a binary stream for line-by-line decoding (tolerates a UTF-8 BOM)"""
+    return io.TextIOWrapper(binary_stream, encoding='utf-8-sig', errors='replace', newline='')
+
+
+# ==========================================================================
+# VALIDATION
+# ==========================================================================
+
+def parse_amount(value):
+    """Parse a positive amount such as '12.50', '$1,200.00' into Money"""
+    cleaned = (value or '').strip().replace('$', '').replace(',', '')
+    if not cleaned:
+        raise RowError('Amount is required')
+    try:
+        amount = Money.from_decimal(cleaned)
+    except ValueError:
+        raise RowError(f'Not a valid amount: {value!r}')
+    if amount.cents <= 0:
+        raise RowError('Amount must be positive')
+    return amount
+
+
+def parse_csv_date(value):
+    value = (value or '').strip()
+    if not value:
+        raise RowError('Date is required')
+    for fmt in CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise RowError(f'Not a valid date: {value!r}')
+
+
+def parse_category(value, default_category):
+    category = (value or '').strip() or default_category
+    if category not in EXPENSE_CATEGORIES:
+        raise RowError(f"Category must be one of: {', '.join(EXPENSE_CATEGORIES)}")
+    return category
+
+
+# ==========================================================================
+# PARSERS
+# ==========================================================================
+
+def iter_csv_records(text_stream, default_category='Other'):
+    """
+    Yield (line_number, record) pairs from a CSV export
+
+    The header row must name ``date`` and ``amount`` columns; ``category``
+    and ``notes`` (or ``description``/``memo``) are optional. ``record`` is a
+    dict of Expense column values, or a RowError for an invalid row.
+    """
+    reader = csv.reader(text_stream)
+    header = next(reader, None)
+    if header is None:
+        raise ImportFormatError('The file is empty')
+
+    columns = {name.strip().lower(): index for index, name in enumerate(header)}
+    missing = [name for name in ('date', 'amount') if name not in columns]
+    if missing:
+        raise ImportFormatError(f"CSV header must include: {', '.join(missing)}")
+    notes_column = next((columns[name] for name in ('notes', 'description', 'memo') if name in columns), None)
+    category_column = columns.get('category')
+
+    def cell(row, index):
+        return row[index] if index is not None and index < len(row) else ''
+
+    for row in reader:
+        if not any(value.strip() for value in row):
+            continue
+        try:
+            notes = cell(row, notes_column).strip()
+            if len(notes) > MAX_NOTES_LENGTH:
+                raise RowError(f'Notes must be at most {MAX_NOTES_LENGTH} characters')
+            yield reader.line_num, {
+                'date': parse_csv_date(cell(row, columns['date'])),
+                'amount_cents': parse_amount(cell(row, columns['amount'])).cents,
+                'category': parse_category(cell(row, category_column), default_category),
+                'notes': notes or None,
+            }
+        except RowError as e:
+            yield reader.line_num, e
+
+
+OFX_TOKEN = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def _ofx_tokens(text_stream, chunk_size=64 * 1024):
+    """Yield (closing, tag, text) tokens from OFX 1.x (SGML) or 2.x (XML) input"""
+    buffer = ''
+    while True:
+        chunk = text_stream.read(chunk_size)
+        buffer += chunk
+        # Only tokenize up to the last '<'; the tail may be a tag cut in half
+        end = len(buffer) if not chunk else buffer.rfind('<')
+        if end > 0:
+            for match in OFX_TOKEN.finditer(buffer, 0, end):
+                yield match.group(1) == '/', match.group(2).upper(), match.group(3).strip()
+            buffer = buffer[end:]
+        if not chunk:
+            return
+
+
+def parse_ofx_date(value):
+    """OFX dates look like YYYYMMDD[HHMMSS[.XXX]][[TZ]]; only the day matters"""
+    try:
+        return date(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+    except (ValueError, TypeError):
+        raise RowError(f'Not a valid date: {value!r}')
+
+
+def iter_ofx_records(text_stream, default_category='Other'):
+    """
+    Yield (transaction_number, record) pairs from an OFX statement
+
+    Debits (negative TRNAMT) become expenses; credits are yielded as None so
+    they are counted as skipped. OFX has no categories, so every expense gets
+    ``default_category``; NAME and MEMO become the notes.
+    """
+    category = parse_category(default_category, default_category)
+    seen_ofx = False
+    number = 0
+    transaction = None
+
+    for closing, tag, text in _ofx_tokens(text_stream):
+        seen_ofx = seen_ofx or tag == 'OFX'
+        if tag == 'STMTTRN':
+            if not closing:
+                transaction = {}
+                number += 1
+                continue
+            if transaction is not None:
+                yield number, _ofx_record(transaction, category)
+            transaction = None
+        elif transaction is not None and not closing and text:
+            transaction[tag] = text
+
+    if not seen_ofx:
+        raise ImportFormatError('Not an OFX file')
+
+
+def _ofx_record(transaction, category):
+    try:
+        try:
+            amount = Decimal(transaction.get('TRNAMT', '').replace(',', '.'))
+        except InvalidOperation:
+            raise RowError(f"Not a valid amount: {transaction.get('TRNAMT')!r}")
+        if amount >= 0:
+            return None
+        notes = ' - '.join(value for value in (transaction.get('NAME'), transaction.get('MEMO')) if value)
+        return {
+            'date': parse_ofx_date(transaction.get('DTPOSTED')),
+            'amount_cents': Money.from_decimal(-amount).cents,
+            'category': category,
+            # Bank-generated text, so trim it rather than reject the transaction
+            'notes': notes[:MAX_NOTES_LENGTH] or None,
+        }
+    except RowError as e:
+        return e
+
+
+# ==========================================================================
+# IMPORT
+# ==========================================================================
+
+def _insert_batch(connection, user_id, batch):
+    """executemany one batch of rows and apply its monthly rollup deltas"""
+    rows = [dict(record, user_id=user_id) for record in batch]
+    connection.execute(Expense.__table__.insert(), rows)
+
+    deltas = defaultdict(lambda: [0, 0])
+    for row in rows:
+        entry = deltas[(user_id, year_month(row['date']), row['category'])]
+        entry[0] += row['amount_cents']
+        entry[1] += 1
+    apply_deltas(connection, deltas)
+    bump_data_version(db.session, [user_id])
+
+
+def import_expenses(user_id, text_stream, file_format='csv', default_category='Other', batch_size=None):
+    """
+    Stream records from ``text_stream`` into the user's expenses
+
+    Invalid rows are counted and reported but do not stop the import. Raises
+    ImportFormatError if the file is unreadable as ``file_format``; nothing
+    is stored in that case. Returns an ImportResult.
+    """
+    from flask import current_app
+
+    if file_format not in IMPORT_FORMATS:
+        raise ImportFormatError(f"Format must be one of: {', '.join(IMPORT_FORMATS)}")
+    batch_size = batch_size or current_app.config['IMPORT_BATCH_SIZE']
+    parse = iter_ofx_records if file_format == 'ofx' else iter_csv_records
+
+    result = ImportResult()
+    started = time.perf_counter()
+    connection = db.session.connection(bind_arguments={'mapper': Expense})
+    batch = []
+    try:
+        for location, record in parse(text_stream, default_category):
+            if record is None:
+                result.skipped += 1
+            elif isinstance(record, RowError):
+                result.add_error(location, str(record))
+            else:
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    _insert_batch(connection, user_id, batch)
+                    result.imported += len(batch)
+                    batch = []
+        if batch:
+            _insert_batch(connection, user_id, batch)
+            result.imported += len(batch)
+        db.session.commit()
+    except BaseException:
+        db.session.rollback()
+        raise
+    finally:
+        result.seconds = time.perf_counter() - started
+    return result
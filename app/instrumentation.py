@@ -0,0 +1,362 @@
+"""
+Opt-in request instrumentation for Budget Beyond.
+
+With INSTRUMENTATION_ENABLED set, every request records:
+
+- wall time
+- SQL query count and time (engine before/after_cursor_execute)
+- template render time (Flask's template signals)
+- time spent rendering and queueing email (``timed('email')``)
+- time waiting on bcrypt (``timed('bcrypt')``, see app/passwords.py)
+- time compressing the response body (see app/compression.py)
+
+Each response carries a ``Server-Timing`` header with the breakdown, so it
+shows up in the browser's network panel. The same numbers are summed per
+endpoint and served in Prometheus text format at ``/metrics``, together
+with bytes sent and saved by compression, the password hashing pool, the
+database pool and the outbox worker's SMTP send times. Metrics are per
+process; with several gunicorn workers, scrape each one.
+
+Slow requests (over SLOW_REQUEST_THRESHOLD seconds) are logged with their
+breakdown. With PROFILE_SAMPLE_RATE above zero, that fraction of requests
+also runs under cProfile, and the profiles of the slow ones are written to
+PROFILE_DIR (``python -m pstats <file>`` or snakeviz to read them).
+
+When instrumentation is off nothing is registered, so requests pay nothing.
+"""
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, has_app_context, request, abort, before_render_template, template_rendered
+from sqlalchemy import event
+
+# Request duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Time categories reported in Server-Timing and summed per endpoint
+TIMING_KINDS = ('db', 'template', 'email', 'bcrypt', 'compress')
+
+METRICS = {
+    'budgetbeyond_requests_total': ('counter', 'Requests handled, by endpoint, method and status.'),
+    'budgetbeyond_request_duration_seconds': ('histogram', 'Request wall time, by endpoint.'),
+    'budgetbeyond_db_queries_total': ('counter', 'SQL statements executed while handling requests.'),
+    'budgetbeyond_db_seconds_total': ('counter', 'Time spent in SQL statements while handling requests.'),
+    'budgetbeyond_template_seconds_total': ('counter', 'Time spent rendering page templates.'),
+    'budgetbeyond_email_seconds_total': ('counter', 'Time spent rendering and queueing email on request threads.'),
+    'budgetbeyond_bcrypt_seconds_total': ('counter', 'Time request threads spent waiting on password hashing.'),
+    'budgetbeyond_compress_seconds_total': ('counter', 'Time spent compressing response bodies on request threads.'),
+    'budgetbeyond_response_bytes_total': ('counter', 'Response body bytes sent after compression, by endpoint and encoding.'),
+    'budgetbeyond_response_bytes_saved_total': ('counter', 'Response body bytes saved by compression, by endpoint and encoding.'),
+    'budgetbeyond_email_send_seconds': ('histogram', 'SMTP time per outbox batch sent by the email worker.'),
+    'budgetbeyond_emails_sent_total': ('counter', 'Emails the worker handed to the SMTP server.'),
+    'budgetbeyond_email_send_failures_total': ('counter', 'Emails the SMTP server did not accept.'),
+    'budgetbeyond_password_hash_workers': ('gauge', 'Password hashing threads.'),
+    'budgetbeyond_password_hash_active': ('gauge', 'Password hashes running now.'),
+    'budgetbeyond_password_hash_queued': ('gauge', 'Password hashes waiting for a thread or an admission slot.'),
+    'budgetbeyond_password_hash_completed_total': ('counter', 'Password hashes and checks finished.'),
+    'budgetbeyond_password_hash_rejected_total': ('counter', 'Password hashes refused because the pool was full.'),
+    'budgetbeyond_db_pool_checked_out': ('gauge', 'Database connections currently checked out.'),
+}
+
+
+# ==========================================================================
+# METRICS REGISTRY
+# ==========================================================================
+
+class Histogram:
+    """Cumulative Prometheus-style histogram"""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def series_key(item):
+    (name, labels), _ = item
+    return name, [(label, str(value)) for label, value in labels]
+
+
+class Metrics:
+    """Process-wide counters and histograms, rendered as Prometheus text"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}     # (name, labels) -> number
+        self._histograms = {}   # (name, labels) -> Histogram
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        key = (name, tuple(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def render(self, gauges=()):
+        """
+        The exposition text for every metric recorded so far
+
+        ``gauges`` is an iterable of (name, labels, value) sampled at scrape
+        time, such as pool sizes.
+        """
+        samples = {}
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items(), key=series_key):
+                samples.setdefault(name, []).append(f'{name}{format_labels(labels)} {format_value(value)}')
+            for (name, labels), histogram in sorted(self._histograms.items(), key=series_key):
+                lines = samples.setdefault(name, [])
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f'{name}_sum{format_labels(labels)} {format_value(histogram.sum)}')
+                lines.append(f'{name}_count{format_labels(labels)} {histogram.count}')
+        for name, labels, value in gauges:
+            samples.setdefault(name, []).append(f'{name}{format_labels(labels)} {format_value(value)}')
+
+        output = []
+        for name in sorted(samples):
+            kind, description = METRICS.get(name, ('untyped', ''))
+            output.append(f'# HELP {name} {description}')
+            output.append(f'# TYPE {name} {kind}')
+            output.extend(samples[name])
+        return '\n'.join(output) + '\n'
+
+
+def get_metrics(app):
+    """The app's Metrics, or None when instrumentation is off"""
+    return app.extensions.get('metrics')
+
+
+# ==========================================================================
+# PER-REQUEST TIMINGS
+# ==========================================================================
+
+def record(kind, seconds):
+    """Add ``seconds`` to the current request's ``kind`` total, if it is being timed"""
+    if not has_app_context():
+        return
+    timings = g.get('_request_timings')
+    if timings is not None:
+        timings[kind] = timings.get(kind, 0.0) + seconds
+
+
+@contextmanager
+def timed(kind):
+    """Time a block and add it to the current request's ``kind`` total"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, time.perf_counter() - start)
+
+
+def record_email_batch(app, seconds, sent, failed):
+    """Record one outbox batch sent by the email worker"""
+    metrics = get_metrics(app)
+    if metrics is None:
+        return
+    metrics.observe('budgetbeyond_email_send_seconds', seconds)
+    metrics.inc('budgetbeyond_emails_sent_total', amount=sent)
+    if failed:
+        metrics.inc('budgetbeyond_email_send_failures_total', amount=failed)
+
+
+def record_compression(app, endpoint, encoding, original, compressed):
+    """Record the size of one compressed response body"""
+    metrics = get_metrics(app)
+    if metrics is None:
+        return
+    labels = (('endpoint', endpoint), ('encoding', encoding))
+    metrics.inc('budgetbeyond_response_bytes_total', labels, compressed)
+    metrics.inc('budgetbeyond_response_bytes_saved_total', labels, original - compressed)
+
+
+def server_timing_header(timings, queries, total):
+    """Server-Timing value, durations in milliseconds"""
+    parts = [f'db;dur={timings.get("db", 0.0) * 1000:.1f};desc="{queries} queries"']
+    for kind in TIMING_KINDS[1:]:
+        if kind in timings:
+            parts.append(f'{kind};dur={timings[kind] * 1000:.1f}')
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+
+# ==========================================================================
+# HOOKS
+# ==========================================================================
+
+def register_sql_timing(engine):
+    """Count and time every statement run on ``engine`` during a request"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if has_app_context() and g.get('_request_timings') is not None:
+            g._request_timings['db'] += elapsed
+            g._request_queries += 1
+
+
+def gauges(app):
+    """Pool gauges sampled when /metrics is scraped"""
+    from app.models import db
+
+    hasher = app.extensions.get('password_hasher')
+    if hasher is not None:
+        stats = hasher.stats()
+        yield 'budgetbeyond_password_hash_workers', (), stats['workers']
+        yield 'budgetbeyond_password_hash_active', (), stats['active']
+        yield 'budgetbeyond_password_hash_queued', (), stats['queued']
+        yield 'budgetbeyond_password_hash_completed_total', (), stats['completed']
+        yield 'budgetbeyond_password_hash_rejected_total', (), stats['rejected']
+
+    checkedout = getattr(db.engine.pool, 'checkedout', None)
+    if checkedout is not None:
+        yield 'budgetbeyond_db_pool_checked_out', (), checkedout()
+
+
+_profile_lock = threading.Lock()
+
+
+def profile_path(app, endpoint, elapsed):
+    directory = app.config['PROFILE_DIR'] or os.path.join(app.instance_path, 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')
+    return os.path.join(directory, f'{stamp}-{endpoint}-{int(elapsed * 1000)}ms.prof')
+
+
+def init_instrumentation(app):
+    """Register the request hooks, SQL timing and /metrics, if enabled"""
+    if not app.config['INSTRUMENTATION_ENABLED']:
+        return
+
+    from app.models import db
+
+    metrics = app.extensions['metrics'] = Metrics()
+    threshold = app.config['SLOW_REQUEST_THRESHOLD']
+    sample_rate = app.config['PROFILE_SAMPLE_RATE']
+
+    with app.app_context():
+        for engine in db.engines.values():
+            register_sql_timing(engine)
+
+    def before_render(sender, template, context, **extra):
+        g.setdefault('_template_starts', []).append(time.perf_counter())
+
+    def rendered(sender, template, context, **extra):
+        starts = g.get('_template_starts')
+        if starts:
+            record('template', time.perf_counter() - starts.pop())
+
+    before_render_template.connect(before_render, app, weak=False)
+    template_rendered.connect(rendered, app, weak=False)
+
+    @app.before_request
+    def start_request_timing():
+        g._request_start = time.perf_counter()
+        g._request_timings = {'db': 0.0}
+        g._request_queries = 0
+        # One profiled request at a time; cProfile cannot nest
+        if sample_rate > 0 and random.random() < sample_rate and _profile_lock.acquire(blocking=False):
+            g._profiler = cProfile.Profile()
+            g._profiler.enable()
+
+    @app.after_request
+    def finish_request_timing(response):
+        start = g.get('_request_start')
+        if start is None:
+            return response
+        total = time.perf_counter() - start
+        g._request_elapsed = total
+        timings = g._request_timings
+        queries = g._request_queries
+        endpoint = request.endpoint or 'unmatched'
+
+        if app.config['SERVER_TIMING_ENABLED']:
+            response.headers['Server-Timing'] = server_timing_header(timings, queries, total)
+
+        labels = (('endpoint', endpoint),)
+        metrics.inc('budgetbeyond_requests_total',
+                    labels + (('method', request.method), ('status', response.status_code)))
+        metrics.observe('budgetbeyond_request_duration_seconds', total, labels)
+        metrics.inc('budgetbeyond_db_queries_total', labels, queries)
+        for kind in TIMING_KINDS:
+            if kind in timings:
+                metrics.inc(f'budgetbeyond_{kind}_seconds_total', labels, timings[kind])
+
+        if total >= threshold:
+            app.logger.warning(
+                'Slow request %s %s: %.0f ms (%s)', request.method, request.path, total * 1000,
+                ', '.join(f'{kind} {seconds * 1000:.0f} ms' for kind, seconds in timings.items())
+                + f', {queries} queries'
+            )
+        return response
+
+    @app.teardown_request
+    def finish_profile(error=None):
+        profiler = g.pop('_profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        _profile_lock.release()
+        elapsed = g.get('_request_elapsed', time.perf_counter() - g._request_start)
+        if elapsed >= threshold:
+            try:
+                path = profile_path(app, request.endpoint or 'unmatched', elapsed)
+                profiler.dump_stats(path)
+                app.logger.warning('Profile of slow request written to %s', path)
+            except OSError:
+                app.logger.exception('Failed to write the profile of a slow request')
+
+    def metrics_view():
+        token = app.config['METRICS_TOKEN']
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(404)
+        return app.response_class(
+            metrics.render(gauges(app)),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,184 @@
+"""
+Pooled SMTP transport for Flask-Mail.
+
+``mail.send()`` opens a fresh SMTP connection, runs STARTTLS and logs in for
+every single message. This module keeps up to MAIL_POOL_SIZE authenticated
+connections open and reuses them, so a burst of emails pays for the
+handshake once per connection instead of once per message.
+"""
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app
+from flask_mail import Connection
+
+
+def is_connection_error(error):
+    """
+    True if ``error`` means the connection itself is unusable, as opposed to
+    the server rejecting one particular message. SMTPException subclasses
+    OSError, so plain socket errors have to be told apart explicitly.
+    """
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class PooledConnection(Connection):
+    """A Flask-Mail connection that stays open between sends"""
+
+    def __init__(self, mail_state):
+        super().__init__(mail_state)
+        self.last_used = 0.0
+
+    def open(self):
+        self.__enter__()
+        self.last_used = time.monotonic()
+
+    def close(self):
+        host, self.host = self.host, None
+        if host is None:
+            return
+        try:
+            host.quit()
+        except OSError:
+            host.close()
+
+    def send(self, message, envelope_from=None):
+        # Flask-Mail treats a missing host as "suppressed"; for a pooled
+        # connection it means a failed reconnect, which must not look like success
+        if self.host is None and not self.mail.suppress:
+            raise smtplib.SMTPServerDisconnected('Pooled connection is not open')
+        super().send(message, envelope_from)
+
+    def is_alive(self):
+        """Cheap liveness probe (NOOP) for a connection that sat idle"""
+        if self.host is None:
+            return self.mail.suppress
+        try:
+            return self.host.noop()[0] == 250
+        except OSError:
+            return False
+
+
+class SMTPConnectionPool:
+    """A bounded pool of persistent SMTP connections"""
+
+    def __init__(self, mail_state, size=2, max_idle=60.0):
+        self.mail_state = mail_state
+        self.size = size
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        connection = PooledConnection(self.mail_state)
+        connection.open()
+        return connection
+
+    def _checkout(self):
+        self._slots.acquire()
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+        # Servers drop idle sessions; probe before trusting an old one
+        if time.monotonic() - connection.last_used > self.max_idle and not connection.is_alive():
+            connection.close()
+            return self._connect()
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, blocking while all MAIL_POOL_SIZE are in use"""
+        try:
+            connection = self._checkout()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        try:
+            yield connection
+        except BaseException:
+            connection.close()
+            self._slots.release()
+            raise
+        else:
+            connection.last_used = time.monotonic()
+            self._idle.put(connection)
+            self._slots.release()
+
+    def _send_with_reconnect(self, connection, message):
+        """Send on ``connection``, reopening it once if it was dropped"""
+        try:
+            connection.send(message)
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            connection.close()
+            connection.open()
+            connection.send(message)
+
+    def send_batch(self, messages):
+        """
+        Send many messages over one pooled connection
+
+        Returns a list with one entry per message: None if it was sent, or the
+        exception that prevented it. A dropped connection is reopened and the
+        message retried once; a message the server rejects does not stop the
+        rest of the batch.
+        """
+        try:
+            with self.connection() as connection:
+                results = []
+                for message in messages:
+                    try:
+                        self._send_with_reconnect(connection, message)
+                        results.append(None)
+                    except Exception as e:
+                        if is_connection_error(e):
+                            # Reconnecting failed too; fail the rest of the batch
+                            connection.close()
+                            return results + [e] * (len(messages) - len(results))
+                        results.append(e)
+                return results
+        except Exception as e:
+            # No connection could be opened at all
+            return [e] * len(messages)
+
+    def send(self, message):
+        """Send a single message, raising on failure like mail.send()"""
+        error = self.send_batch([message])[0]
+        if error is not None:
+            raise error
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def init_pool(app):
+    """Create the app's SMTP pool; must run after Flask-Mail's init_app"""
+    app.extensions['mail_pool'] = SMTPConnectionPool(
+        app.extensions['mail'],
+        size=app.config['MAIL_POOL_SIZE'],
+        max_idle=app.config['MAIL_POOL_MAX_IDLE']
+    )
+
+
+def get_pool():
+    """Return the SMTP pool for the current app, setting up Flask-Mail on first use"""
+    pool = current_app.extensions.get('mail_pool')
+    if pool is None:
+        from app.email_service import init_mail
+
+        init_mail(current_app._get_current_object())
+        pool = current_app.extensions['mail_pool']
+    return pool
@@ -1,10 +1,13 @@
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-import bcrypt
 from itsdangerous import URLSafeTimedSerializer
 from flask import current_app
 
-db = SQLAlchemy()
+from app.money import Money
+from app.sharding import RoutingSession, ShardedSQLAlchemy
+
+# RoutingSession sends per-user tables to their shard when sharding is on,
+# and db.create_all() creates them in every shard
+db = ShardedSQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -14,17 +17,27 @@ class User(db.Model):
     password_hash = db.Column(db.String(128), nullable=False)
     email_verified = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on every change to the user's data; drives page ETags (app/caching.py)
+    data_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    data_updated_at = db.Column(db.DateTime, nullable=True)
     
     def __repr__(self):
         return f'<User {self.email}>'
     
     def set_password(self, password):
-        """Hash and set the password"""
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """Hash and set the password (may raise PasswordHasherBusy)"""
+        from app.passwords import get_password_hasher
+        self.password_hash = get_password_hasher().hash(password)
     
     def check_password(self, password):
-        """Check if the provided password matches the hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        """Check if the provided password matches the hash (may raise PasswordHasherBusy)"""
+        from app.passwords import get_password_hasher
+        return get_password_hasher().check(password, self.password_hash)
+
+    def password_needs_rehash(self):
+        """True if the stored hash uses a different bcrypt cost than BCRYPT_ROUNDS"""
+        from app.passwords import get_password_hasher
+        return get_password_hasher().needs_rehash(self.password_hash)
     
     @property
     def full_name(self):
@@ -47,29 +60,157 @@ class User(db.Model):
             return None
 
 
+class UserDataVersion(db.Model):
+    """
+    A user's data version when sharding is on, stored in the user's shard so
+    that writes never touch the central database (see app/caching.py)
+    """
+    __tablename__ = 'user_data_version'
+
+    user_id = db.Column(db.Integer, primary_key=True)  # no foreign key: users live in the central database
+    data_version = db.Column(db.Integer, default=0, nullable=False)
+    data_updated_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<UserDataVersion {self.user_id}: {self.data_version}>'
+
+
 class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     category = db.Column(db.String(50), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount_cents = db.Column(db.Integer, nullable=False)
     date = db.Column(db.Date, default=datetime.utcnow, nullable=False)
     notes = db.Column(db.Text, nullable=True)
 
+    __table_args__ = (
+        db.Index('ix_expense_user_id_date', 'user_id', 'date'),
+    )
+
     def __repr__(self):
         return f'<Expense {self.category}: {self.amount}>'
 
+    @property
+    def amount(self):
+        """The amount as a Money value (stored as integer cents)"""
+        return Money(self.amount_cents) if self.amount_cents is not None else None
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_cents = Money.coerce(value).cents
+
+    @classmethod
+    def for_user(cls, user_id):
+        """Query a user's expenses (served by ix_expense_user_id_date)"""
+        return cls.query.filter_by(user_id=user_id)
+
+    @classmethod
+    def sort_keys(cls):
+        """Keyset ordering for the expense history: newest first"""
+        return [(cls.date, True), (cls.id, True)]
+
+
+class ExpenseMonthlyRollup(db.Model):
+    """Per-user, per-month, per-category expense totals (see app/rollups.py)"""
+    __tablename__ = 'expense_monthly_rollup'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    year_month = db.Column(db.String(7), primary_key=True)  # 'YYYY-MM'
+    category = db.Column(db.String(50), primary_key=True)
+    total_cents = db.Column(db.Integer, default=0, nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<ExpenseMonthlyRollup {self.user_id} {self.year_month} {self.category}: {Money(self.total_cents)}>'
+
 
 class Bill(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     due_date = db.Column(db.Date, nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount_cents = db.Column(db.Integer, nullable=False)
     paid = db.Column(db.Boolean, default=False, nullable=False)
+    # Set on occurrences generated from a BillRecurrence (see app/recurrence.py)
+    recurrence_id = db.Column(db.Integer, db.ForeignKey('bill_recurrence.id'), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_bill_user_id_due_date_paid', 'user_id', 'due_date', 'paid'),
+        # Cross-user "unpaid and due soon" scan for reminders (app/reminders.py)
+        db.Index('ix_bill_paid_due_date', 'paid', 'due_date'),
+        # At most one occurrence per rule and date, even if two requests expand at once
+        db.Index('ix_bill_recurrence_id_due_date', 'recurrence_id', 'due_date', unique=True),
+    )
 
     def __repr__(self):
         return f'<Bill {self.name}: {self.amount}>'
 
+    @property
+    def amount(self):
+        """The amount as a Money value (stored as integer cents)"""
+        return Money(self.amount_cents) if self.amount_cents is not None else None
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_cents = Money.coerce(value).cents
+
+    @classmethod
+    def for_user(cls, user_id):
+        """Query a user's bills (served by ix_bill_user_id_due_date_paid)"""
+        return cls.query.filter_by(user_id=user_id)
+
+    @classmethod
+    def sort_keys(cls):
+        """Keyset ordering for the bill list: soonest due first"""
+        return [(cls.due_date, False), (cls.id, False)]
+
+
+class BillRecurrence(db.Model):
+    """A repeating bill; its dated occurrences are stored lazily in ``bill``"""
+    __tablename__ = 'bill_recurrence'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    amount_cents = db.Column(db.Integer, nullable=False)
+    frequency = db.Column(db.String(10), nullable=False)  # 'weekly', 'monthly', 'yearly' or 'days'
+    interval = db.Column(db.Integer, default=1, nullable=False)  # every N weeks/months/years/days
+    start_date = db.Column(db.Date, nullable=False)  # first occurrence; its day of month is the anchor
+    end_date = db.Column(db.Date, nullable=True)
+    # Occurrences up to and including this date already exist in ``bill``
+    materialized_until = db.Column(db.Date, nullable=True)
+
+    def __repr__(self):
+        return f'<BillRecurrence {self.name}: every {self.interval} {self.frequency}>'
+
+    @property
+    def amount(self):
+        """The amount as a Money value (stored as integer cents)"""
+        return Money(self.amount_cents) if self.amount_cents is not None else None
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_cents = Money.coerce(value).cents
+
+
+class BillReminder(db.Model):
+    """Record that a reminder went out for one bill's due date (see app/reminders.py)"""
+    __tablename__ = 'bill_reminder'
+
+    id = db.Column(db.Integer, primary_key=True)
+    bill_id = db.Column(db.Integer, db.ForeignKey('bill.id', ondelete='CASCADE'), nullable=False)
+    due_date = db.Column(db.Date, nullable=False)
+    outbox_email_id = db.Column(db.Integer, db.ForeignKey('outbox_email.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # One reminder per bill and due date; a rerun can never insert a second
+        db.UniqueConstraint('bill_id', 'due_date', name='uq_bill_reminder_bill_id_due_date'),
+    )
+
+    def __repr__(self):
+        return f'<BillReminder bill={self.bill_id} due={self.due_date}>'
+
 
 class Task(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -78,5 +219,50 @@ class Task(db.Model):
     due_date = db.Column(db.Date, nullable=True)
     completed = db.Column(db.Boolean, default=False, nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_task_user_id_completed_due_date', 'user_id', 'completed', 'due_date'),
+    )
+
     def __repr__(self):
-        return f'<Task {self.title}: {"Completed" if self.completed else "Pending"}>'
\ No newline at end of file
+        return f'<Task {self.title}: {"Completed" if self.completed else "Pending"}>'
+
+    @classmethod
+    def for_user(cls, user_id):
+        """Query a user's tasks (served by ix_task_user_id_completed_due_date)"""
+        return cls.query.filter_by(user_id=user_id)
+
+    @classmethod
+    def sort_keys(cls):
+        """Keyset ordering for the task list: pending first, then by due date"""
+        return [(cls.completed, False), (cls.due_date, False), (cls.id, False)]
+
+
+
+class OutboxEmail(db.Model):
+    """An outbound email waiting for (or finished with) background delivery"""
+    __tablename__ = 'outbox_email'
+
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    sender = db.Column(db.String(120), nullable=False)
+    recipients = db.Column(db.Text, nullable=False)  # comma-separated addresses
+    body = db.Column(db.Text, nullable=False)
+    html = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(10), default='pending', nullable=False)  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_outbox_email_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f'<OutboxEmail {self.id} {self.status}: {self.subject}>'
+
+    @property
+    def recipient_list(self):
+        """Return the recipients as a list of addresses"""
+        return [address for address in self.recipients.split(',') if address]
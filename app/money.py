@@ -0,0 +1,112 @@
+"""
+Money values stored as integer cents.
+
+Amounts live in the database as whole cents (``amount_cents``), so SQL
+``SUM`` is exact and rows compare as plain integers. ``Money`` is the thin
+value type the models, templates and forms use on top of that column.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import total_ordering
+
+from wtforms import DecimalField
+
+CENT = Decimal('0.01')
+
+
+@total_ordering
+class Money:
+    """An immutable amount of money in cents"""
+
+    __slots__ = ('cents',)
+
+    def __init__(self, cents=0):
+        object.__setattr__(self, 'cents', int(cents))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Money is immutable')
+
+    @classmethod
+    def from_decimal(cls, value):
+        """Build from a Decimal/str/int/float amount in dollars, rounding half up"""
+        try:
+            amount = Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+        except InvalidOperation:
+            raise ValueError(f'Not a valid amount: {value!r}')
+        return cls(int(amount * 100))
+
+    @classmethod
+    def coerce(cls, value):
+        """Accept a Money, or anything from_decimal understands"""
+        if isinstance(value, Money):
+            return value
+        return cls.from_decimal(value)
+
+    def to_decimal(self):
+        return (Decimal(self.cents) / 100).quantize(CENT)
+
+    def __float__(self):
+        return self.cents / 100
+
+    def __str__(self):
+        sign = '-' if self.cents < 0 else ''
+        dollars, cents = divmod(abs(self.cents), 100)
+        return f'{sign}{dollars}.{cents:02d}'
+
+    def __repr__(self):
+        return f'Money({str(self)!r})'
+
+    def __format__(self, spec):
+        return format(str(self), spec)
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.cents == other.cents
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.cents < other.cents
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.cents)
+
+    def __bool__(self):
+        return self.cents != 0
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents + other.cents)
+        return NotImplemented
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents - other.cents)
+        return NotImplemented
+
+    def __neg__(self):
+        return Money(-self.cents)
+
+
+class MoneyField(DecimalField):
+    """A form field whose data is a Money value"""
+
+    def __init__(self, label=None, validators=None, **kwargs):
+        super().__init__(label, validators, places=2, rounding=ROUND_HALF_UP, **kwargs)
+
+    def process_data(self, value):
+        if isinstance(value, Money):
+            value = value.to_decimal()
+        super().process_data(value)
+        if self.data is not None:
+            self.data = Money.from_decimal(self.data)
+
+    def process_formdata(self, valuelist):
+        super().process_formdata(valuelist)
+        if self.data is not None:
+            self.data = Money.from_decimal(self.data)
+
+    def _value(self):
+        if self.raw_data:
+            return self.raw_data[0]
+        return str(self.data) if self.data is not None else ''
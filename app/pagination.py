@@ -0,0 +1,186 @@
+"""
+Keyset (cursor) pagination for the per-user history lists.
+
+Pages seek on the list's sort keys, e.g. ``(date, id)``, instead of using
+OFFSET, so fetching page 500 costs the same as fetching page 1. Cursors are
+opaque URL-safe strings holding the sort-key values of the boundary row.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import and_, or_, false
+
+
+class KeysetPage:
+    """One page of results plus the cursors needed to move around it"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(row, sort_keys):
+    """Encode the sort-key values of a row as an opaque cursor string"""
+    values = []
+    for column, _ in sort_keys:
+        value = getattr(row, column.key)
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        values.append(value)
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_keys):
+    """Decode a cursor back into sort-key values, or None if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(sort_keys):
+            return None
+
+        decoded = []
+        for (column, _), value in zip(sort_keys, values):
+            python_type = column.type.python_type
+            if value is not None and python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif value is not None and python_type is date:
+                value = date.fromisoformat(value)
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError, UnicodeError):
+        return None
+
+
+def _after(column, descending, value):
+    """Predicate for rows strictly after ``value`` in one column's sort order.
+
+    SQLite sorts NULLs first ascending and last descending.
+    """
+    if isinstance(value, bool):
+        # Booleans only support equality, and there are just two values
+        if descending:
+            return column.is_(False) if value else false()
+        return false() if value else column.is_(True)
+    if descending:
+        if value is None:
+            return false()
+        return or_(column < value, column.is_(None)) if column.nullable else column < value
+    return column.isnot(None) if value is None else column > value
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _seek_predicate(sort_keys, values):
+    """Build (a > x) OR (a = x AND b > y) OR ... for a multi-column keyset"""
+    clauses = []
+    for i, (column, descending) in enumerate(sort_keys):
+        prefix = [_equal(col, val) for (col, _), val in zip(sort_keys[:i], values[:i])]
+        clauses.append(and_(*prefix, _after(column, descending, values[i])))
+    return or_(*clauses)
+
+
+def _later_values(column, descending, value):
+    """Predicates, in sort order, for each run of values after ``value`` that
+    an index can seek to on its own"""
+    if isinstance(value, bool):
+        return [column == (not value)] if value == descending else []
+    if value is None:
+        return [] if descending else [column.isnot(None)]
+    if descending:
+        return [column < value] + ([column.is_(None)] if column.nullable else [])
+    return [column > value]
+
+
+def _seek(query, sort_keys, values, limit):
+    """
+    Up to ``limit`` rows strictly after ``values`` in ``sort_keys`` order
+
+    The OR of the seek predicate alone leaves SQLite nothing to range-seek
+    on, so it scans every row ahead of the cursor. The leading column is
+    bounded too, e.g. ``date <= :d AND (date < :d OR (date = :d AND id < :id))``.
+    Where that bound cannot be a single range (booleans, NULLs, a nullable
+    column sorted descending), the rows tied with the cursor are read with
+    equality on the leading column, then each later run of values in turn.
+    """
+    (column, descending), value = sort_keys[0], values[0]
+    if isinstance(value, bool) or value is None or (descending and column.nullable):
+        rows = _seek(query.filter(_equal(column, value)), sort_keys[1:], values[1:], limit) if len(sort_keys) > 1 else []
+        for predicate in _later_values(column, descending, value):
+            if len(rows) >= limit:
+                break
+            rows += query.filter(predicate).order_by(*ordering(sort_keys)).limit(limit - len(rows)).all()
+        return rows
+
+    if len(sort_keys) == 1:
+        predicate = _after(column, descending, value)
+    else:
+        bound = column <= value if descending else column >= value
+        predicate = and_(bound, _seek_predicate(sort_keys, values))
+    return (query.filter(predicate)
+                 .order_by(*ordering(sort_keys))
+                 .limit(limit)
+                 .all())
+
+
+def ordering(sort_keys):
+    """ORDER BY clauses for a list of (column, descending) sort keys"""
+    return [column.desc() if descending else column.asc() for column, descending in sort_keys]
+
+
+def paginate_keyset(query, sort_keys, after=None, before=None, per_page=25):
+    """
+    Return a KeysetPage for ``query`` ordered by ``sort_keys``.
+
+    ``sort_keys`` is a list of ``(column, descending)`` pairs ending in a unique
+    column (normally the primary key). Pass ``after`` to fetch the page
+    following a cursor, or ``before`` to fetch the page preceding one.
+    """
+    before_values = decode_cursor(before, sort_keys) if before else None
+    after_values = decode_cursor(after, sort_keys) if after and before_values is None else None
+
+    if before_values is not None:
+        # Walk backwards from the cursor, then restore display order
+        reversed_keys = [(column, not descending) for column, descending in sort_keys]
+        rows = _seek(query, reversed_keys, before_values, per_page + 1)
+        if not rows:
+            # Nothing precedes the cursor any more; fall back to the first page
+            return paginate_keyset(query, sort_keys, per_page=per_page)
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if after_values is not None:
+            rows = _seek(query, sort_keys, after_values, per_page + 1)
+        else:
+            rows = query.order_by(*ordering(sort_keys)).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev = after_values is not None
+
+    if not items:
+        return KeysetPage(items)
+
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(items[-1], sort_keys) if has_next else None,
+        prev_cursor=encode_cursor(items[0], sort_keys) if has_prev else None,
+    )
@@ -0,0 +1,137 @@
+"""
+Bounded bcrypt hashing for Budget Beyond.
+
+bcrypt is deliberately slow (~250 ms at cost 12), and it releases the GIL
+while it works. Running it directly on request threads lets a burst of
+sign-ins occupy every worker thread at once. Instead, all hashing goes
+through a small thread pool with a fixed number of admission slots:
+
+- PASSWORD_HASH_WORKERS   hashes run at the same time
+- PASSWORD_HASH_MAX_QUEUE more may wait for a worker
+- beyond that, PASSWORD_HASH_POLICY decides: 'reject' fails immediately,
+  'wait' blocks for up to PASSWORD_HASH_TIMEOUT seconds for a slot first.
+
+Rejected calls raise PasswordHasherBusy, which the routes turn into a
+"try again" response.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from flask import current_app
+
+from app.instrumentation import timed
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool is saturated and the policy says no"""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded worker pool and keeps queue-depth metrics"""
+
+    POLICIES = ('wait', 'reject')
+
+    def __init__(self, rounds=12, max_workers=2, max_queue=8, policy='wait', timeout=5.0):
+        if policy not in self.POLICIES:
+            raise ValueError(f"PASSWORD_HASH_POLICY must be one of {self.POLICIES}, not {policy!r}")
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.policy = policy
+        self.timeout = timeout
+
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._waiting = 0  # blocked on an admission slot (wait policy)
+        self._in_flight = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _run(self, fn, *args):
+        if self.policy == 'reject':
+            admitted = self._slots.acquire(blocking=False)
+        else:
+            with self._lock:
+                self._waiting += 1
+            try:
+                admitted = self._slots.acquire(timeout=self.timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        if not admitted:
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHasherBusy('Password hashing is at capacity')
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            with timed('bcrypt'):
+                return self._executor.submit(self._track, fn, *args).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+            self._slots.release()
+
+    def _track(self, fn, *args):
+        with self._lock:
+            self._active += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def hash(self, password):
+        """Hash a password at the configured cost factor"""
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def check(self, password, password_hash):
+        """Check a password against a stored hash"""
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with a different cost factor than configured"""
+        try:
+            # Hashes look like $2b$12$<salt+digest>
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self):
+        """
+        Current pool metrics: running, waiting and lifetime counters
+
+        ``queued`` counts calls admitted but not yet running plus, under the
+        wait policy, callers still blocked on an admission slot.
+        """
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'active': self._active,
+                'queued': self._in_flight - self._active + self._waiting,
+                'completed': self._completed,
+                'rejected': self._rejected,
+            }
+
+
+def init_password_hasher(app):
+    """Create the app's password hashing pool from its config"""
+    app.extensions['password_hasher'] = PasswordHasher(
+        rounds=app.config['BCRYPT_ROUNDS'],
+        max_workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_queue=app.config['PASSWORD_HASH_MAX_QUEUE'],
+        policy=app.config['PASSWORD_HASH_POLICY'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT']
+    )
+
+
+def get_password_hasher():
+    """Return the password hashing pool for the current app"""
+    return current_app.extensions['password_hasher']
@@ -0,0 +1,142 @@
+"""
+Recurring bills.
+
+A BillRecurrence is a rule ("Rent, $1,200, monthly from Jan 31"). Its dated
+occurrences are ordinary ``bill`` rows, so the bill list, reminders, exports
+and pagination need no special cases. They are generated lazily: readers ask
+for a horizon date and ``materialize_recurrences`` inserts just the missing
+occurrences up to it, then records ``materialized_until`` on the rule so the
+next read does no work at all. Nothing is pre-generated for years ahead.
+
+Dates are always computed from the rule's start date rather than from the
+previous occurrence, so a rule anchored on the 31st lands on Feb 28/29 and
+then returns to the 31st in March, and a Feb 29 yearly bill falls on Feb 28
+in common years.
+"""
+import calendar
+from datetime import timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models import db, Bill, BillRecurrence
+
+RECURRENCE_FREQUENCIES = ('weekly', 'monthly', 'yearly', 'days')
+
+
+def add_months(anchor, months):
+    """``anchor`` moved by ``months``, clamping the day to the month's length"""
+    years, month_index = divmod(anchor.month - 1 + months, 12)
+    year = anchor.year + years
+    month = month_index + 1
+    return anchor.replace(year=year, month=month, day=min(anchor.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrences(frequency, interval, start_date, window_start, window_end, end_date=None):
+    """
+    Dates of a rule's occurrences within [window_start, window_end]
+
+    Jumps straight to the first occurrence in the window, so the cost is
+    proportional to the number of dates returned, not to the rule's age.
+    """
+    if frequency not in RECURRENCE_FREQUENCIES:
+        raise ValueError(f"frequency must be one of {RECURRENCE_FREQUENCIES}")
+    if interval < 1:
+        raise ValueError('interval must be at least 1')
+
+    last = min(window_end, end_date) if end_date else window_end
+    first = max(window_start, start_date)
+    if first > last:
+        return []
+
+    if frequency in ('weekly', 'days'):
+        step = interval * (7 if frequency == 'weekly' else 1)
+        k = -(-(first - start_date).days // step)  # ceiling division
+        current = start_date + timedelta(days=k * step)
+        dates = []
+        while current <= last:
+            dates.append(current)
+            current += timedelta(days=step)
+        return dates
+
+    step = interval * (12 if frequency == 'yearly' else 1)
+    months_from_start = (first.year - start_date.year) * 12 + first.month - start_date.month
+    k = months_from_start // step
+    dates = []
+    while True:
+        current = add_months(start_date, k * step)
+        if current > last:
+            return dates
+        if current >= first:
+            dates.append(current)
+        k += 1
+
+
+def rule_occurrences(rule, window_start, window_end):
+    """occurrences() for a BillRecurrence"""
+    return occurrences(rule.frequency, rule.interval, rule.start_date, window_start, window_end, rule.end_date)
+
+
+def materialize_recurrences(through, user_id=None):
+    """
+    Create the missing ``bill`` rows for recurring bills up to ``through``
+
+    Limited to one user's rules when ``user_id`` is given, otherwise every
+    rule that is behind. Rules already expanded that far are filtered out in
+    SQL, so the common case is one indexed query returning nothing. The
+    caller commits if anything changed. Returns the number of rules expanded.
+    """
+    query = BillRecurrence.query.filter(or_(
+        BillRecurrence.materialized_until.is_(None),
+        BillRecurrence.materialized_until < through
+    ))
+    if user_id is not None:
+        query = query.filter(BillRecurrence.user_id == user_id)
+
+    rows = []
+    expanded = 0
+    for rule in query:
+        if rule.materialized_until is None:
+            window_start = rule.start_date
+        else:
+            window_start = rule.materialized_until + timedelta(days=1)
+        rows.extend(
+            {
+                'user_id': rule.user_id,
+                'name': rule.name,
+                'amount_cents': rule.amount_cents,
+                'due_date': due_date,
+                'paid': False,
+                'recurrence_id': rule.id,
+            }
+            for due_date in rule_occurrences(rule, window_start, through)
+        )
+        rule.materialized_until = through
+        expanded += 1
+
+    if rows:
+        # A concurrent request may have expanded the same rule; keep its rows
+        stmt = sqlite_insert(Bill.__table__).on_conflict_do_nothing(
+            index_elements=['recurrence_id', 'due_date']
+        )
+        db.session.execute(stmt, rows)
+    db.session.flush()
+    return expanded
+
+
+def stop_recurrence(rule, after):
+    """
+    End a recurring bill: delete its unpaid occurrences due after ``after``
+    and the rule itself. Earlier occurrences stay as ordinary bills.
+    """
+    from app.models import BillReminder
+
+    future = db.session.query(Bill.id).filter(
+        Bill.recurrence_id == rule.id,
+        Bill.paid == False,  # noqa: E712
+        Bill.due_date > after
+    )
+    BillReminder.query.filter(BillReminder.bill_id.in_(future.scalar_subquery())).delete(synchronize_session=False)
+    Bill.query.filter(Bill.id.in_(future.scalar_subquery())).delete(synchronize_session=False)
+    Bill.query.filter_by(recurrence_id=rule.id).update({'recurrence_id': None}, synchronize_session=False)
+    db.session.delete(rule)
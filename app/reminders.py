@@ -0,0 +1,159 @@
+"""
+Bill reminder digests.
+
+``send_bill_reminders`` finds every unpaid bill due within the reminder
+window, for all users at once, in a single query served by
+``ix_bill_paid_due_date`` (one per shard when sharding is on). Bills are
+grouped per user, the batch's verified users are looked up in one query, and
+each of them gets one digest email listing all of their upcoming bills.
+
+Idempotency comes from ``bill_reminder``: one row per (bill, due date),
+written in the same transaction as the digest's outbox row. The query skips
+bills that already have a row, so running the job again (or from cron every
+hour) never sends the same reminder twice; if two runs race, the unique
+constraint makes the loser roll back instead of double-sending. Without
+SMTP configured (console mode) digests are printed on every run and nothing
+is recorded.
+
+Run it with ``flask send-bill-reminders`` from cron or a systemd timer.
+"""
+from datetime import date, timedelta
+from itertools import groupby
+
+from flask import current_app
+from sqlalchemy import exists, and_
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, User, Bill, BillReminder
+from app.money import Money
+from app.recurrence import materialize_recurrences
+from app.sharding import each_shard
+
+
+def due_bills_query(today, days):
+    """Unpaid bills due in [today, today + days] that have not been reminded, ordered by user"""
+    already_reminded = exists().where(and_(
+        BillReminder.bill_id == Bill.id,
+        BillReminder.due_date == Bill.due_date
+    ))
+    # No join with user: with sharding, bills and users live in different databases
+    return (
+        db.select(Bill.id, Bill.user_id, Bill.name, Bill.due_date, Bill.amount_cents)
+        .where(
+            Bill.paid == False,  # noqa: E712
+            Bill.due_date >= today,
+            Bill.due_date <= today + timedelta(days=days),
+            ~already_reminded
+        )
+        .order_by(Bill.user_id, Bill.due_date, Bill.id)
+    )
+
+
+def verified_users(user_ids):
+    """{user id: (id, email, first_name) row} for the verified users among ``user_ids``"""
+    rows = db.session.execute(
+        db.select(User.id, User.email, User.first_name)
+        .where(User.id.in_(user_ids), User.email_verified == True)  # noqa: E712
+    )
+    return {row.id: row for row in rows}
+
+
+def build_digest(user, rows):
+    """Template context for one user's digest from their due-bill rows"""
+    bills = [
+        {'name': row.name, 'due_date': row.due_date, 'amount': Money(row.amount_cents)}
+        for row in rows
+    ]
+    return user.email, {
+        'user_name': user.first_name,
+        'bills': bills,
+        'total': Money(sum(row.amount_cents for row in rows)),
+        'bills_url': 'http://127.0.0.1:5000/bills',
+    }
+
+
+def _deliver_chunk(digests, console):
+    """
+    Queue one chunk of digests and record their reminders in one transaction
+
+    ``digests`` is a list of (rows, address, context). Returns the number of
+    digests queued, or 0 if another run already reminded some of these bills.
+
+    In console mode the digests are only printed and no reminder rows are
+    written: a bill "reminded" that way would otherwise never be emailed
+    once SMTP is configured.
+    """
+    from app.email_service import get_email_template, queue_outbox
+
+    if console:
+        for rows, address, context in digests:
+            print(f"[EMAIL] BILL REMINDER (would be sent to {address}): "
+                  f"{len(rows)} bill(s) totalling ${context['total']}")
+        return len(digests)
+
+    messages = get_email_template('bill_reminder').build_messages(
+        [(address, context) for _, address, context in digests]
+    )
+    emails = queue_outbox(messages)
+    db.session.flush()
+    outbox_ids = [email.id for email in emails]
+
+    reminders = [
+        {'bill_id': row.id, 'due_date': row.due_date, 'outbox_email_id': outbox_id}
+        for (rows, _, _), outbox_id in zip(digests, outbox_ids)
+        for row in rows
+    ]
+    try:
+        db.session.execute(BillReminder.__table__.insert(), reminders)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        print("Skipped a batch of bill reminders already sent by another run")
+        return 0
+    return len(digests)
+
+
+def send_bill_reminders(today=None, days=None, batch_size=None):
+    """
+    Send one digest per user for their unpaid bills due in the next ``days``
+
+    Digests are committed ``batch_size`` users at a time. Returns
+    (users_reminded, bills_reminded).
+    """
+    from app.email_worker import notify_worker
+
+    config = current_app.config
+    today = today or date.today()
+    days = config['BILL_REMINDER_DAYS'] if days is None else days
+    batch_size = batch_size or config['BILL_REMINDER_BATCH_SIZE']
+    # Same development fallback as the transactional emails: print, don't send
+    console = config.get('TESTING') or not config.get('MAIL_USERNAME')
+
+    users = bills = 0
+    for _ in each_shard():
+        # Recurring bills only exist as rows once expanded; cover the window first
+        if materialize_recurrences(today + timedelta(days=days)):
+            db.session.commit()
+
+        # One query for every user; rows are plain tuples, not ORM objects
+        rows = db.session.execute(due_bills_query(today, days)).all()
+        grouped = [list(user_rows) for _, user_rows in groupby(rows, key=lambda row: row.user_id)]
+
+        for start in range(0, len(grouped), batch_size):
+            batch = grouped[start:start + batch_size]
+            recipients = verified_users([user_rows[0].user_id for user_rows in batch])
+            chunk = []
+            for user_rows in batch:
+                user = recipients.get(user_rows[0].user_id)
+                if user is not None:
+                    address, context = build_digest(user, user_rows)
+                    chunk.append((user_rows, address, context))
+            if not chunk:
+                continue
+            sent = _deliver_chunk(chunk, console)
+            users += sent
+            bills += sum(len(r) for r, _, _ in chunk) if sent else 0
+
+    if users and not console:
+        notify_worker(current_app._get_current_object())
+    return users, bills
@@ -0,0 +1,191 @@
+"""
+JSON representations of expenses, bills and tasks for the REST API.
+
+Each Resource knows how to serialize a model instance and how to validate
+an incoming JSON object into model attribute values, applying the same rules
+as the HTML forms in app/forms.py (categories, positive amounts, field
+lengths, required fields).
+"""
+from datetime import date
+
+from app.forms import EXPENSE_CATEGORIES
+from app.models import Expense, Bill, Task
+from app.money import Money
+
+
+class ValidationError(ValueError):
+    """Raised when a JSON payload does not describe a valid record"""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(f'{field}: {message}' for field, message in errors.items()))
+        self.errors = errors
+
+
+# ==========================================================================
+# FIELD PARSERS
+# ==========================================================================
+
+def parse_money(value):
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError('must be a number or a decimal string')
+    amount = Money.from_decimal(value)
+    if amount.cents <= 0:
+        raise ValueError('must be positive')
+    return amount
+
+
+def parse_date(value):
+    if not isinstance(value, str):
+        raise ValueError('must be a date in YYYY-MM-DD format')
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError('must be a date in YYYY-MM-DD format')
+
+
+def parse_bool(value):
+    if not isinstance(value, bool):
+        raise ValueError('must be true or false')
+    return value
+
+
+def text(max_length, required=True):
+    def parse(value):
+        if value is None and not required:
+            return None
+        if not isinstance(value, str):
+            raise ValueError('must be a string')
+        value = value.strip()
+        if required and not value:
+            raise ValueError('must not be empty')
+        if len(value) > max_length:
+            raise ValueError(f'must be at most {max_length} characters')
+        return value or None
+    return parse
+
+
+def choice(options):
+    def parse(value):
+        if value not in options:
+            raise ValueError(f"must be one of: {', '.join(options)}")
+        return value
+    return parse
+
+
+def serialize_date(value):
+    return value.isoformat() if value is not None else None
+
+
+# ==========================================================================
+# RESOURCES
+# ==========================================================================
+
+class Resource:
+    """How one model is exposed over the API"""
+
+    def __init__(self, model, fields, required, serialize):
+        self.model = model
+        self.fields = fields          # JSON field -> (model attribute, parser)
+        self.required = required      # fields a create must include
+        self.serialize = serialize
+
+    def validate(self, data, partial=False):
+        """
+        Turn a JSON object into {model attribute: value}
+
+        With ``partial`` (PATCH) only the given fields are checked; otherwise
+        every required field must be present. Raises ValidationError listing
+        every problem at once.
+        """
+        if not isinstance(data, dict):
+            raise ValidationError({'data': 'must be a JSON object'})
+
+        errors = {}
+        values = {}
+        for field in data:
+            if field not in self.fields:
+                errors[field] = 'is not a writable field'
+        if not partial:
+            for field in self.required:
+                if field not in data:
+                    errors[field] = 'is required'
+
+        for field, (attribute, parse) in self.fields.items():
+            if field not in data or field in errors:
+                continue
+            try:
+                values[attribute] = parse(data[field])
+            except ValueError as e:
+                errors[field] = str(e)
+
+        if errors:
+            raise ValidationError(errors)
+        return values
+
+
+def serialize_expense(expense):
+    return {
+        'id': expense.id,
+        'category': expense.category,
+        'amount': str(expense.amount),
+        'amount_cents': expense.amount_cents,
+        'date': serialize_date(expense.date),
+        'notes': expense.notes,
+    }
+
+
+def serialize_bill(bill):
+    return {
+        'id': bill.id,
+        'name': bill.name,
+        'amount': str(bill.amount),
+        'amount_cents': bill.amount_cents,
+        'due_date': serialize_date(bill.due_date),
+        'paid': bill.paid,
+        'recurrence_id': bill.recurrence_id,
+    }
+
+
+def serialize_task(task):
+    return {
+        'id': task.id,
+        'title': task.title,
+        'due_date': serialize_date(task.due_date),
+        'completed': task.completed,
+    }
+
+
+RESOURCES = {
+    'expenses': Resource(
+        Expense,
+        fields={
+            'category': ('category', choice(EXPENSE_CATEGORIES)),
+            'amount': ('amount', parse_money),
+            'date': ('date', parse_date),
+            'notes': ('notes', text(200, required=False)),
+        },
+        required=('category', 'amount', 'date'),
+        serialize=serialize_expense
+    ),
+    'bills': Resource(
+        Bill,
+        fields={
+            'name': ('name', text(100)),
+            'amount': ('amount', parse_money),
+            'due_date': ('due_date', parse_date),
+            'paid': ('paid', parse_bool),
+        },
+        required=('name', 'amount', 'due_date'),
+        serialize=serialize_bill
+    ),
+    'tasks': Resource(
+        Task,
+        fields={
+            'title': ('title', text(200)),
+            'due_date': ('due_date', parse_date),
+            'completed': ('completed', parse_bool),
+        },
+        required=('title', 'due_date'),
+        serialize=serialize_task
+    ),
+}
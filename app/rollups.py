@@ -0,0 +1,152 @@
+"""
+Incrementally maintained monthly expense rollups.
+
+``expense_monthly_rollup`` holds one row per (user_id, year_month, category)
+with the total and count of matching expenses, so dashboard and trend reads
+cost O(months) instead of O(rows).
+
+The table is kept in step by a session ``after_flush`` hook: whenever
+Expense objects are inserted, changed or deleted through the ORM, the
+matching rollup rows are adjusted on the same connection, inside the same
+transaction as the expense write. Code that writes the ``expense`` table
+with Core statements (bulk imports) must call ``apply_deltas`` itself.
+
+``flask rebuild-rollups`` recomputes the table from scratch and
+``flask rebuild-rollups --check`` compares it against the raw rows.
+"""
+from collections import defaultdict
+
+from sqlalchemy import event, func, inspect, delete, and_, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models import db, Expense, ExpenseMonthlyRollup
+from app.sharding import each_shard
+
+
+def year_month(value):
+    """'YYYY-MM' key for a date"""
+    return value.strftime('%Y-%m')
+
+
+def _old_value(state, attr):
+    """The value an attribute had before the pending change"""
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.obj(), attr)
+
+
+def collect_deltas(session):
+    """
+    Work out rollup changes for the Expense objects in a flush
+
+    Returns {(user_id, year_month, category): [total_cents_delta, count_delta]}.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+
+    def add(user_id, when, category, amount, count):
+        entry = deltas[(user_id, year_month(when), category)]
+        entry[0] += amount
+        entry[1] += count
+
+    for obj in session.new:
+        if isinstance(obj, Expense):
+            add(obj.user_id, obj.date, obj.category, obj.amount_cents, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Expense):
+            state = inspect(obj)
+            add(_old_value(state, 'user_id'), _old_value(state, 'date'),
+                _old_value(state, 'category'), -_old_value(state, 'amount_cents'), -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Expense) and session.is_modified(obj):
+            state = inspect(obj)
+            add(_old_value(state, 'user_id'), _old_value(state, 'date'),
+                _old_value(state, 'category'), -_old_value(state, 'amount_cents'), -1)
+            add(obj.user_id, obj.date, obj.category, obj.amount_cents, 1)
+
+    return {key: value for key, value in deltas.items() if value != [0, 0]}
+
+
+def apply_deltas(connection, deltas):
+    """Upsert rollup deltas and drop rows that no longer count any expense"""
+    if not deltas:
+        return
+
+    table = ExpenseMonthlyRollup.__table__
+    for (user_id, month, category), (total_cents, count) in deltas.items():
+        stmt = sqlite_insert(table).values(
+            user_id=user_id, year_month=month, category=category, total_cents=total_cents, count=count
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'year_month', 'category'],
+            set_={
+                'total_cents': table.c.total_cents + stmt.excluded.total_cents,
+                'count': table.c.count + stmt.excluded.count
+            }
+        )
+        connection.execute(stmt)
+
+    touched = [
+        and_(table.c.user_id == user_id, table.c.year_month == month, table.c.category == category)
+        for user_id, month, category in deltas
+    ]
+    connection.execute(delete(table).where(table.c.count <= 0, or_(*touched)))
+
+
+@event.listens_for(Session, 'after_flush')
+def _maintain_rollups(session, flush_context):
+    # Pending/dirty/deleted collections and attribute history still reflect
+    # the pre-flush state here, and we run inside the flush's transaction
+    deltas = collect_deltas(session)
+    if deltas:
+        apply_deltas(session.connection(bind_arguments={'mapper': ExpenseMonthlyRollup}), deltas)
+
+
+def rebuild_rollups():
+    """Recompute the whole rollup table from the expense table (in every shard)"""
+    table = ExpenseMonthlyRollup.__table__
+    month = func.strftime('%Y-%m', Expense.date)
+    source = (
+        db.select(Expense.user_id, month, Expense.category, func.sum(Expense.amount_cents), func.count(Expense.id))
+        .group_by(Expense.user_id, month, Expense.category)
+    )
+    for _ in each_shard():
+        db.session.execute(delete(table))
+        db.session.execute(
+            table.insert().from_select(['user_id', 'year_month', 'category', 'total_cents', 'count'], source)
+        )
+        db.session.commit()
+
+
+def find_mismatches():
+    """
+    Compare the rollup table with a fresh aggregate of the expense table
+
+    Returns a list of (key, expected, actual) tuples where expected/actual
+    are (total_cents, count) pairs, or None for a missing row.
+    """
+    month = func.strftime('%Y-%m', Expense.date)
+    expected = {}
+    actual = {}
+    for _ in each_shard():
+        expected.update(
+            ((row[0], row[1], row[2]), (row[3], row[4]))
+            for row in db.session.execute(
+                db.select(Expense.user_id, month, Expense.category, func.sum(Expense.amount_cents), func.count(Expense.id))
+                .group_by(Expense.user_id, month, Expense.category)
+            )
+        )
+        actual.update(
+            ((row.user_id, row.year_month, row.category), (row.total_cents, row.count))
+            for row in db.session.execute(db.select(ExpenseMonthlyRollup.__table__))
+        )
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        want, got = expected.get(key), actual.get(key)
+        if want != got:
+            mismatches.append((key, want, got))
+    return mismatches
@@ -17,6 +17,8 @@ Version: 3.0 - Cleaned & Documented
 """
 
 # Flask Core Imports
+from datetime import date, timedelta
+
 from flask import (
     request,        # Access request data (cookies, forms, etc.)
     make_response,  # Create HTTP responses with custom headers/cookies
@@ -25,18 +27,55 @@ from flask import (
     session,        # Flask's secure session management
     Blueprint,      # Application component organization
     render_template, # Render Jinja2 templates
-    flash          # Display one-time messages to users
+    flash,         # Display one-time messages to users
+    abort,         # Raise HTTP errors (e.g. 403 for other users' records)
+    current_app,   # Access app configuration
+    Response,      # Build streaming responses (exports)
+    stream_with_context  # Keep the request context alive while streaming
 )
 
 # Application Imports
-from app.auth import login_required, email_verification_required
-from app.forms import SignupForm, SigninForm, ExpenseForm, BillForm, TaskForm
-from app.models import db, User, Expense, Bill, Task
-from app.email_service import send_verification_email, send_welcome_email
+from app.auth import login_required, email_verification_required, get_current_user, invalidate_email_verified
+from app.caching import conditional_page
+from app.forms import SignupForm, SigninForm, ExpenseForm, ImportExpensesForm, BillForm, TaskForm
+from app.models import db, User, Expense, Bill, BillRecurrence, BillReminder, Task
+from app.exporter import export_stream, EXPORTS, EXPORT_FORMATS
+from app.importer import import_expenses as run_expense_import, detect_format, open_text, ImportFormatError
+from app.pagination import paginate_keyset
+from app.recurrence import materialize_recurrences, stop_recurrence
+from app.search import search as run_search, SEARCH_INDEXES
+from app.forecast import spending_forecast
+from app.passwords import PasswordHasherBusy
 
 # Create Blueprint for main application routes
 bp = Blueprint('main', __name__)
 
+# ==========================================================================
+# HELPERS
+# ==========================================================================
+
+def bills_horizon():
+    """Last due date recurring bills are generated up to when bills are read"""
+    return date.today() + timedelta(days=current_app.config['BILL_RECURRENCE_HORIZON_DAYS'])
+
+def list_page(model, user_id):
+    """
+    Fetch one keyset page of a user's records for a history list
+
+    Reads the ``after``/``before`` cursors and an optional ``per_page`` from the
+    query string. Page size defaults to LIST_PAGE_SIZE and is capped at
+    LIST_MAX_PAGE_SIZE.
+    """
+    per_page = request.args.get('per_page', current_app.config['LIST_PAGE_SIZE'], type=int)
+    per_page = max(1, min(per_page, current_app.config['LIST_MAX_PAGE_SIZE']))
+    return paginate_keyset(
+        model.for_user(user_id),
+        model.sort_keys(),
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=per_page
+    )
+
 # ==========================================================================
 # MAIN APPLICATION ROUTES
 # ==========================================================================
@@ -64,9 +103,27 @@ def home():
     - Personalized welcome message with user's first name
     - Dynamic page title for navbar animation
     """
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     return render_template('home.html', user=user)
 
+@bp.route('/dashboard')
+@login_required
+@email_verification_required
+@conditional_page
+def dashboard():
+    """
+    Spending dashboard
+
+    Features:
+    - Month-end projection, in total and per category
+    - Moving average of daily spending per category
+    - Unusually large recent expenses (see app/forecast.py)
+    """
+    user = get_current_user()
+    forecast = spending_forecast(user.id)
+    return render_template('dashboard.html', user=user, forecast=forecast,
+                           window=current_app.config['FORECAST_WINDOW_DAYS'])
+
 # ==========================================================================
 # AUTHENTICATION ROUTES
 # ==========================================================================
@@ -109,7 +166,11 @@ def signup():
         )
         
         # Securely hash and store password
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except PasswordHasherBusy:
+            flash('We are handling a lot of requests right now. Please try again in a moment.', 'error')
+            return render_template('signup.html', form=form), 503
         
         # Attempt to save user to database
         try:
@@ -120,7 +181,8 @@ def signup():
             session['user_id'] = user.id
             session['user_name'] = user.full_name
             
-            # Send email verification
+            # Send email verification (Flask-Mail loads on first use)
+            from app.email_service import send_verification_email
             verification_token = user.generate_verification_token()
             email_sent = send_verification_email(user.email, user.full_name, verification_token)
             
@@ -152,7 +214,22 @@ def signin():
         # Find user by email
         user = User.query.filter_by(email=email).first()
         
-        if user and user.check_password(password):
+        try:
+            password_ok = user is not None and user.check_password(password)
+        except PasswordHasherBusy:
+            flash('We are handling a lot of sign-ins right now. Please try again in a moment.', 'error')
+            return render_template('signin.html', form=form), 503
+        
+        if password_ok:
+            # Transparently upgrade hashes made with an old BCRYPT_ROUNDS;
+            # best effort, so a busy hasher just leaves it for the next sign-in
+            if user.password_needs_rehash():
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                except PasswordHasherBusy:
+                    pass
+
             # Log the user in
             session['user_id'] = user.id
             session['user_name'] = user.full_name
@@ -174,7 +251,7 @@ def logout():
 @login_required
 def verify_email_notice():
     """Show notice that user needs to verify their email"""
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     if user and user.email_verified:
         return redirect(url_for('main.home'))
     return render_template('verify_email_notice.html', user=user)
@@ -195,8 +272,10 @@ def verify_email(token):
     # Verify the email
     user.email_verified = True
     db.session.commit()
+    invalidate_email_verified(user.id)
     
     # Send welcome email now that email is verified
+    from app.email_service import send_welcome_email
     send_welcome_email(user.email, user.full_name)
     
     flash('Email verified successfully! Welcome to Budget Beyond!', 'success')
@@ -212,13 +291,14 @@ def verify_email(token):
 @login_required
 def resend_verification():
     """Resend verification email"""
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     
     if user and user.email_verified:
         flash('Your email is already verified.', 'info')
         return redirect(url_for('main.home'))
     
     if user:
+        from app.email_service import send_verification_email
         verification_token = user.generate_verification_token()
         email_sent = send_verification_email(user.email, user.full_name, verification_token)
         
@@ -234,7 +314,7 @@ def resend_verification():
 @email_verification_required
 def settings():
     """Settings page for user preferences"""
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     return render_template('settings.html', user=user)
 
 # ==========================================================================
@@ -244,6 +324,7 @@ def settings():
 @bp.route('/expenses', methods=['GET', 'POST'])
 @login_required
 @email_verification_required
+@conditional_page
 def expenses():
     """
     Expenses page
@@ -253,7 +334,7 @@ def expenses():
     - Add, edit, and delete expenses
     - Visualize spending trends
     """
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     form = ExpenseForm()
 
     if form.validate_on_submit():
@@ -270,13 +351,84 @@ def expenses():
         flash('Expense added successfully!', 'success')
         return redirect(url_for('main.expenses'))
 
-    # Fetch all expenses for the user
-    expenses = Expense.query.filter_by(user_id=user.id).all()
-    return render_template('expenses.html', user=user, form=form, expenses=expenses)
+    # Fetch one page of expenses for the user
+    page = list_page(Expense, user.id)
+    return render_template('expenses.html', user=user, form=form, expenses=page.items, page=page)
+
+@bp.route('/expenses/edit/<int:expense_id>', methods=['GET', 'POST'])
+@login_required
+@email_verification_required
+def edit_expense(expense_id):
+    """Edit an existing expense"""
+    user = get_current_user()
+    expense = Expense.query.get_or_404(expense_id)
+    if expense.user_id != user.id:
+        abort(403)
+    form = ExpenseForm(obj=expense)
+
+    if form.validate_on_submit():
+        # Monthly rollups are adjusted automatically on flush (app/rollups.py)
+        expense.category = form.category.data
+        expense.amount = form.amount.data
+        expense.date = form.date.data
+        expense.notes = form.notes.data
+        db.session.commit()
+        flash('Expense updated successfully!', 'success')
+        return redirect(url_for('main.expenses'))
+
+    return render_template('edit_expense.html', user=user, form=form, expense=expense)
+
+@bp.route('/expenses/delete/<int:expense_id>', methods=['POST'])
+@login_required
+@email_verification_required
+def delete_expense(expense_id):
+    """Delete an expense"""
+    expense = Expense.query.get_or_404(expense_id)
+    if expense.user_id != session['user_id']:
+        abort(403)
+    db.session.delete(expense)
+    db.session.commit()
+    flash('Expense deleted successfully!', 'success')
+    return redirect(url_for('main.expenses'))
+
+@bp.route('/expenses/import', methods=['GET', 'POST'])
+@login_required
+@email_verification_required
+def import_expenses():
+    """
+    Bulk-import expenses from a bank export (CSV or OFX)
+
+    The upload is parsed as a stream and inserted in batches; see app/importer.py.
+    """
+    user = get_current_user()
+    form = ImportExpensesForm()
+
+    if form.validate_on_submit():
+        upload = form.file.data
+        try:
+            result = run_expense_import(
+                user.id,
+                open_text(upload.stream),
+                file_format=detect_format(upload.filename),
+                default_category=form.default_category.data
+            )
+        except ImportFormatError as e:
+            flash(f'Could not import {upload.filename}: {e}', 'danger')
+            return render_template('import_expenses.html', user=user, form=form, result=None)
+
+        flash(
+            f'Imported {result.imported} expense(s) in {result.seconds:.2f}s '
+            f'({result.rows_per_second:.0f} rows/sec).',
+            'success' if not result.error_count else 'warning'
+        )
+        return render_template('import_expenses.html', user=user, form=form, result=result)
+
+    return render_template('import_expenses.html', user=user, form=form, result=None)
 
 @bp.route('/bills', methods=['GET', 'POST'])
 @login_required
 @email_verification_required
+@conditional_page
 def bills():
     """
     Bills page
@@ -284,32 +436,98 @@ def bills():
     Features:
     - Manage recurring bills
     - Track due dates and payment status
-    - Send reminders for upcoming bills
+    - Send reminders for upcoming bills (flask send-bill-reminders)
     """
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     form = BillForm()
 
     if form.validate_on_submit():
-        # Create a new bill
-        bill = Bill(
-            user_id=user.id,
-            name=form.name.data,
-            amount=form.amount.data,
-            due_date=form.due_date.data,
-            paid=(form.status.data == 'Paid')
-        )
-        db.session.add(bill)
+        if form.repeat.data:
+            # A recurring bill: store the rule; its first occurrences are created below
+            recurrence = BillRecurrence(
+                user_id=user.id,
+                name=form.name.data,
+                amount=form.amount.data,
+                frequency=form.repeat.data,
+                interval=form.repeat_every.data or 1,
+                start_date=form.due_date.data,
+                end_date=form.repeat_until.data
+            )
+            db.session.add(recurrence)
+            db.session.flush()
+            materialize_recurrences(bills_horizon(), user_id=user.id)
+            if form.status.data == 'Paid':
+                Bill.query.filter_by(recurrence_id=recurrence.id, due_date=recurrence.start_date).update({'paid': True})
+        else:
+            # Create a new bill
+            bill = Bill(
+                user_id=user.id,
+                name=form.name.data,
+                amount=form.amount.data,
+                due_date=form.due_date.data,
+                paid=(form.status.data == 'Paid')
+            )
+            db.session.add(bill)
         db.session.commit()
         flash('Bill added successfully!', 'success')
         return redirect(url_for('main.bills'))
 
-    # Fetch all bills for the user
-    bills = Bill.query.filter_by(user_id=user.id).all()
-    return render_template('bills.html', user=user, form=form, bills=bills)
+    # Generate any recurring bill occurrences that are now inside the horizon
+    if materialize_recurrences(bills_horizon(), user_id=user.id):
+        db.session.commit()
+
+    # Fetch one page of bills for the user
+    page = list_page(Bill, user.id)
+    return render_template('bills.html', user=user, form=form, bills=page.items, page=page)
+
+@bp.route('/bills/stop-repeating/<int:bill_id>', methods=['POST'])
+@login_required
+@email_verification_required
+def stop_repeating_bill(bill_id):
+    """Stop a recurring bill; occurrences due up to this one are kept"""
+    bill = Bill.query.get_or_404(bill_id)
+    if bill.user_id != session['user_id']:
+        abort(403)
+    recurrence = db.session.get(BillRecurrence, bill.recurrence_id) if bill.recurrence_id else None
+    if recurrence is None:
+        abort(404)
+    stop_recurrence(recurrence, after=bill.due_date)
+    db.session.commit()
+    flash('Bill will no longer repeat.', 'success')
+    return redirect(url_for('main.bills'))
+
+@bp.route('/bills/pay/<int:bill_id>', methods=['POST'])
+@login_required
+@email_verification_required
+def pay_bill(bill_id):
+    """Mark a bill as paid"""
+    bill = Bill.query.get_or_404(bill_id)
+    if bill.user_id != session['user_id']:
+        abort(403)
+    bill.paid = True
+    db.session.commit()
+    flash('Bill marked as paid!', 'success')
+    return redirect(url_for('main.bills'))
+
+@bp.route('/bills/delete/<int:bill_id>', methods=['POST'])
+@login_required
+@email_verification_required
+def delete_bill(bill_id):
+    """Delete a bill and its reminder records"""
+    bill = Bill.query.get_or_404(bill_id)
+    if bill.user_id != session['user_id']:
+        abort(403)
+    # SQLite does not enforce the ON DELETE CASCADE, and bill ids can be reused
+    BillReminder.query.filter_by(bill_id=bill.id).delete()
+    db.session.delete(bill)
+    db.session.commit()
+    flash('Bill deleted successfully!', 'success')
+    return redirect(url_for('main.bills'))
 
 @bp.route('/tasks', methods=['GET', 'POST'])
 @login_required
 @email_verification_required
+@conditional_page
 def tasks():
     """
     Tasks page
@@ -319,7 +537,7 @@ def tasks():
     - Add, edit, and delete tasks
     - Filter tasks by status or due date
     """
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     form = TaskForm()
 
     if form.validate_on_submit():
@@ -335,9 +553,9 @@ def tasks():
         flash('Task added successfully!', 'success')
         return redirect(url_for('main.tasks'))
 
-    # Fetch all tasks for the user
-    tasks = Task.query.filter_by(user_id=user.id).all()
-    return render_template('tasks.html', user=user, form=form, tasks=tasks)
+    # Fetch one page of tasks for the user
+    page = list_page(Task, user.id)
+    return render_template('tasks.html', user=user, form=form, tasks=page.items, page=page)
 
 @bp.route('/tasks/complete/<int:task_id>', methods=['POST'])
 @login_required
@@ -363,4 +581,65 @@ def delete_task(task_id):
     db.session.delete(task)
     db.session.commit()
     flash('Task deleted successfully!', 'success')
-    return redirect(url_for('main.tasks'))
\ No newline at end of file
+    return redirect(url_for('main.tasks'))
+
+# ==========================================================================
+# SEARCH
+# ==========================================================================
+
+@bp.route('/search')
+@login_required
+@email_verification_required
+def search():
+    """
+    Full-text search across the user's expenses, bills and tasks
+
+    ``q`` is the query; ``kind`` optionally limits results to expenses,
+    bills or tasks. Results are ranked by relevance (see app/search.py).
+    """
+    user = get_current_user()
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('kind')
+    kinds = [kind] if kind in SEARCH_INDEXES else None
+    results = run_search(user.id, query, kinds=kinds, limit=current_app.config['SEARCH_RESULTS_LIMIT']) if query else []
+    response = make_response(render_template('search.html', user=user, query=query, kind=kind, kinds=list(SEARCH_INDEXES), results=results))
+    # The page echoes q next to the user's records; compressing it would let
+    # the size leak them (see app/compression.py)
+    response.cache_control.no_transform = True
+    return response
+
+# ==========================================================================
+# DATA EXPORT
+# ==========================================================================
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+@bp.route('/export/<kind>.<file_format>')
+@login_required
+@email_verification_required
+def export_data(kind, file_format):
+    """
+    Download all of a user's expenses, bills or tasks as CSV or JSON Lines
+
+    Rows are streamed from the database as they are encoded (app/exporter.py),
+    so memory use stays flat. Add ``?gzip=1`` to download a .gz file
+    compressed on the fly.
+    """
+    if kind not in EXPORTS or file_format not in EXPORT_FORMATS:
+        abort(404)
+
+    compress = request.args.get('gzip', type=int) == 1
+    filename = f'{kind}.{file_format}' + ('.gz' if compress else '')
+    stream = export_stream(
+        kind, file_format, session['user_id'],
+        compress=compress, yield_per=current_app.config['EXPORT_YIELD_PER']
+    )
+    response = Response(
+        stream_with_context(stream),
+        mimetype='application/gzip' if compress else EXPORT_MIMETYPES[file_format]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
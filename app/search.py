@@ -0,0 +1,268 @@
+"""
+Full-text search over expense notes, bill names and task titles.
+
+On SQLite each searchable table has an FTS5 shadow table (``expense_fts``,
+``bill_fts``, ``task_fts``) whose rowid is the source row's id. Triggers on
+the source tables keep them in sync, so ORM writes, Core bulk inserts and
+raw SQL are all indexed in the same transaction with no application code.
+The tables and triggers are created by a migration, and by ``db.create_all``
+through the DDL listeners below. They use ``detail=column``: searches never
+need phrase positions, and the smaller posting lists merge faster.
+
+Every FTS row also carries a ``user_key`` token (``u<user_id>``). A search
+matches on that token as well as on the user's terms, so FTS5 intersects
+the two posting lists and never ranks other users' rows, even for words
+that are common across the whole table.
+
+``flask rebuild-search-index`` recreates the tables and triggers and
+reindexes everything from the source tables. Databases other than SQLite
+fall back to a LIKE scan with the same result shape.
+
+With sharding (app/sharding.py) the FTS tables live next to their source
+tables in each shard, so the raw SQL here names its model for routing.
+"""
+import re
+
+from flask import current_app
+from markupsafe import Markup, escape
+from sqlalchemy import DDL, event, text, or_
+
+from app.models import db, Expense, Bill, Task
+from app.money import Money
+from app.sharding import each_shard
+
+MAX_TERMS = 8
+SNIPPET_LENGTH = 80
+
+
+class SearchIndex:
+    """The FTS5 shadow table for one source table"""
+
+    def __init__(self, kind, model, searchable, weights):
+        self.kind = kind
+        self.model = model
+        self.table = model.__tablename__
+        self.fts_table = f'{self.table}_fts'
+        self.searchable = searchable    # source columns indexed under the same names
+        self.weights = weights          # bm25 weight per searchable column
+
+    def values(self, row_alias):
+        """SQL for the indexed values of a source row; NULL text is indexed as ''"""
+        return ', '.join(f"coalesce({row_alias}.{column}, '')" for column in self.searchable)
+
+    def ddl(self):
+        """CREATE statements for the FTS table and its three sync triggers"""
+        columns = ', '.join(('user_key',) + self.searchable)
+        watched = ', '.join(('user_id',) + self.searchable)
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5("
+            f"{columns}, tokenize='unicode61 remove_diacritics 2', prefix='2 3', detail=column)",
+
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ai AFTER INSERT ON {self.table} BEGIN "
+            f"INSERT INTO {self.fts_table} (rowid, {columns}) "
+            f"VALUES (new.id, 'u' || new.user_id, {self.values('new')}); END",
+
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ad AFTER DELETE ON {self.table} BEGIN "
+            f"DELETE FROM {self.fts_table} WHERE rowid = old.id; END",
+
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_au AFTER UPDATE OF {watched} ON {self.table} BEGIN "
+            f"DELETE FROM {self.fts_table} WHERE rowid = old.id; "
+            f"INSERT INTO {self.fts_table} (rowid, {columns}) "
+            f"VALUES (new.id, 'u' || new.user_id, {self.values('new')}); END",
+        ]
+
+
+SEARCH_INDEXES = {
+    'expenses': SearchIndex('expenses', Expense, searchable=('category', 'notes'), weights=(1.0, 2.0)),
+    'bills': SearchIndex('bills', Bill, searchable=('name',), weights=(1.0,)),
+    'tasks': SearchIndex('tasks', Task, searchable=('title',), weights=(1.0,)),
+}
+
+
+# create_all builds the FTS tables and triggers with the source tables
+for _index in SEARCH_INDEXES.values():
+    for _statement in _index.ddl():
+        event.listen(_index.model.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+    event.listen(
+        _index.model.__table__, 'before_drop',
+        DDL(f'DROP TABLE IF EXISTS {_index.fts_table}').execute_if(dialect='sqlite')
+    )
+
+
+# ==========================================================================
+# QUERIES
+# ==========================================================================
+
+def search_terms(query):
+    """The words of a search box query, lowercased, at most MAX_TERMS"""
+    return [term.lower() for term in re.findall(r'[^\W_]+', query or '')][:MAX_TERMS]
+
+
+def match_expression(index, user_id, terms):
+    """
+    FTS5 MATCH string: the user's key AND every term (prefix match) in the
+    searchable columns. Terms are quoted, so FTS5 syntax in the input is inert.
+    """
+    phrases = ' '.join(f'"{term}"*' for term in terms)
+    return f'user_key:u{user_id} AND {{{" ".join(index.searchable)}}}:({phrases})'
+
+
+def snippet(value, terms, length=SNIPPET_LENGTH):
+    """
+    HTML-safe excerpt of ``value`` around the first matched word, with every
+    word starting with one of ``terms`` wrapped in <mark>
+
+    Built from the loaded record rather than FTS5's snippet(), which would
+    run for every match before the LIMIT applies.
+    """
+    value = value or ''
+    pattern = re.compile(r'\b(?:' + '|'.join(re.escape(term) for term in terms) + r')\w*', re.IGNORECASE)
+    first = pattern.search(value)
+    start = max(0, first.start() - length // 3) if first else 0
+    excerpt = value[start:start + length]
+
+    parts = []
+    position = 0
+    for match in pattern.finditer(excerpt):
+        parts.append(escape(excerpt[position:match.start()]))
+        parts.append(Markup('<mark>%s</mark>') % match.group())
+        position = match.end()
+    parts.append(escape(excerpt[position:]))
+
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + length < len(value) else ''
+    return Markup(prefix) + Markup('').join(parts) + Markup(suffix)
+
+
+def fts_available():
+    """True if the FTS5 tables exist in the app's database (checked once per app)"""
+    available = current_app.extensions.get('fts_available')
+    if available is None:
+        available = False
+        if db.engine.dialect.name == 'sqlite':
+            names = {index.fts_table for index in SEARCH_INDEXES.values()}
+            found = db.session.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%\\_fts' ESCAPE '\\'"),
+                bind_arguments={'mapper': Expense}
+            ).scalars().all()
+            available = names <= set(found)
+        current_app.extensions['fts_available'] = available
+    return available
+
+
+def result(kind, record, terms, rank):
+    """One search hit, shaped the same for FTS and LIKE results"""
+    index = SEARCH_INDEXES[kind]
+    text_value = next((getattr(record, column) for column in reversed(index.searchable) if getattr(record, column)), '')
+    if kind == 'expenses':
+        title = record.category
+        when = record.date
+        amount = Money(record.amount_cents)
+    elif kind == 'bills':
+        title = record.name
+        when = record.due_date
+        amount = Money(record.amount_cents)
+    else:
+        title = record.title
+        when = record.due_date
+        amount = None
+    return {
+        'kind': kind,
+        'id': record.id,
+        'title': title,
+        'date': when,
+        'amount': amount,
+        'snippet': snippet(text_value, terms),
+        'rank': rank,
+    }
+
+
+def search_fts(user_id, terms, kinds, limit):
+    hits = []
+    for kind in kinds:
+        index = SEARCH_INDEXES[kind]
+        rows = db.session.execute(
+            text(
+                f"SELECT rowid AS id, bm25({index.fts_table}, 0.0, {', '.join(str(w) for w in index.weights)}) AS rank "
+                f"FROM {index.fts_table} WHERE {index.fts_table} MATCH :match "
+                f"ORDER BY rank LIMIT :limit"
+            ),
+            {'match': match_expression(index, user_id, terms), 'limit': limit},
+            bind_arguments={'mapper': index.model}
+        ).all()
+        if not rows:
+            continue
+        # Primary key lookups only: adding user_id to the WHERE clause makes
+        # SQLite walk the user's whole (user_id, date) index range instead
+        records = {
+            record.id: record
+            for record in index.model.query.filter(index.model.id.in_([row.id for row in rows]))
+            if record.user_id == user_id
+        }
+        hits.extend(
+            result(kind, records[row.id], terms, row.rank)
+            for row in rows if row.id in records
+        )
+    return hits
+
+
+def search_like(user_id, terms, kinds, limit):
+    """LIKE '%term%' scan with the same results shape (non-SQLite databases, benchmarks)"""
+    hits = []
+    for kind in kinds:
+        index = SEARCH_INDEXES[kind]
+        model = index.model
+        columns = [getattr(model, column) for column in index.searchable]
+        query = model.query.filter(model.user_id == user_id)
+        for term in terms:
+            query = query.filter(or_(*[column.ilike(f'%{term}%') for column in columns]))
+        hits.extend(result(kind, record, terms, 0.0) for record in query.order_by(model.id.desc()).limit(limit))
+    return hits
+
+
+def search(user_id, query, kinds=None, limit=20):
+    """
+    Best-matching records for a search box query, across ``kinds``
+
+    Returns at most ``limit`` hits ordered by relevance (bm25). Each hit has
+    the record's kind, id, title, date, amount and an HTML-safe snippet with
+    matched words wrapped in <mark>. Each term matches words it starts.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    kinds = [kind for kind in (kinds or SEARCH_INDEXES) if kind in SEARCH_INDEXES]
+    if fts_available():
+        hits = search_fts(user_id, terms, kinds, limit)
+    else:
+        hits = search_like(user_id, terms, kinds, limit)
+    hits.sort(key=lambda hit: hit['rank'])
+    return hits[:limit]
+
+
+# ==========================================================================
+# MAINTENANCE
+# ==========================================================================
+
+def rebuild_search_index():
+    """
+    Drop and recreate every FTS table and trigger, then reindex from the
+    source tables (in every shard); returns {kind: rows indexed}
+    """
+    counts = dict.fromkeys(SEARCH_INDEXES, 0)
+    for _ in each_shard():
+        for kind, index in SEARCH_INDEXES.items():
+            connection = db.session.connection(bind_arguments={'mapper': index.model})
+            columns = ', '.join(('user_key',) + index.searchable)
+            connection.execute(text(f'DROP TABLE IF EXISTS {index.fts_table}'))
+            for statement in index.ddl():
+                connection.execute(text(statement))
+            connection.execute(text(
+                f"INSERT INTO {index.fts_table} (rowid, {columns}) "
+                f"SELECT id, 'u' || user_id, {index.values(index.table)} FROM {index.table}"
+            ))
+            connection.execute(text(f"INSERT INTO {index.fts_table} ({index.fts_table}) VALUES ('optimize')"))
+            counts[kind] += connection.execute(text(f'SELECT count(*) FROM {index.fts_table}')).scalar()
+        db.session.commit()
+    current_app.extensions.pop('fts_available', None)
+    return counts
@@ -0,0 +1,319 @@
+"""
+Optional per-user sharding of the SQLite database.
+
+SQLite has one write lock per database file, so with a single file every
+commit waits for every other user's commit. With SHARDING_ENABLED, each
+user's expenses, bills (with their recurrence rules and reminders), tasks,
+monthly rollups and search index live in one of SHARD_COUNT shard files,
+chosen by ``user_id % SHARD_COUNT``, together with the user's data version
+(``user_data_version``), so saving them never writes to the central
+database. Users and the email outbox stay in the central database
+(SQLALCHEMY_DATABASE_URI). Users on different shards then commit in
+parallel.
+
+The shards are Flask-SQLAlchemy binds (``shard0``, ``shard1``, ...), so they
+get the same PRAGMAs, pooling and SQL timing as the central engine.
+``RoutingSession.get_bind`` sends every statement on a sharded table to the
+active shard:
+
+- in a request, the signed-in user's shard (``session['user_id']``);
+- elsewhere (CLI commands, jobs), the shard selected with ``use_shard``;
+  ``each_shard`` runs a block once per shard.
+
+Everything else goes to the central database. The rules that come with it:
+
+- raw SQL (``text()``) on sharded tables must pass
+  ``bind_arguments={'mapper': Model}``, since its tables cannot be seen;
+- a flush may only write rows of users on the active shard
+  (ShardRoutingError otherwise);
+- there are no joins between central and sharded tables; users are looked
+  up separately;
+- ids of sharded rows are unique within a shard, and are always read
+  together with the owner's user_id;
+- a commit touching both the central database and a shard commits them one
+  after the other, not atomically.
+
+``db.create_all()`` creates the shard schemas along with the central one,
+so a fresh install works as soon as init_db.py has run. ``flask
+split-shards`` copies an existing database's per-user rows into the shards.
+Alembic migrations only run against the central database.
+"""
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from flask import current_app, has_request_context, session as flask_session
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, func
+from sqlalchemy.sql.util import find_tables
+
+from app.config import engine_options
+
+# Tables holding per-user data; their FTS5 tables follow them through triggers
+SHARDED_TABLES = frozenset([
+    'expense', 'expense_monthly_rollup', 'bill', 'bill_recurrence', 'bill_reminder', 'task',
+    'user_data_version',
+])
+
+
+class ShardRoutingError(RuntimeError):
+    """A statement or flush cannot be sent to a single shard"""
+
+
+def bind_key(shard):
+    return f'shard{shard}'
+
+
+def sharding_enabled():
+    return current_app.config['SHARDING_ENABLED']
+
+
+def shard_for_user(user_id):
+    """The shard holding ``user_id``'s data, or None when sharding is off"""
+    if not sharding_enabled():
+        return None
+    return user_id % current_app.config['SHARD_COUNT']
+
+
+def shard_ids():
+    """Every shard number; [None] when sharding is off"""
+    if not sharding_enabled():
+        return [None]
+    return list(range(current_app.config['SHARD_COUNT']))
+
+
+def shard_bind(user_id):
+    """bind_arguments that send a statement to ``user_id``'s shard, whatever the active shard"""
+    from app.models import db
+
+    return {'bind': db.engines[bind_key(shard_for_user(user_id))]}
+
+
+def active_shard(session):
+    """The shard selected with use_shard, else the signed-in user's shard"""
+    shard = session.info.get('shard')
+    if shard is None and has_request_context():
+        user_id = flask_session.get('user_id')
+        if user_id is not None:
+            shard = shard_for_user(user_id)
+    return shard
+
+
+def is_sharded(mapper=None, clause=None):
+    """True if the ORM entity or Core statement reads or writes a sharded table"""
+    if mapper is not None:
+        return sa.inspect(mapper).local_table.name in SHARDED_TABLES
+    if clause is None:
+        return False
+    if isinstance(clause, sa.Table):
+        tables = [clause]
+    elif isinstance(clause, sa.sql.dml.UpdateBase):
+        tables = [clause.table]
+    else:
+        tables = find_tables(clause, include_joins=True)
+    return any(table.name in SHARDED_TABLES for table in tables)
+
+
+class RoutingSession(Session):
+    """db.session: statements on sharded tables go to the active shard's engine"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and sharding_enabled() and is_sharded(mapper, clause):
+            shard = active_shard(self)
+            if shard is None:
+                raise ShardRoutingError(
+                    'No shard selected: sign a user in or wrap the code in use_shard()'
+                )
+            return self._db.engines[bind_key(shard)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ShardedSQLAlchemy(SQLAlchemy):
+    """db: create_all and drop_all also cover the shard databases"""
+
+    def create_all(self, bind_key='__all__'):
+        super().create_all(bind_key)
+        if bind_key == '__all__' and sharding_enabled():
+            create_shard_tables()
+
+    def drop_all(self, bind_key='__all__'):
+        if bind_key == '__all__' and sharding_enabled():
+            drop_shard_tables()
+        super().drop_all(bind_key)
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _check_flush_shard(session, flush_context, instances):
+    if not sharding_enabled():
+        return
+    shard = active_shard(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        user_id = getattr(obj, 'user_id', None)
+        if user_id is None or getattr(obj, '__tablename__', None) not in SHARDED_TABLES:
+            continue
+        if shard_for_user(user_id) != shard:
+            raise ShardRoutingError(f'{obj!r} belongs to shard {shard_for_user(user_id)}, not the active shard {shard}')
+
+
+@contextmanager
+def use_shard(shard):
+    """
+    Route db.session's sharded statements to ``shard`` inside the block
+
+    Commit before switching: rows of different shards can share an id, so
+    sharded objects of the previous shard are expunged from the session.
+    """
+    from app.models import db
+
+    session = db.session()
+    previous = session.info.get('shard')
+    switching = shard != previous and sharding_enabled()
+    if switching:
+        _leave_shard(session)
+    session.info['shard'] = shard
+    try:
+        yield shard
+    except BaseException:
+        if switching:
+            _leave_shard(session, discard=True)
+        raise
+    else:
+        if switching:
+            _leave_shard(session)
+    finally:
+        session.info['shard'] = previous
+
+
+def _leave_shard(session, discard=False):
+    """Expunge the session's sharded objects; unflushed changes are an error unless ``discard``"""
+    sharded = [obj for obj in session if getattr(obj, '__tablename__', None) in SHARDED_TABLES]
+    changed = set(session.new) | set(session.dirty) | set(session.deleted)
+    if not discard and any(obj in changed for obj in sharded):
+        raise ShardRoutingError('Commit or roll back before switching shards')
+    for obj in sharded:
+        session.expunge(obj)
+
+
+def each_shard():
+    """Yield every shard number with db.session routed to it (once, None, when sharding is off)"""
+    for shard in shard_ids():
+        with use_shard(shard):
+            yield shard
+
+
+def init_sharding(app):
+    """Add one bind per shard to SQLALCHEMY_BINDS; must run before db.init_app"""
+    if not app.config['SHARDING_ENABLED']:
+        return
+    count = app.config['SHARD_COUNT']
+    if count < 1:
+        raise ValueError('SHARD_COUNT must be at least 1')
+
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for shard in range(count):
+        url = app.config['SHARD_DATABASE_URL'].format(shard=shard)
+        binds[bind_key(shard)] = dict(engine_options(url), url=url)
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+# ==========================================================================
+# SPLITTING AN EXISTING DATABASE
+# ==========================================================================
+
+def sharded_tables():
+    """The sharded tables, parents before children"""
+    from app.models import db
+
+    return [table for table in db.metadata.sorted_tables if table.name in SHARDED_TABLES]
+
+
+def create_shard_tables():
+    """Create the sharded tables (with their search tables and triggers) in every shard"""
+    from app.models import db
+
+    tables = sharded_tables()
+    for shard in shard_ids():
+        if shard is not None:
+            db.metadata.create_all(db.engines[bind_key(shard)], tables=tables)
+
+
+def drop_shard_tables():
+    """Drop the sharded tables from every shard"""
+    from app.models import db
+
+    tables = sharded_tables()
+    for shard in shard_ids():
+        if shard is not None:
+            db.metadata.drop_all(db.engines[bind_key(shard)], tables=tables)
+
+
+def owner_filter(table, shard):
+    """WHERE clause for the rows of ``table`` that belong on ``shard``"""
+    count = current_app.config['SHARD_COUNT']
+    if 'user_id' in table.c:
+        return table.c.user_id % count == shard
+    # Child rows (bill reminders) follow their parent row's user
+    for fk in table.foreign_keys:
+        parent = fk.column.table
+        if parent.name in SHARDED_TABLES and 'user_id' in parent.c:
+            owned = sa.select(fk.column).where(parent.c.user_id % count == shard)
+            return fk.parent.in_(owned)
+    raise ShardRoutingError(f'Cannot tell which user owns the rows of {table.name}')
+
+
+def split_source(table, shard):
+    """SELECT of the central rows to copy into ``table`` on ``shard``"""
+    if table.name == 'user_data_version':
+        # Unsharded, the data version is a column of the user row
+        users = sa.Table('user', table.metadata)
+        count = current_app.config['SHARD_COUNT']
+        return sa.select(
+            users.c.id.label('user_id'), users.c.data_version, users.c.data_updated_at
+        ).where(users.c.id % count == shard)
+    return sa.select(table).where(owner_filter(table, shard))
+
+
+def split_database(batch_size=1000):
+    """
+    Copy every sharded table's rows from the central database into the shards
+
+    Ids are preserved, and each user's data version is copied from the user
+    row. Returns {table: (rows copied, rows in the central table)}; the two
+    differ only for orphaned child rows. Refuses to run if any shard
+    already holds data.
+    """
+    from app.models import db
+
+    create_shard_tables()
+    tables = sharded_tables()
+    engines = {shard: db.engines[bind_key(shard)] for shard in shard_ids()}
+    for shard, engine in engines.items():
+        with engine.connect() as connection:
+            for table in tables:
+                if connection.execute(sa.select(sa.literal(1)).select_from(table).limit(1)).first():
+                    raise ShardRoutingError(f'Shard {shard} already has rows in {table.name}')
+
+    counts = {}
+    with db.engines[None].connect() as source:
+        for table in tables:
+            copied = 0
+            for shard, engine in engines.items():
+                result = source.execution_options(yield_per=batch_size).execute(split_source(table, shard))
+                with engine.begin() as target:
+                    for rows in result.partitions():
+                        target.execute(table.insert(), [row._asdict() for row in rows])
+                        copied += len(rows)
+            total = source.execute(
+                sa.select(func.count()).select_from(split_source(table, 0).get_final_froms()[0])
+            ).scalar()
+            counts[table.name] = (copied, total)
+    return counts
+
+
+def prune_central():
+    """Delete the sharded tables' rows from the central database after a split"""
+    from app.models import db
+
+    with db.engines[None].begin() as connection:
+        for table in reversed(sharded_tables()):
+            connection.execute(table.delete())
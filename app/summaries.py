@@ -0,0 +1,90 @@
+"""
+Spending summaries computed inside SQLite.
+
+Every function here returns plain dicts built from a single
+``SUM/COUNT/AVG ... GROUP BY`` query; no Expense ORM objects are loaded.
+Whole-month ranges are answered from ``expense_monthly_rollup`` in
+O(months); other ranges fall back to one indexed aggregate over
+(user_id, date).
+"""
+import calendar
+from decimal import Decimal
+
+from sqlalchemy import func
+
+from app.models import db, Expense, ExpenseMonthlyRollup
+from app.money import Money
+
+SUMMARY_GROUPS = ('category', 'month')
+
+
+def expense_summary(user_id, group='category', start=None, end=None):
+    """
+    Aggregate a user's expenses by category or by calendar month
+
+    ``start`` and ``end`` are optional inclusive dates. Returns a list of
+    ``{'key', 'total', 'total_cents', 'count', 'average'}`` dicts ordered by
+    key; totals are summed exactly in integer cents.
+    """
+    if group not in SUMMARY_GROUPS:
+        raise ValueError(f"group must be one of {SUMMARY_GROUPS}")
+
+    if covers_whole_months(start, end):
+        rows = _summary_from_rollup(user_id, group, start, end)
+    else:
+        rows = _summary_from_expenses(user_id, group, start, end)
+
+    return [
+        {
+            'key': row.key,
+            'total': float(Money(row.total_cents)),
+            'total_cents': row.total_cents,
+            'count': row.count,
+            'average': float(Money.from_decimal(Decimal(row.total_cents) / row.count / 100)),
+        }
+        for row in rows
+    ]
+
+
+def covers_whole_months(start, end):
+    """True if the (inclusive) range starts on a 1st and ends on a month end"""
+    if start is not None and start.day != 1:
+        return False
+    if end is not None and end.day != calendar.monthrange(end.year, end.month)[1]:
+        return False
+    return True
+
+
+def _summary_from_rollup(user_id, group, start, end):
+    rollup = ExpenseMonthlyRollup
+    key = rollup.year_month if group == 'month' else rollup.category
+    query = (
+        db.session.query(
+            key.label('key'),
+            func.sum(rollup.total_cents).label('total_cents'),
+            func.sum(rollup.count).label('count'),
+        )
+        .filter(rollup.user_id == user_id)
+    )
+    if start is not None:
+        query = query.filter(rollup.year_month >= start.strftime('%Y-%m'))
+    if end is not None:
+        query = query.filter(rollup.year_month <= end.strftime('%Y-%m'))
+    return query.group_by(key).order_by(key).all()
+
+
+def _summary_from_expenses(user_id, group, start, end):
+    key = func.strftime('%Y-%m', Expense.date) if group == 'month' else Expense.category
+    query = (
+        db.session.query(
+            key.label('key'),
+            func.sum(Expense.amount_cents).label('total_cents'),
+            func.count(Expense.id).label('count'),
+        )
+        .filter(Expense.user_id == user_id)
+    )
+    if start is not None:
+        query = query.filter(Expense.date >= start)
+    if end is not None:
+        query = query.filter(Expense.date <= end)
+    return query.group_by(key).order_by(key).all()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+End-to-end timing of the bill reminder job on a large synthetic database.
+
+Seeds a throwaway SQLite database with --users verified users, each with a
+few bills (some unpaid and due inside the reminder window), then times
+send_bill_reminders() twice: the first run queues one digest per user, the
+second must find nothing left to send.
+
+    python benchmarks/bench_bill_reminders.py --users 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def seed(db, users, bills_per_user, today):
+    from app.models import User, Bill
+
+    random.seed(42)
+    db.session.execute(User.__table__.insert(), [
+        {'id': i, 'first_name': f'User{i}', 'last_name': 'Bench', 'email': f'user{i}@example.com',
+         'password_hash': 'x', 'email_verified': True}
+        for i in range(1, users + 1)
+    ])
+    db.session.execute(Bill.__table__.insert(), [
+        {'user_id': u, 'name': f'Bill {n}', 'amount_cents': random.randint(500, 250000),
+         'due_date': today + timedelta(days=random.randint(-10, 40)), 'paid': random.random() < 0.3}
+        for u in range(1, users + 1) for n in range(bills_per_user)
+    ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--bills-per-user', type=int, default=4)
+    parser.add_argument('--days', type=int, default=7)
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.models import db, OutboxEmail
+    from app.reminders import send_bill_reminders
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        # Queue real outbox rows, but leave them for a worker that never starts
+        'MAIL_USERNAME': 'bench',
+        'EMAIL_WORKER_ENABLED': False,
+    })
+    today = date.today()
+
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        seed(db, args.users, args.bills_per_user, today)
+        print(f'Seeded {args.users} users x {args.bills_per_user} bills in {time.perf_counter() - start:.1f}s')
+
+        start = time.perf_counter()
+        users, bills = send_bill_reminders(today=today, days=args.days)
+        print(f'First run:  {users} digests for {bills} bills in {time.perf_counter() - start:.2f}s')
+
+        start = time.perf_counter()
+        users, bills = send_bill_reminders(today=today, days=args.days)
+        print(f'Second run: {users} digests for {bills} bills in {time.perf_counter() - start:.2f}s')
+
+        print(f'Outbox rows: {db.session.query(OutboxEmail).count()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget check: import time and create_app() wall time.
+
+Each round starts a fresh interpreter with ``python -X importtime`` that
+imports the app package and builds an app, the way a new worker or a
+serverless instance does. The script prints the median timings and the
+slowest imports, and exits with status 1 when
+
+- the median ``import app`` + ``create_app()`` time is over --budget
+  seconds (default COLD_START_BUDGET, or 1.5), or
+- a module listed in --lazy (Flask-Migrate, Alembic, Flask-Mail, NumPy) was
+  imported by a plain create_app(); those must load on first use.
+
+tests/test_cold_start.py runs the same check under pytest; this script
+reports the timings. Run it from a quiet machine:
+
+    python benchmarks/bench_cold_start.py --rounds 10 --budget 1.0
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from harness import summarize, print_table, write_results
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+DEFAULT_BUDGET = float(os.environ.get('COLD_START_BUDGET', 1.5))  # seconds
+
+LAZY_MODULES = ['flask_migrate', 'alembic', 'flask_mail', 'app.email_service', 'numpy']
+
+# Runs in the child interpreter; prints one JSON line on stdout
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app({'EMAIL_WORKER_ENABLED': False})
+created = time.perf_counter()
+print(json.dumps({
+    'import_app': imported - start,
+    'create_app': created - imported,
+    'modules': sorted(sys.modules),
+}))
+"""
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def run_once(database):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', EMAIL_WORKER_ENABLED='false')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    imports = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            imports[match.group(4)] = int(match.group(1)) / 1e6  # self time, seconds
+    return timings, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help='Largest allowed median import + create_app time, in seconds.')
+    parser.add_argument('--lazy', nargs='*', default=LAZY_MODULES,
+                        help='Modules create_app() must not import.')
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to list.')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/cold_start-<commit>-<time>.json).')
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(), 'cold_start.db')
+
+    samples = {'import_app': [], 'create_app': [], 'total': []}
+    self_times = {}
+    loaded = set()
+    for _ in range(args.rounds):
+        timings, imports = run_once(database)
+        samples['import_app'].append(timings['import_app'])
+        samples['create_app'].append(timings['create_app'])
+        samples['total'].append(timings['import_app'] + timings['create_app'])
+        loaded.update(timings['modules'])
+        for module, seconds in imports.items():
+            self_times.setdefault(module, []).append(seconds)
+
+    results = {name: summarize(values) for name, values in samples.items()}
+    print_table(results)
+
+    slowest = sorted(self_times.items(), key=lambda item: -sorted(item[1])[len(item[1]) // 2])[:args.top]
+    print('\nSlowest imports (median self time, ms):')
+    for module, seconds in slowest:
+        print(f'  {sorted(seconds)[len(seconds) // 2] * 1000:8.2f}  {module}')
+
+    failures = []
+    total = results['total']['median']
+    if total > args.budget:
+        failures.append(f'median cold start {total:.3f}s is over the {args.budget:.3f}s budget')
+    eager = [module for module in args.lazy if module in loaded]
+    if eager:
+        failures.append(f"create_app() imported modules that should load lazily: {', '.join(eager)}")
+
+    settings = {'rounds': args.rounds, 'budget': args.budget, 'lazy': args.lazy}
+    print(f"\nResults written to {write_results('cold_start', results, settings, args.output)}")
+    if failures:
+        for failure in failures:
+            print(f'FAIL: {failure}')
+        sys.exit(1)
+    print(f'OK: median cold start {total:.3f}s (budget {args.budget:.3f}s)')
+
+
+if __name__ == '__main__':
+    main()
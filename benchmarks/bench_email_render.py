@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-message email body rendering.
+
+Compares the old approach (text and HTML bodies assembled from large
+f-strings on every call) with the compiled, cached Jinja templates in
+app/templates/email/ rendered through EmailTemplate.render_many().
+
+    python benchmarks/bench_email_render.py --recipients 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def legacy_verification_bodies(user_name, verification_url):
+    """The f-string bodies send_verification_email used to build per call"""
+    body = f"""
+Hello {user_name},
+
+Welcome to Budget Beyond!
+
+To complete your registration and secure your account, please verify your email address by clicking the link below:
+
+{verification_url}
+
+This verification link will expire in 1 hour for security reasons.
+
+If you did not create an account with Budget Beyond, please ignore this email.
+
+Best regards,
+The Budget Beyond Team
+
+---
+This is an automated message. Please do not reply to this email.
+        """
+    html = f"""
+<html>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+        <h2 style="color: #2c3e50;">Welcome to Budget Beyond!</h2>
+        
+        <p>Hello <strong>{user_name}</strong>,</p>
+        
+        <p>Thank you for creating an account with Budget Beyond. To complete your registration and secure your account, please verify your email address.</p>
+        
+        <div style="text-align: center; margin: 30px 0;">
+            <a href="{verification_url}" 
+               style="background-color: #3498db; color: white; padding: 15px 30px; text-decoration: none; border-radius: 5px; display: inline-block; font-weight: bold;">
+                Verify My Email Address
+            </a>
+        </div>
+        
+        <p><strong>Important:</strong> This verification link will expire in 1 hour for security reasons.</p>
+        
+        <p>If the button above doesn't work, you can copy and paste this link into your browser:</p>
+        <p style="word-break: break-all; background-color: #f8f9fa; padding: 10px; border-radius: 3px;">{verification_url}</p>
+        
+        <p>If you did not create an account with Budget Beyond, please ignore this email.</p>
+        
+        <p>Best regards,<br>The Budget Beyond Team</p>
+        
+        <hr style="border: 1px solid #eee; margin: 20px 0;">
+        <p style="font-size: 12px; color: #666;">This is an automated message. Please do not reply to this email.</p>
+    </div>
+</body>
+</html>
+        """
+    return body, html
+
+
+def timed(label, count, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<34} {elapsed * 1e6 / count:8.2f} us/message')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--recipients', type=int, default=5000)
+    args = parser.parse_args()
+
+    os.environ.setdefault('EMAIL_WORKER_ENABLED', 'false')
+    from app import create_app
+    from flask import render_template
+    from app.email_service import get_email_template
+
+    app = create_app()
+    contexts = [
+        {'user_name': f'User {i}', 'verification_url': f'http://127.0.0.1:5000/verify-email/token-{i}'}
+        for i in range(args.recipients)
+    ]
+
+    with app.app_context():
+        template = get_email_template('verification')
+        template.render(**contexts[0])  # warm up
+
+        timed('f-string (legacy, per call)', args.recipients,
+              lambda: [legacy_verification_bodies(**c) for c in contexts])
+        timed('render_template (per call)', args.recipients,
+              lambda: [(render_template('email/verification.txt', **c),
+                        render_template('email/verification.html', **c)) for c in contexts])
+        timed('EmailTemplate.render_many', args.recipients,
+              lambda: template.render_many(contexts))
+
+
+if __name__ == '__main__':
+    main()
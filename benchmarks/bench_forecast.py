@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Spending forecast: NumPy scoring against the pure-Python loop.
+
+Seeds a throwaway database with --users users of --expenses expenses each
+(spread over three years), reads the history window once as columns, then
+times both scorers of app/forecast.py on the same rows:
+
+- one user with trend lines, as /dashboard and /api/expenses/forecast do;
+- every user at once without trends, as ``flask score-spending`` does per
+  batch.
+
+Both scorers must return identical results; the script exits with status 1
+if they do not.
+
+    python benchmarks/bench_forecast.py --users 1000 --expenses 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from harness import measure, print_table, write_results
+from seed_data import seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--expenses', type=int, default=1000, help='Expenses per user.')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/forecast-<commit>-<time>.json).')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.forecast import expense_columns, forecast_options, score_numpy, score_python
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'forecast.db')}",
+        'EMAIL_WORKER_ENABLED': False,
+    })
+    counts = seed(app, users=args.users, expenses=args.expenses, bills=0, tasks=0)
+    first, last = counts['first_user_id'], counts['first_user_id'] + args.users - 1
+    today = date.today()
+
+    scorers = {'python': score_python, 'numpy': score_numpy}
+
+    results = {}
+    failures = []
+    with app.app_context():
+        history = app.config['FORECAST_HISTORY_DAYS']
+        options = forecast_options(app.config)
+        cases = {
+            'one_user': (expense_columns(today, history, first, first), True),
+            'all_users': (expense_columns(today, history, first, last), False),
+        }
+        results['load_one_user'] = measure(lambda: expense_columns(today, history, first, first), rounds=args.rounds)
+        results['load_all_users'] = measure(lambda: expense_columns(today, history, first, last), rounds=max(3, args.rounds // 5))
+
+        for case, (columns, trend) in cases.items():
+            outputs = {}
+            for name, scorer in scorers.items():
+                def run(scorer=scorer, columns=columns, trend=trend):
+                    return scorer(columns, today, trend=trend, **options)
+
+                rounds = args.rounds if case == 'one_user' else max(3, args.rounds // 5)
+                results[f'{case}_{name}'] = measure(run, rounds=rounds)
+                outputs[name] = run()
+            if outputs['numpy'] != outputs['python']:
+                failures.append(f'{case}: NumPy and Python results differ')
+            print(f"{case}: {len(columns['id'])} rows, "
+                  f"{sum(len(result['anomalies']) for result in outputs['python'])} unusual expense(s)")
+
+    print_table(results)
+    for case in cases:
+        speedup = results[f'{case}_python']['median'] / results[f'{case}_numpy']['median']
+        print(f'{case}: NumPy is {speedup:.1f}x the Python loop')
+
+    settings = {'users': args.users, 'expenses': args.expenses, 'rounds': args.rounds}
+    print(f"Results written to {write_results('forecast', results, settings, args.output)}")
+    if failures:
+        for failure in failures:
+            print(f'FAIL: {failure}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
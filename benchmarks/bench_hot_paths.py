@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the request hot paths, run in-process.
+
+Seeds a throwaway database (see seed_data.py), then times through the
+Flask test client:
+
+- GET /expenses (full render, 304 revalidation, and a deep keyset page)
+- POST /expenses (add one expense)
+- POST /signin (dominated by bcrypt at --bcrypt-rounds)
+- GET /api/expenses/summary
+- User.verify_email_token
+- rendering expenses.html on its own
+
+Statistics follow pytest-benchmark (min/median/mean/p95/stddev/ops) and are
+written to benchmarks/results/ as JSON; compare two runs with
+``python benchmarks/harness.py compare old.json new.json``. The same cases
+run under pytest with ``python -m pytest -m benchmark tests/benchmarks``.
+
+    python benchmarks/bench_hot_paths.py --users 20 --expenses 2000 --rounds 100
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from harness import measure, print_table, write_results
+from seed_data import seed, user_email, PASSWORD
+
+# Names of the cases returned by hot_paths(), in the order they run
+CASES = (
+    'expenses_page', 'expenses_page_304', 'expenses_page_deep', 'add_expense', 'signin',
+    'expense_summary_api', 'verify_email_token', 'render_expenses_template',
+)
+
+
+def signed_in_client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    return client
+
+
+def hot_paths(app, user_id):
+    """
+    {name: case} for every hot path; ``case(rounds)`` times one of them and
+    returns its statistics (tests/benchmarks/ runs the same cases)
+    """
+    from flask import render_template
+    from app.models import db, User, Expense
+    from app.pagination import paginate_keyset
+
+    client = signed_in_client(app, user_id)
+
+    def get_ok(path, **kwargs):
+        response = client.get(path, **kwargs)
+        assert response.status_code in (200, 304), (path, response.status_code)
+        return response
+
+    def expenses_page(rounds):
+        return measure(lambda: get_ok('/expenses'), rounds)
+
+    def expenses_page_304(rounds):
+        etag = get_ok('/expenses').headers.get('ETag')
+        return measure(lambda: get_ok('/expenses', headers={'If-None-Match': etag}), rounds)
+
+    def expenses_page_deep(rounds):
+        # Walk 20 pages in, then time fetching the page after that cursor
+        cursor = None
+        with app.app_context():
+            for _ in range(20):
+                page = paginate_keyset(Expense.for_user(user_id), Expense.sort_keys(), after=cursor)
+                cursor = page.next_cursor or cursor
+        return measure(lambda: get_ok(f'/expenses?after={cursor}'), rounds)
+
+    def add_expense(rounds):
+        def post(add_client):
+            response = add_client.post('/expenses', data={
+                'category': 'Food', 'amount': '12.34', 'date': date.today().isoformat(), 'notes': 'bench'
+            })
+            assert response.status_code == 302, response.status_code
+        return measure(post, rounds, setup=lambda: signed_in_client(app, user_id))
+
+    def signin(rounds):
+        with app.app_context():
+            email = db.session.get(User, user_id).email
+
+        def post(signin_client):
+            response = signin_client.post('/signin', data={'email': email, 'password': PASSWORD})
+            assert response.status_code == 302, response.status_code
+        return measure(post, rounds, warmup=1, setup=app.test_client)
+
+    def expense_summary_api(rounds):
+        return measure(lambda: get_ok('/api/expenses/summary?group=month'), rounds)
+
+    def verify_email_token(rounds):
+        with app.app_context():
+            token = db.session.get(User, user_id).generate_verification_token()
+            return measure(lambda: User.verify_email_token(token), rounds)
+
+    def render_expenses_template(rounds):
+        with app.test_request_context('/expenses'):
+            from flask import session
+            from app.forms import ExpenseForm
+
+            session['user_id'] = user_id
+            user = db.session.get(User, user_id)
+            page = paginate_keyset(Expense.for_user(user_id), Expense.sort_keys())
+            form = ExpenseForm()
+            return measure(
+                lambda: render_template('expenses.html', user=user, form=form, expenses=page.items, page=page),
+                rounds
+            )
+
+    cases = {case.__name__: case for case in (
+        expenses_page, expenses_page_304, expenses_page_deep, add_expense, signin,
+        expense_summary_api, verify_email_token, render_expenses_template,
+    )}
+    return {name: cases[name] for name in CASES}
+
+
+def run(app, user_id, rounds, signin_rounds):
+    return {
+        name: case(signin_rounds if name == 'signin' else rounds)
+        for name, case in hot_paths(app, user_id).items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--expenses', type=int, default=1000, help='Expenses per user.')
+    parser.add_argument('--rounds', type=int, default=100)
+    parser.add_argument('--signin-rounds', type=int, default=10)
+    parser.add_argument('--bcrypt-rounds', type=int, default=12)
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/hot_paths-<commit>-<time>.json).')
+    args = parser.parse_args()
+
+    from app import create_app
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    settings = {
+        'users': args.users, 'expenses_per_user': args.expenses,
+        'rounds': args.rounds, 'signin_rounds': args.signin_rounds, 'bcrypt_rounds': args.bcrypt_rounds,
+    }
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'WTF_CSRF_ENABLED': False,
+        'EMAIL_WORKER_ENABLED': False,
+        'BCRYPT_ROUNDS': args.bcrypt_rounds,
+    })
+
+    counts = seed(app, users=args.users, expenses=args.expenses, bills=20, tasks=20)
+    print(f"Seeded {counts['users']} users, {counts['expenses']} expenses; signing in as {user_email(counts['first_user_id'])}")
+
+    results = run(app, counts['first_user_id'], args.rounds, args.signin_rounds)
+    print_table(results)
+    print(f"Results written to {write_results('hot_paths', results, settings, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
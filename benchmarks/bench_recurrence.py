@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Cost of expanding recurring bills into dated occurrences.
+
+Part 1 times the pure date arithmetic in app/recurrence.occurrences() for
+each frequency over short and long windows, including rules that started
+decades before the window (the expansion jumps straight to the window, so
+rule age should not matter).
+
+Part 2 times materialize_recurrences() against a throwaway SQLite database:
+the first, cold expansion of --rules rules, then the warm no-op check that
+every later /bills read pays.
+
+    python benchmarks/bench_recurrence.py --rules 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def bench_occurrences(repeat):
+    from app.recurrence import occurrences
+
+    today = date(2026, 1, 1)
+    windows = [('60 days', 60), ('1 year', 365), ('10 years', 3650)]
+    starts = [('new rule', today), ('30-year-old rule', date(1996, 1, 31))]
+    print(f"{'frequency':<10} {'rule':<18} {'window':<10} {'dates':>6} {'us/call':>9}")
+    for frequency in ('days', 'weekly', 'monthly', 'yearly'):
+        for start_label, start in starts:
+            for window_label, days in windows:
+                end = today + timedelta(days=days)
+                count = len(occurrences(frequency, 1, start, today, end))
+                began = time.perf_counter()
+                for _ in range(repeat):
+                    occurrences(frequency, 1, start, today, end)
+                per_call = (time.perf_counter() - began) * 1e6 / repeat
+                print(f'{frequency:<10} {start_label:<18} {window_label:<10} {count:>6} {per_call:>9.1f}')
+
+
+def bench_materialize(rules, horizon_days):
+    from app import create_app
+    from app.models import db, User, BillRecurrence, Bill
+    from app.recurrence import materialize_recurrences
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'EMAIL_WORKER_ENABLED': False})
+    frequencies = ('weekly', 'monthly', 'yearly', 'days')
+    today = date.today()
+
+    with app.app_context():
+        db.create_all()
+        users = max(rules // 4, 1)
+        db.session.execute(User.__table__.insert(), [
+            {'id': i, 'first_name': 'U', 'last_name': 'B', 'email': f'u{i}@example.com', 'password_hash': 'x'}
+            for i in range(1, users + 1)
+        ])
+        db.session.execute(BillRecurrence.__table__.insert(), [
+            {'user_id': i % users + 1, 'name': f'Rule {i}', 'amount_cents': 1000 + i,
+             'frequency': frequencies[i % 4], 'interval': 1 + i % 3,
+             'start_date': today - timedelta(days=i % 400)}
+            for i in range(rules)
+        ])
+        db.session.commit()
+
+        through = today + timedelta(days=horizon_days)
+        began = time.perf_counter()
+        expanded = materialize_recurrences(through)
+        db.session.commit()
+        cold = time.perf_counter() - began
+        print(f'Cold expansion: {expanded} rules -> {Bill.query.count()} bills in {cold:.2f}s')
+
+        began = time.perf_counter()
+        for user_id in range(1, 1001):
+            materialize_recurrences(through, user_id=user_id % users + 1)
+        warm = (time.perf_counter() - began) / 1000
+        print(f'Warm per-user check (nothing to do): {warm * 1e3:.3f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=2000, help='Calls per occurrences() measurement.')
+    parser.add_argument('--rules', type=int, default=10000)
+    parser.add_argument('--horizon-days', type=int, default=60)
+    args = parser.parse_args()
+
+    bench_occurrences(args.repeat)
+    print()
+    bench_materialize(args.rules, args.horizon_days)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark full-text search: FTS5 against a LIKE scan.
+
+Seeds --users users with --expenses expenses each (a million rows by
+default; pass --db to keep the database between runs), then times
+user-scoped searches through app.search for a rare word, a common word, a
+prefix and a two-word query, once with the FTS5 index and once with the
+LIKE '%term%' fallback. The seeding time includes keeping the index up to
+date through its triggers.
+
+    python benchmarks/bench_search.py --db /tmp/search.db --users 1000 --expenses 1000
+    python benchmarks/bench_search.py --users 10 --expenses 20000   # heavy users
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from harness import measure, print_table, write_results
+from seed_data import seed
+
+QUERIES = {
+    'rare': 'dentist',
+    'common': 'coffee',
+    'prefix': 'pharm',
+    'two_words': 'coffee beans',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', help='SQLite file to seed, or reuse if it already has data.')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--expenses', type=int, default=1000, help='Expenses per user.')
+    parser.add_argument('--rounds', type=int, default=30)
+    parser.add_argument('--limit', type=int, default=20, help='Results per search.')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/search-<commit>-<time>.json).')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.models import db, Expense
+    from app.search import search_terms, search_fts, search_like, fts_available
+
+    path = os.path.abspath(args.db) if args.db else os.path.join(tempfile.mkdtemp(), 'search.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'EMAIL_WORKER_ENABLED': False})
+
+    with app.app_context():
+        db.create_all()
+        existing = db.session.query(db.func.count(Expense.id)).scalar()
+    if existing:
+        print(f'Reusing {path} with {existing} expenses')
+    else:
+        start = time.perf_counter()
+        seed(app, users=args.users, expenses=args.expenses, bills=0, tasks=0)
+        print(f'Seeded {args.users * args.expenses} expenses (with FTS triggers) in {time.perf_counter() - start:.1f}s')
+
+    results = {}
+    with app.app_context():
+        if not fts_available():
+            sys.exit('FTS5 tables are missing; run `flask rebuild-search-index` on this database')
+        user_id = db.session.query(db.func.min(Expense.user_id)).scalar()
+        total = db.session.query(db.func.count(Expense.id)).scalar()
+        for name, query in QUERIES.items():
+            terms = search_terms(query)
+            fts_hits = search_fts(user_id, terms, ['expenses'], args.limit)
+            like_hits = search_like(user_id, terms, ['expenses'], args.limit)
+            print(f'{name} ({query!r}): {len(fts_hits)} FTS hits, {len(like_hits)} LIKE hits')
+            results[f'{name}_fts'] = measure(lambda: search_fts(user_id, terms, ['expenses'], args.limit), args.rounds)
+            results[f'{name}_like'] = measure(lambda: search_like(user_id, terms, ['expenses'], args.limit), args.rounds)
+
+    print_table(results)
+    settings = {'expenses': total, 'users': args.users, 'rounds': args.rounds, 'limit': args.limit}
+    print(f"Results written to {write_results('search', results, settings, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
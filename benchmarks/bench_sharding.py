@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Write throughput with and without per-user shards (app/sharding.py).
+
+For each shard count in --shards (0 = sharding off), builds a fresh app in
+a temporary directory, seeds --users users, then runs --writers threads for
+--seconds. Each thread acts as one user and commits one expense at a time
+through the ORM, so every commit also updates the monthly rollups, the
+search index and the user's data version, as a request would. Reports
+commits/s and how many commits failed with "database is locked".
+
+    python benchmarks/bench_sharding.py --shards 0 2 4 8 --writers 8 --seconds 5
+    python benchmarks/bench_sharding.py --synchronous FULL   # fsync on every commit
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from harness import write_results
+from seed_data import seed
+
+
+def make_app(directory, shards, synchronous):
+    from app import create_app
+
+    config = {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'central.db')}",
+        'EMAIL_WORKER_ENABLED': False,
+        'SQLITE_SYNCHRONOUS': synchronous,
+        'SHARDING_ENABLED': bool(shards),
+    }
+    if shards:
+        config['SHARD_COUNT'] = shards
+        config['SHARD_DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'shard{shard}.db')}"
+    return create_app(config)
+
+
+def run(app, user_ids, seconds):
+    from sqlalchemy.exc import OperationalError
+    from app.models import db, Expense
+    from app.sharding import use_shard, shard_for_user
+
+    counts = {'commits': 0, 'locked': 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def writer(user_id):
+        commits = locked = 0
+        with app.app_context():
+            with use_shard(shard_for_user(user_id)):
+                while time.perf_counter() < stop:
+                    db.session.add(Expense(user_id=user_id, amount_cents=1234, category='Food',
+                                           date=date.today(), notes='benchmark coffee'))
+                    try:
+                        db.session.commit()
+                        commits += 1
+                    except OperationalError:
+                        db.session.rollback()
+                        locked += 1
+            db.session.remove()
+        with lock:
+            counts['commits'] += commits
+            counts['locked'] += locked
+
+    threads = [threading.Thread(target=writer, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        'commits': counts['commits'],
+        'locked': counts['locked'],
+        'commits_per_second': counts['commits'] / seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--shards', type=int, nargs='+', default=[0, 2, 4, 8], help='Shard counts to compare; 0 = off.')
+    parser.add_argument('--writers', type=int, default=8, help='Writer threads, one user each.')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--synchronous', default='NORMAL', help='SQLITE_SYNCHRONOUS for every database.')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/sharding-<commit>-<time>.json).')
+    args = parser.parse_args()
+
+    results = {}
+    for shards in args.shards:
+        app = make_app(tempfile.mkdtemp(), shards, args.synchronous)
+        counts = seed(app, users=args.writers, expenses=0, bills=0, tasks=0)
+        user_ids = range(counts['first_user_id'], counts['first_user_id'] + args.writers)
+        name = f'{shards}_shards' if shards else 'unsharded'
+        results[name] = run(app, user_ids, args.seconds)
+        print(f"{name:>12}: {results[name]['commits_per_second']:8.1f} commits/s, "
+              f"{results[name]['locked']} locked")
+
+    settings = {'writers': args.writers, 'seconds': args.seconds, 'synchronous': args.synchronous}
+    print(f"Results written to {write_results('sharding', results, settings, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
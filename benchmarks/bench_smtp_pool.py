@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: one SMTP connection per message vs the pooled transport.
+
+Runs against a local aiosmtpd stand-in (``pip install aiosmtpd``), so no
+network or real mail server is needed. ``--handshake-ms`` adds a delay to
+EHLO to mimic the round trips of a real STARTTLS + AUTH handshake.
+
+    python benchmarks/bench_smtp_pool.py --messages 500 --handshake-ms 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+try:
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.smtp import AuthResult, SMTP
+except ImportError:
+    sys.exit('This benchmark needs aiosmtpd: pip install aiosmtpd')
+
+
+class CountingHandler:
+    def __init__(self, handshake_delay):
+        self.handshake_delay = handshake_delay
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.handshake_delay)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return '250 OK'
+
+
+def accept_any(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+
+def build_app(port, pool_size):
+    os.environ.update(
+        MAIL_SERVER='127.0.0.1',
+        MAIL_PORT=str(port),
+        MAIL_USE_TLS='false',
+        MAIL_USERNAME='bench',
+        MAIL_PASSWORD='bench',
+        MAIL_POOL_SIZE=str(pool_size),
+        EMAIL_WORKER_ENABLED='false',
+    )
+    from app import create_app
+    return create_app()
+
+
+def make_messages(count):
+    from flask_mail import Message
+    return [
+        Message(subject=f'Bench {i}', sender='bench@example.com',
+                recipients=[f'user{i}@example.com'], body='Hello from the benchmark')
+        for i in range(count)
+    ]
+
+
+def run_unpooled(app, messages, threads):
+    from app.email_service import mail, init_mail
+
+    init_mail(app)
+
+    def send_one(message):
+        with app.app_context():
+            mail.send(message)
+
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(send_one, messages))
+
+
+def run_pooled(app, messages, threads, batch_size):
+    from app.mail_transport import get_pool
+
+    batches = [messages[i:i + batch_size] for i in range(0, len(messages), batch_size)]
+
+    def send_batch(batch):
+        with app.app_context():
+            errors = [e for e in get_pool().send_batch(batch) if e is not None]
+            if errors:
+                raise errors[0]
+
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(send_batch, batches))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--threads', type=int, default=2, help='sender threads (and pool size)')
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--handshake-ms', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=8587)
+    args = parser.parse_args()
+
+    handler = CountingHandler(args.handshake_ms / 1000.0)
+    controller = Controller(handler, hostname='127.0.0.1', port=args.port,
+                            authenticator=accept_any, auth_require_tls=False)
+    controller.start()
+    try:
+        app = build_app(args.port, args.threads)
+        results = {}
+        for name, runner in [
+            ('connection per message', lambda m: run_unpooled(app, m, args.threads)),
+            ('pooled + batched', lambda m: run_pooled(app, m, args.threads, args.batch_size)),
+        ]:
+            messages = make_messages(args.messages)
+            before = handler.received
+            start = time.perf_counter()
+            runner(messages)
+            elapsed = time.perf_counter() - start
+            assert handler.received - before == args.messages
+            results[name] = args.messages / elapsed
+            print(f'{name:<24} {elapsed:8.3f}s  {results[name]:10.1f} msg/s')
+
+        with app.app_context():
+            from app.mail_transport import get_pool
+            get_pool().close_all()
+
+        speedup = results['pooled + batched'] / results['connection per message']
+        print(f'speedup: {speedup:.1f}x')
+    finally:
+        controller.stop()
+
+
+if __name__ == '__main__':
+    main()
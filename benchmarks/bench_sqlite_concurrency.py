@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Concurrent read/write stress test for the SQLite PRAGMA settings.
+
+Runs reader and writer threads against a throwaway database file twice:
+once with SQLite's defaults and once with the PRAGMAs from
+app/database.py (WAL, synchronous=NORMAL, busy_timeout, cache/mmap).
+Reports reads/s, writes/s and how many operations hit "database is locked".
+
+    python benchmarks/bench_sqlite_concurrency.py --readers 8 --writers 4 --seconds 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from app.database import apply_sqlite_pragmas
+
+TUNED = [
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', '5000'),
+    ('cache_size', '-20000'),
+    ('mmap_size', '268435456'),
+]
+
+
+def make_engine(path, pragmas):
+    # timeout=0 so the defaults run really are "no busy timeout"
+    engine = create_engine(f'sqlite:///{path}', connect_args={'timeout': 0, 'check_same_thread': False})
+    if pragmas:
+        event.listen(engine, 'connect', lambda conn, record: apply_sqlite_pragmas(conn, pragmas))
+    return engine
+
+
+def seed(engine, users, rows_per_user):
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE expense (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, category VARCHAR(50) NOT NULL, '
+            'amount_cents INTEGER NOT NULL, date DATE NOT NULL, notes TEXT)'
+        ))
+        conn.execute(text('CREATE INDEX ix_expense_user_id_date ON expense (user_id, date)'))
+        conn.execute(
+            text('INSERT INTO expense (user_id, category, amount_cents, date) VALUES (:u, :c, :a, :d)'),
+            [{'u': u, 'c': 'Food', 'a': 100 + i, 'd': date(2024, 1 + i % 12, 1 + i % 28)}
+             for u in range(users) for i in range(rows_per_user)]
+        )
+
+
+def run(engine, readers, writers, seconds, users):
+    counts = {'reads': 0, 'writes': 0, 'locked': 0}
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def reader(n):
+        while time.monotonic() < stop:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text('SELECT id, amount_cents FROM expense WHERE user_id = :u ORDER BY date DESC LIMIT 25'),
+                        {'u': n % users}
+                    ).all()
+                bump('reads')
+            except OperationalError:
+                bump('locked')
+
+    def writer(n):
+        while time.monotonic() < stop:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text('INSERT INTO expense (user_id, category, amount_cents, date) VALUES (:u, :c, :a, :d)'),
+                        {'u': n % users, 'c': 'Other', 'a': 500, 'd': date.today()}
+                    )
+                bump('writes')
+            except OperationalError:
+                bump('locked')
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--rows-per-user', type=int, default=200)
+    args = parser.parse_args()
+
+    for label, pragmas in [('defaults', []), ('tuned PRAGMAs', TUNED)]:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine(os.path.join(tmp, 'bench.db'), pragmas)
+            seed(engine, args.users, args.rows_per_user)
+            counts = run(engine, args.readers, args.writers, args.seconds, args.users)
+            engine.dispose()
+        print(f"{label:<14} reads/s {counts['reads'] / args.seconds:9.1f}   "
+              f"writes/s {counts['writes'] / args.seconds:8.1f}   locked errors {counts['locked']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Shared helpers for the benchmark suite: timing statistics and JSON results.
+
+Result files record the git commit, interpreter and settings next to the
+numbers, so two runs can be compared with
+
+    python benchmarks/harness.py compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def summarize(samples):
+    """pytest-benchmark style statistics for a list of durations in seconds"""
+    ordered = sorted(samples)
+    mean = statistics.fmean(ordered)
+    return {
+        'rounds': len(ordered),
+        'min': ordered[0],
+        'max': ordered[-1],
+        'mean': mean,
+        'median': statistics.median(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'stddev': statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        'ops': 1 / mean if mean else 0.0,
+    }
+
+
+def measure(fn, rounds=50, warmup=3, setup=None):
+    """
+    Call ``fn`` ``warmup`` times untimed, then time ``rounds`` calls
+
+    If ``setup`` is given it runs untimed before every call and its return
+    value is passed to ``fn``.
+    """
+    def call():
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        return time.perf_counter() - start
+
+    for _ in range(warmup):
+        call()
+    return summarize([call() for _ in range(rounds)])
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(kind, results, settings, output=None):
+    """Write a result file and return its path"""
+    commit = git_commit()
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{kind}-{commit or 'nocommit'}-{int(time.time())}.json")
+    document = {
+        'kind': kind,
+        'commit': commit,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': settings,
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    return output
+
+
+def print_table(results, unit=1e3, unit_label='ms'):
+    print(f"{'benchmark':<32} {'median':>10} {'mean':>10} {'p95':>10} {'ops/s':>10}")
+    for name, stats in results.items():
+        print(f"{name:<32} {stats['median'] * unit:>10.3f} {stats['mean'] * unit:>10.3f} "
+              f"{stats['p95'] * unit:>10.3f} {stats['ops']:>10.1f}")
+    print(f'(times in {unit_label})')
+
+
+def compare(before_path, after_path, threshold=0.10):
+    """Print median changes between two result files; returns True if any regressed"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    print(f"{before.get('commit')} -> {after.get('commit')}")
+    regressed = False
+    for name, stats in after['results'].items():
+        old = before['results'].get(name)
+        if old is None or not old.get('median'):
+            print(f'{name:<32} (new)')
+            continue
+        change = (stats['median'] - old['median']) / old['median']
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressed = True
+        print(f"{name:<32} {old['median'] * 1e3:>9.3f}ms -> {stats['median'] * 1e3:>9.3f}ms {change:+7.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    sub = parser.add_subparsers(dest='command', required=True)
+    cmp_parser = sub.add_parser('compare')
+    cmp_parser.add_argument('before')
+    cmp_parser.add_argument('after')
+    cmp_parser.add_argument('--threshold', type=float, default=0.10, help='Median slowdown counted as a regression.')
+    args = parser.parse_args()
+
+    if compare(args.before, args.after, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
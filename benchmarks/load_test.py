@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test against a running Budget Beyond server.
+
+Each virtual user signs in as one of the seeded accounts (see seed_data.py)
+and loops over a weighted mix of requests until --duration runs out:
+the expenses and bills pages, the JSON expense list and summary, and adding
+an expense through the API. Per-endpoint latency percentiles, throughput and
+error counts are printed and written to benchmarks/results/ as JSON.
+
+Standard library only, so it runs anywhere the app does:
+
+    python benchmarks/seed_data.py --db /tmp/load.db --users 50 --expenses 1000
+    DATABASE_URL=sqlite:////tmp/load.db python run.py
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --users 20 --duration 30
+"""
+import argparse
+import http.cookiejar
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date
+
+from harness import summarize, print_table, write_results
+from seed_data import user_email, PASSWORD
+
+CSRF_PATTERN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+# (name, weight, method, path)
+SCENARIO = [
+    ('GET /expenses', 30, 'GET', '/expenses'),
+    ('GET /bills', 15, 'GET', '/bills'),
+    ('GET /tasks', 10, 'GET', '/tasks'),
+    ('GET /api/v1/expenses', 20, 'GET', '/api/v1/expenses'),
+    ('GET /api/expenses/summary', 15, 'GET', '/api/expenses/summary?group=month'),
+    ('POST /api/v1/expenses', 10, 'POST', '/api/v1/expenses'),
+]
+
+
+class VirtualUser(threading.Thread):
+    """One signed-in browser session issuing requests in a loop"""
+
+    def __init__(self, base_url, email, deadline, seed_value, revalidate):
+        super().__init__(daemon=True)
+        self.base_url = base_url.rstrip('/')
+        self.email = email
+        self.deadline = deadline
+        self.rng = random.Random(seed_value)
+        self.revalidate = revalidate
+        self.etags = {}
+        self.samples = {name: [] for name, _, _, _ in SCENARIO}
+        self.errors = {name: 0 for name, _, _, _ in SCENARIO}
+        self.status_counts = {}
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, method, path, body=None, headers=None):
+        request = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers or {})
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def sign_in(self):
+        _, _, body = self.request('GET', '/signin')
+        match = CSRF_PATTERN.search(body.decode('utf-8', 'replace'))
+        form = {'email': self.email, 'password': PASSWORD}
+        if match:
+            form['csrf_token'] = match.group(1)
+        request = urllib.request.Request(
+            self.base_url + '/signin', data=urllib.parse.urlencode(form).encode('ascii'),
+            headers={'Content-Type': 'application/x-www-form-urlencoded'}
+        )
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                # A successful sign in redirects away from the form
+                return not urllib.parse.urlsplit(response.geturl()).path.endswith('/signin')
+        except urllib.error.HTTPError:
+            return False
+
+    def run(self):
+        if not self.sign_in():
+            print(f'{self.email}: sign in failed')
+            return
+        names = [name for name, _, _, _ in SCENARIO]
+        weights = [weight for _, weight, _, _ in SCENARIO]
+        steps = {name: (method, path) for name, _, method, path in SCENARIO}
+
+        while time.monotonic() < self.deadline:
+            name = self.rng.choices(names, weights)[0]
+            method, path = steps[name]
+            headers = {}
+            body = None
+            if method == 'POST':
+                body = json.dumps({
+                    'category': 'Food', 'amount': f'{self.rng.randint(100, 5000) / 100:.2f}',
+                    'date': date.today().isoformat(), 'notes': 'load test',
+                }).encode('utf-8')
+                headers['Content-Type'] = 'application/json'
+            elif self.revalidate and path in self.etags:
+                headers['If-None-Match'] = self.etags[path]
+
+            start = time.perf_counter()
+            try:
+                status, response_headers, _ = self.request(method, path, body, headers)
+            except OSError:
+                status, response_headers = None, None
+            elapsed = time.perf_counter() - start
+
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if status in (200, 201, 304):
+                self.samples[name].append(elapsed)
+                if response_headers is not None and response_headers.get('ETag'):
+                    self.etags[path] = response_headers['ETag']
+            else:
+                self.errors[name] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users.')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run.')
+    parser.add_argument('--first-user-id', type=int, default=1, help='Id of the first seeded account to use.')
+    parser.add_argument('--accounts', type=int, default=None,
+                        help='Number of seeded accounts to spread users over (default: one per user).')
+    parser.add_argument('--revalidate', action='store_true',
+                        help='Send If-None-Match on repeat page views, like a browser with a warm cache.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/load-<commit>-<time>.json).')
+    args = parser.parse_args()
+
+    accounts = args.accounts or args.users
+    start = time.monotonic()
+    deadline = start + args.duration
+    users = [
+        VirtualUser(args.url, user_email(args.first_user_id + n % accounts), deadline, args.seed + n, args.revalidate)
+        for n in range(args.users)
+    ]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    wall = time.monotonic() - start
+
+    results = {}
+    errors = {}
+    status_counts = {}
+    all_samples = []
+    for name, _, _, _ in SCENARIO:
+        samples = [sample for user in users for sample in user.samples[name]]
+        errors[name] = sum(user.errors[name] for user in users)
+        all_samples.extend(samples)
+        if samples:
+            results[name] = summarize(samples)
+            results[name]['throughput'] = len(samples) / wall
+            results[name]['errors'] = errors[name]
+    for user in users:
+        for status, count in user.status_counts.items():
+            status_counts[str(status)] = status_counts.get(str(status), 0) + count
+
+    if not all_samples:
+        print('No successful requests; is the server running and seeded?')
+        sys.exit(1)
+    results['all'] = summarize(all_samples)
+    results['all']['throughput'] = len(all_samples) / wall
+    results['all']['errors'] = sum(errors.values())
+
+    print_table(results)
+    print(f"{len(all_samples)} requests in {wall:.1f}s ({results['all']['throughput']:.1f} req/s), "
+          f"{results['all']['errors']} errors, statuses {status_counts}")
+    settings = {
+        'url': args.url, 'users': args.users, 'duration': args.duration, 'accounts': accounts,
+        'revalidate': args.revalidate, 'status_counts': status_counts,
+    }
+    print(f"Results written to {write_results('load', results, settings, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
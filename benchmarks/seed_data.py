@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Deterministic data generator for benchmarks and load tests.
+
+Seeds --users verified users, each with --expenses expenses, --bills bills
+and --tasks tasks, into a SQLite database (a fresh file by default). Rows are
+written with Core executemany and the monthly rollups are rebuilt at the end,
+so the result looks exactly like data created through the app.
+
+Every user can sign in as bench<N>@example.com with password
+``benchmark-password``.
+
+    python benchmarks/seed_data.py --db /tmp/bench.db --users 100 --expenses 1000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+PASSWORD = 'benchmark-password'
+BATCH = 5000
+
+# Words expense notes are built from; a few are rare so searches have both
+# needle and haystack cases
+NOTE_WORDS = (
+    ['groceries', 'coffee', 'fuel', 'tickets', 'lunch', 'dinner', 'taxi', 'parking', 'rent', 'gym',
+     'books', 'pharmacy', 'gift', 'snacks', 'train', 'bus', 'internet', 'phone', 'water', 'electricity',
+     'beans', 'market', 'bakery', 'cinema', 'concert', 'museum', 'hardware', 'garden', 'laundry', 'haircut']
+    * 20
+    + ['dentist', 'insurance', 'veterinarian', 'passport', 'wedding', 'plumber']
+)
+
+
+def user_email(n):
+    return f'bench{n}@example.com'
+
+
+def _insert(db, table, rows):
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(table.insert(), rows[start:start + BATCH])
+
+
+def seed(app, users=10, expenses=100, bills=20, tasks=20, seed_value=42):
+    """Create the tables and fill them; returns a dict of row counts"""
+    from app.forms import EXPENSE_CATEGORIES
+    from app.models import db, User, Expense, Bill, Task
+    from app.passwords import get_password_hasher
+    from app.rollups import rebuild_rollups
+    from app.sharding import use_shard, shard_for_user
+
+    rng = random.Random(seed_value)
+    today = date.today()
+
+    with app.app_context():
+        db.create_all()
+        # One bcrypt hash shared by every user keeps seeding fast
+        password_hash = get_password_hasher().hash(PASSWORD)
+
+        first_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+        user_ids = list(range(first_id, first_id + users))
+        _insert(db, User.__table__, [
+            {'id': user_id, 'first_name': f'Bench{user_id}', 'last_name': 'User',
+             'email': user_email(user_id), 'password_hash': password_hash,
+             'email_verified': True, 'data_version': 0}
+            for user_id in user_ids
+        ])
+        for user_id in user_ids:
+            with use_shard(shard_for_user(user_id)):
+                _insert(db, Expense.__table__, [
+                    {'user_id': user_id, 'category': rng.choice(EXPENSE_CATEGORIES),
+                     'amount_cents': rng.randint(100, 50000),
+                     'date': today - timedelta(days=rng.randint(0, 3 * 365)),
+                     'notes': ' '.join(rng.choice(NOTE_WORDS) for _ in range(rng.randint(0, 4))) or None}
+                    for _ in range(expenses)
+                ])
+                _insert(db, Bill.__table__, [
+                    {'user_id': user_id, 'name': f'Bill {n}', 'amount_cents': rng.randint(1000, 200000),
+                     'due_date': today + timedelta(days=rng.randint(-180, 90)), 'paid': rng.random() < 0.5}
+                    for n in range(bills)
+                ])
+                _insert(db, Task.__table__, [
+                    {'user_id': user_id, 'title': f'Task {n}',
+                     'due_date': today + timedelta(days=rng.randint(-30, 60)), 'completed': rng.random() < 0.3}
+                    for n in range(tasks)
+                ])
+        db.session.commit()
+        rebuild_rollups()
+
+    return {
+        'first_user_id': first_id, 'users': users,
+        'expenses': users * expenses, 'bills': users * bills, 'tasks': users * tasks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', required=True, help='SQLite database file to create or extend.')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--expenses', type=int, default=100, help='Expenses per user.')
+    parser.add_argument('--bills', type=int, default=20, help='Bills per user.')
+    parser.add_argument('--tasks', type=int, default=20, help='Tasks per user.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(args.db)}',
+        'EMAIL_WORKER_ENABLED': False,
+    })
+    start = time.perf_counter()
+    counts = seed(app, args.users, args.expenses, args.bills, args.tasks, args.seed)
+    print(f'Seeded {counts} in {time.perf_counter() - start:.1f}s')
+    print(f"Sign in as {user_email(counts['first_user_id'])} / {PASSWORD}")
+
+
+if __name__ == '__main__':
+    main()
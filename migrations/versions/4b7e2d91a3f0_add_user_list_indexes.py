@@ -0,0 +1,38 @@
+"""Add composite per-user list indexes
+
+Revision ID: 4b7e2d91a3f0
+Revises: c36126134f98
+Create Date: 2026-10-18 12:05:11.402913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e2d91a3f0'
+down_revision = 'c36126134f98'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.create_index('ix_expense_user_id_date', ['user_id', 'date'], unique=False)
+
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.create_index('ix_bill_user_id_due_date_paid', ['user_id', 'due_date', 'paid'], unique=False)
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_index('ix_task_user_id_completed_due_date', ['user_id', 'completed', 'due_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_user_id_completed_due_date')
+
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.drop_index('ix_bill_user_id_due_date_paid')
+
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.drop_index('ix_expense_user_id_date')
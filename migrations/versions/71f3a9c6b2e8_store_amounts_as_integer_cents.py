@@ -0,0 +1,52 @@
+"""Store money amounts as integer cents
+
+Revision ID: 71f3a9c6b2e8
+Revises: e5d0b8c2a417
+Create Date: 2026-10-18 15:37:29.881640
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '71f3a9c6b2e8'
+down_revision = 'e5d0b8c2a417'
+branch_labels = None
+depends_on = None
+
+# (table, float column, integer-cents column, SQL expression for the new value)
+AMOUNT_COLUMNS = [
+    ('expense', 'amount', 'amount_cents', 'CAST(ROUND(amount * 100) AS INTEGER)'),
+    ('bill', 'amount', 'amount_cents', 'CAST(ROUND(amount * 100) AS INTEGER)'),
+    # Re-sum the converted expense rows so rollups stay exactly equal to them
+    ('expense_monthly_rollup', 'total', 'total_cents',
+     "(SELECT COALESCE(SUM(e.amount_cents), 0) FROM expense e "
+     "WHERE e.user_id = expense_monthly_rollup.user_id "
+     "AND strftime('%Y-%m', e.date) = expense_monthly_rollup.year_month "
+     "AND e.category = expense_monthly_rollup.category)"),
+]
+
+
+def upgrade():
+    for table, float_column, cents_column, cents_value in AMOUNT_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(cents_column, sa.Integer(), nullable=True))
+
+        op.execute(f"UPDATE {table} SET {cents_column} = {cents_value}")
+
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(cents_column, existing_type=sa.Integer(), nullable=False)
+            batch_op.drop_column(float_column)
+
+
+def downgrade():
+    for table, float_column, cents_column, _ in reversed(AMOUNT_COLUMNS):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column(float_column, sa.Float(), nullable=True))
+
+        op.execute(f"UPDATE {table} SET {float_column} = {cents_column} / 100.0")
+
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(float_column, existing_type=sa.Float(), nullable=False)
+            batch_op.drop_column(cents_column)
@@ -0,0 +1,74 @@
+"""Add FTS5 search tables for expenses, bills and tasks
+
+Revision ID: a7c3e9d14b58
+Revises: f1c7b9e25a03
+Create Date: 2026-10-18 20:02:11.480357
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9d14b58'
+down_revision = 'f1c7b9e25a03'
+branch_labels = None
+depends_on = None
+
+
+# (source table, FTS table, indexed text columns); see app/search.py
+SEARCH_TABLES = [
+    ('expense', 'expense_fts', ('category', 'notes')),
+    ('bill', 'bill_fts', ('name',)),
+    ('task', 'task_fts', ('title',)),
+]
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other databases use the LIKE fallback in app/search.py
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for table, fts_table, searchable in SEARCH_TABLES:
+        columns = ', '.join(('user_key',) + searchable)
+        watched = ', '.join(('user_id',) + searchable)
+        new_values = ', '.join(f"coalesce(new.{column}, '')" for column in searchable)
+        row_values = ', '.join(f"coalesce({column}, '')" for column in searchable)
+
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+            f"{columns}, tokenize='unicode61 remove_diacritics 2', prefix='2 3', detail=column)"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts_table} (rowid, {columns}) "
+            f"VALUES (new.id, 'u' || new.user_id, {new_values}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM {fts_table} WHERE rowid = old.id; END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {watched} ON {table} BEGIN "
+            f"DELETE FROM {fts_table} WHERE rowid = old.id; "
+            f"INSERT INTO {fts_table} (rowid, {columns}) "
+            f"VALUES (new.id, 'u' || new.user_id, {new_values}); END"
+        )
+
+        # Backfill from existing rows
+        op.execute(f'DELETE FROM {fts_table}')
+        op.execute(
+            f"INSERT INTO {fts_table} (rowid, {columns}) "
+            f"SELECT id, 'u' || user_id, {row_values} FROM {table}"
+        )
+        op.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('optimize')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for table, fts_table, searchable in SEARCH_TABLES:
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {fts_table}_{suffix}')
+        op.execute(f'DROP TABLE IF EXISTS {fts_table}')
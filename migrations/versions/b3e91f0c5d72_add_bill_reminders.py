@@ -0,0 +1,39 @@
+"""Add bill_reminder table and the cross-user due-date index
+
+Revision ID: b3e91f0c5d72
+Revises: 71f3a9c6b2e8
+Create Date: 2026-10-18 17:02:11.402317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e91f0c5d72'
+down_revision = '71f3a9c6b2e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('bill_reminder',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('bill_id', sa.Integer(), nullable=False),
+    sa.Column('due_date', sa.Date(), nullable=False),
+    sa.Column('outbox_email_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['bill_id'], ['bill.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['outbox_email_id'], ['outbox_email.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('bill_id', 'due_date', name='uq_bill_reminder_bill_id_due_date')
+    )
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.create_index('ix_bill_paid_due_date', ['paid', 'due_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.drop_index('ix_bill_paid_due_date')
+
+    op.drop_table('bill_reminder')
@@ -0,0 +1,31 @@
+"""Add user_data_version table for sharded databases
+
+Revision ID: c9f4a1e7b305
+Revises: a7c3e9d14b58
+Create Date: 2026-10-18 22:41:09.530112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f4a1e7b305'
+down_revision = 'a7c3e9d14b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Only filled in shard databases (app/sharding.py); an unsharded database
+    # keeps using user.data_version
+    op.create_table('user_data_version',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('data_version', sa.Integer(), nullable=False),
+    sa.Column('data_updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('user_data_version')
@@ -0,0 +1,51 @@
+"""Add bill_recurrence rules and link bills to them
+
+Revision ID: d8a42c7e1f96
+Revises: b3e91f0c5d72
+Create Date: 2026-10-18 18:14:52.630194
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a42c7e1f96'
+down_revision = 'b3e91f0c5d72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('bill_recurrence',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('amount_cents', sa.Integer(), nullable=False),
+    sa.Column('frequency', sa.String(length=10), nullable=False),
+    sa.Column('interval', sa.Integer(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('end_date', sa.Date(), nullable=True),
+    sa.Column('materialized_until', sa.Date(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('bill_recurrence', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_bill_recurrence_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('recurrence_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_bill_recurrence_id_bill_recurrence', 'bill_recurrence', ['recurrence_id'], ['id'])
+        batch_op.create_index('ix_bill_recurrence_id_due_date', ['recurrence_id', 'due_date'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('bill', schema=None) as batch_op:
+        batch_op.drop_index('ix_bill_recurrence_id_due_date')
+        batch_op.drop_constraint('fk_bill_recurrence_id_bill_recurrence', type_='foreignkey')
+        batch_op.drop_column('recurrence_id')
+
+    with op.batch_alter_table('bill_recurrence', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_bill_recurrence_user_id'))
+
+    op.drop_table('bill_recurrence')
@@ -0,0 +1,39 @@
+"""Add expense_monthly_rollup table
+
+Revision ID: e5d0b8c2a417
+Revises: 9a1c5e3f7d24
+Create Date: 2026-10-18 14:52:03.640271
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5d0b8c2a417'
+down_revision = '9a1c5e3f7d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('expense_monthly_rollup',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('year_month', sa.String(length=7), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'year_month', 'category')
+    )
+
+    # Backfill from existing expenses
+    op.execute(
+        "INSERT INTO expense_monthly_rollup (user_id, year_month, category, total, count) "
+        "SELECT user_id, strftime('%Y-%m', date), category, SUM(amount), COUNT(id) "
+        "FROM expense GROUP BY user_id, strftime('%Y-%m', date), category"
+    )
+
+
+def downgrade():
+    op.drop_table('expense_monthly_rollup')
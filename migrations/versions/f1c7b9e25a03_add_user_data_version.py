@@ -0,0 +1,28 @@
+"""Add per-user data version for conditional GETs
+
+Revision ID: f1c7b9e25a03
+Revises: d8a42c7e1f96
+Create Date: 2026-10-18 19:05:37.218846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c7b9e25a03'
+down_revision = 'd8a42c7e1f96'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN (no table rebuild); a constant server default fills existing rows
+    op.add_column('user', sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('user', sa.Column('data_updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('data_updated_at')
+        batch_op.drop_column('data_version')
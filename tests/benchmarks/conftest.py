@@ -0,0 +1,27 @@
+"""
+Micro-benchmarks of the request hot paths, run by pytest.
+
+They are slow and only report timings, so they are skipped unless selected
+with the ``benchmark`` marker:
+
+    python -m pytest -m benchmark tests/benchmarks
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'benchmarks'))
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: hot-path micro-benchmark (run with -m benchmark)')
+
+
+def pytest_collection_modifyitems(config, items):
+    if 'benchmark' in (config.getoption('markexpr') or ''):
+        return
+    skip = pytest.mark.skip(reason='benchmark; run with -m benchmark')
+    for item in items:
+        if item.get_closest_marker('benchmark'):
+            item.add_marker(skip)
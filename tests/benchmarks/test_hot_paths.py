@@ -0,0 +1,49 @@
+"""
+The cases of benchmarks/bench_hot_paths.py as pytest tests.
+
+Each test times one hot path on a small seeded database and checks its
+responses; the statistics are printed and written to benchmarks/results/
+like the standalone script's, for ``harness.py compare``.
+"""
+import pytest
+
+import bench_hot_paths
+from harness import print_table, write_results
+from seed_data import seed
+
+pytestmark = pytest.mark.benchmark
+
+SETTINGS = {
+    'users': 5, 'expenses_per_user': 1000, 'rounds': 50, 'signin_rounds': 5, 'bcrypt_rounds': 12,
+}
+
+
+@pytest.fixture(scope='module')
+def hot_paths(tmp_path_factory):
+    from app import create_app
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path_factory.mktemp('hot_paths') / 'bench.db'}",
+        'WTF_CSRF_ENABLED': False,
+        'EMAIL_WORKER_ENABLED': False,
+        'MAIL_USERNAME': None,
+        'BCRYPT_ROUNDS': SETTINGS['bcrypt_rounds'],
+    })
+    counts = seed(app, users=SETTINGS['users'], expenses=SETTINGS['expenses_per_user'], bills=20, tasks=20)
+    return bench_hot_paths.hot_paths(app, counts['first_user_id'])
+
+
+@pytest.fixture(scope='module')
+def results():
+    results = {}
+    yield results
+    if results:
+        print_table(results)
+        print(f"Results written to {write_results('hot_paths', results, SETTINGS)}")
+
+
+@pytest.mark.parametrize('name', bench_hot_paths.CASES)
+def test_hot_path(hot_paths, results, name):
+    rounds = SETTINGS['signin_rounds'] if name == 'signin' else SETTINGS['rounds']
+    results[name] = hot_paths[name](rounds)
+    assert results[name]['rounds'] == rounds
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Let the tests import the app package without installing it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -0,0 +1,114 @@
+"""JSON API authentication and CSRF checks (app/api.py, app/auth.py)."""
+import io
+
+import pytest
+from flask_wtf.csrf import generate_csrf
+
+from app import create_app
+from app.auth import invalidate_email_verified
+from app.models import db, User
+
+
+def make_app(**config):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'WTF_CSRF_ENABLED': False,
+        'EMAIL_WORKER_ENABLED': False,
+        'MAIL_USERNAME': None,
+        **config,
+    })
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def app():
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def sign_in(app, client, verified=True):
+    with app.app_context():
+        user = User(first_name='Test', last_name='User', email='test@example.com', email_verified=verified)
+        user.password_hash = 'unused'
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    invalidate_email_verified(user_id)
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    return user_id
+
+
+@pytest.mark.parametrize('method, url', [
+    ('get', '/api/expenses/summary'),
+    ('get', '/api/expenses/forecast'),
+    ('get', '/api/search?q=rent'),
+    ('post', '/api/expenses/import'),
+    ('get', '/api/v1/expenses'),
+    ('post', '/api/v1/bills'),
+    ('get', '/api/v1/tasks/1'),
+    ('post', '/api/v1/expenses/batch'),
+])
+def test_signed_out_requests_get_json_401(client, method, url):
+    response = getattr(client, method)(url)
+    assert response.status_code == 401
+    assert response.get_json() == {'error': 'Authentication required'}
+
+
+def test_unverified_user_gets_json_403(app, client):
+    sign_in(app, client, verified=False)
+    response = client.get('/api/v1/expenses')
+    assert response.status_code == 403
+    assert response.get_json() == {'error': 'Email address not verified'}
+
+
+def test_deleted_user_gets_json_401(client):
+    with client.session_transaction() as session:
+        session['user_id'] = 12345
+    assert client.get('/api/v1/expenses').status_code == 401
+
+
+def test_verified_user_gets_through(app, client):
+    sign_in(app, client)
+    assert client.get('/api/v1/expenses').status_code == 200
+
+
+def upload():
+    return {'file': (io.BytesIO(b'date,amount,description\n2026-01-05,12.50,Lunch\n'), 'bank.csv')}
+
+
+@pytest.fixture
+def csrf_app():
+    return make_app(WTF_CSRF_ENABLED=True)
+
+
+def test_import_rejects_a_plain_form_post(csrf_app):
+    client = csrf_app.test_client()
+    sign_in(csrf_app, client)
+    response = client.post('/api/expenses/import', data=upload())
+    assert response.status_code == 403
+    assert 'CSRF' in response.get_json()['error']
+
+
+def test_import_accepts_x_requested_with(csrf_app):
+    client = csrf_app.test_client()
+    sign_in(csrf_app, client)
+    response = client.post('/api/expenses/import', data=upload(), headers={'X-Requested-With': 'XMLHttpRequest'})
+    assert response.status_code == 200
+    assert response.get_json()['imported'] == 1
+
+
+def test_import_accepts_the_csrf_token(csrf_app):
+    client = csrf_app.test_client()
+    sign_in(csrf_app, client)
+    with client:
+        client.get('/signin')
+        token = generate_csrf()
+    response = client.post('/api/expenses/import', data={**upload(), 'csrf_token': token})
+    assert response.status_code == 200
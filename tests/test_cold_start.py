@@ -0,0 +1,35 @@
+"""
+Cold-start budget: ``import app`` + ``create_app()`` in a fresh interpreter
+must stay under COLD_START_BUDGET seconds (default 1.5) and must not import
+the modules that load lazily. benchmarks/bench_cold_start.py reports the
+same numbers in detail.
+"""
+import os
+import statistics
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+
+import bench_cold_start  # noqa: E402
+
+ROUNDS = 3
+
+
+@pytest.fixture(scope='module')
+def cold_starts(tmp_path_factory):
+    database = str(tmp_path_factory.mktemp('cold_start') / 'cold_start.db')
+    return [bench_cold_start.run_once(database)[0] for _ in range(ROUNDS)]
+
+
+def test_cold_start_is_within_budget(cold_starts):
+    median = statistics.median(timings['import_app'] + timings['create_app'] for timings in cold_starts)
+    assert median <= bench_cold_start.DEFAULT_BUDGET, (
+        f'median cold start {median:.3f}s is over the {bench_cold_start.DEFAULT_BUDGET:.3f}s budget'
+    )
+
+
+def test_create_app_does_not_import_lazy_modules(cold_starts):
+    loaded = set().union(*(timings['modules'] for timings in cold_starts))
+    assert [module for module in bench_cold_start.LAZY_MODULES if module in loaded] == []
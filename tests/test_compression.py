@@ -0,0 +1,48 @@
+"""Response compression and its BREACH exclusions (app/compression.py)."""
+import pytest
+
+from app import create_app
+from app.models import db, User
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+@pytest.fixture
+def client():
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'EMAIL_WORKER_ENABLED': False,
+        'MAIL_USERNAME': None,
+        'COMPRESSION_MIN_SIZE': 0,
+    })
+    with app.app_context():
+        db.create_all()
+        user = User(first_name='Zip', last_name='Tester', email='zip@example.com',
+                    password_hash='unused', email_verified=True)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    return client
+
+
+def encoding(response):
+    assert response.status_code == 200
+    return response.headers.get('Content-Encoding')
+
+
+def test_csrf_page_without_input_is_compressed(client):
+    assert encoding(client.get('/expenses', headers=GZIP)) == 'gzip'
+
+
+def test_csrf_page_echoing_the_query_string_is_not_compressed(client):
+    assert encoding(client.get('/expenses?per_page=10', headers=GZIP)) is None
+
+
+@pytest.mark.parametrize('url', ['/search?q=secret', '/api/search?q=secret'])
+def test_search_is_never_compressed(client, url):
+    response = client.get(url, headers=GZIP)
+    assert encoding(response) is None
+    assert response.cache_control.no_transform
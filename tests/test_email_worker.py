@@ -0,0 +1,169 @@
+"""Outbox delivery (app/email_worker.py) against a local aiosmtpd stand-in."""
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip('aiosmtpd')
+from aiosmtpd.controller import Controller
+
+from app import create_app
+from app.email_worker import claim_batch, drain_outbox
+from app.models import db, OutboxEmail
+
+MAX_ATTEMPTS = 3
+
+
+class RecordingHandler:
+    """Accepts every message, except to recipients listed in ``reject``"""
+
+    def __init__(self):
+        self.received = []
+        self.reject = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.reject:
+            return '550 Mailbox unavailable'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append((envelope.rcpt_tos, envelope.content.decode('utf-8', 'replace')))
+        return '250 OK'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+
+@pytest.fixture
+def app(smtp):
+    _, port = smtp
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'EMAIL_WORKER_ENABLED': False,
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': port,
+        'MAIL_USE_TLS': False,
+        'MAIL_USE_SSL': False,
+        'MAIL_USERNAME': None,
+        'EMAIL_MAX_ATTEMPTS': MAX_ATTEMPTS,
+        'EMAIL_RETRY_BACKOFF': 30,
+        'EMAIL_RETRY_BACKOFF_MAX': 3600,
+    })
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def queue(app, *recipients):
+    with app.app_context():
+        emails = [
+            OutboxEmail(subject=f'Hello {recipient}', sender='noreply@budgetbeyond.com',
+                        recipients=recipient, body='Hi there')
+            for recipient in recipients
+        ]
+        db.session.add_all(emails)
+        db.session.commit()
+        return [email.id for email in emails]
+
+
+def outbox(app, email_id):
+    with app.app_context():
+        return db.session.get(OutboxEmail, email_id)
+
+
+def make_due(app, email_id):
+    """Skip the retry backoff"""
+    with app.app_context():
+        db.session.get(OutboxEmail, email_id).next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+
+def test_due_mail_is_delivered(app, smtp):
+    handler, _ = smtp
+    ids = queue(app, 'a@example.com', 'b@example.com')
+
+    assert drain_outbox(app) == 2
+    assert sorted(rcpt for rcpts, _ in handler.received for rcpt in rcpts) == ['a@example.com', 'b@example.com']
+    for email_id in ids:
+        email = outbox(app, email_id)
+        assert (email.status, email.attempts, email.last_error) == ('sent', 1, None)
+        assert email.sent_at is not None
+
+    # Nothing is due any more
+    assert drain_outbox(app) == 0
+    assert len(handler.received) == 2
+
+
+def test_rejected_mail_is_retried_with_backoff(app, smtp):
+    handler, _ = smtp
+    handler.reject.add('bounce@example.com')
+    bounced, delivered = queue(app, 'bounce@example.com', 'ok@example.com')
+
+    started = datetime.utcnow()
+    assert drain_outbox(app) == 1
+    email = outbox(app, bounced)
+    assert (email.status, email.attempts) == ('pending', 1)
+    assert '550' in email.last_error
+    # First retry waits EMAIL_RETRY_BACKOFF seconds, plus up to 10% jitter
+    assert started + timedelta(seconds=29) <= email.next_attempt_at <= datetime.utcnow() + timedelta(seconds=34)
+    assert outbox(app, delivered).status == 'sent'
+
+    # Not due yet, so the next drain leaves it alone
+    assert drain_outbox(app) == 0
+    assert outbox(app, bounced).attempts == 1
+
+    # Once the server accepts it, the retry goes out
+    handler.reject.clear()
+    make_due(app, bounced)
+    assert drain_outbox(app) == 1
+    email = outbox(app, bounced)
+    assert (email.status, email.attempts, email.last_error) == ('sent', 2, None)
+
+
+def test_mail_fails_after_max_attempts(app, smtp):
+    handler, _ = smtp
+    handler.reject.add('bounce@example.com')
+    (email_id,) = queue(app, 'bounce@example.com')
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        make_due(app, email_id)
+        assert drain_outbox(app) == 0
+        assert outbox(app, email_id).attempts == attempt
+    email = outbox(app, email_id)
+    assert email.status == 'failed'
+    assert '550' in email.last_error
+
+    # A failed row is never claimed again
+    make_due(app, email_id)
+    assert drain_outbox(app) == 0
+    assert outbox(app, email_id).attempts == MAX_ATTEMPTS
+
+
+def test_expired_lease_on_the_last_attempt_fails_the_row(app):
+    (retried, exhausted) = queue(app, 'a@example.com', 'b@example.com')
+    with app.app_context():
+        # Both were mid-send when their worker died; one has attempts left
+        expired = datetime.utcnow() - timedelta(seconds=1)
+        for email_id, attempts in ((retried, 1), (exhausted, MAX_ATTEMPTS)):
+            email = db.session.get(OutboxEmail, email_id)
+            email.status, email.attempts, email.next_attempt_at = 'sending', attempts, expired
+        db.session.commit()
+
+        claimed = claim_batch(10, lease_seconds=300, max_attempts=MAX_ATTEMPTS)
+        assert [email.id for email in claimed] == [retried]
+        assert claimed[0].attempts == 2
+        email = db.session.get(OutboxEmail, exhausted)
+        assert (email.status, email.last_error) == ('failed', 'Send lease expired on the last attempt')
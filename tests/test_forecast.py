@@ -0,0 +1,63 @@
+"""Spending forecast scoring (app/forecast.py)."""
+import random
+from datetime import date, timedelta
+
+from app.forecast import day_number, score_numpy, score_python
+
+TODAY = date(2026, 3, 20)
+OPTIONS = {'window': 30, 'z_threshold': 3.0, 'min_samples': 5}
+
+
+def columns_for(rows):
+    """rows of (user_id, id, date, category, amount_cents) -> columns"""
+    return {
+        'user_id': [row[0] for row in rows],
+        'id': [row[1] for row in rows],
+        'day': [day_number(row[2]) for row in rows],
+        'category': [row[3] for row in rows],
+        'amount_cents': [row[4] for row in rows],
+    }
+
+
+def test_numpy_matches_the_python_loop():
+    rng = random.Random(7)
+    rows = [
+        (rng.randint(1, 40), n, TODAY - timedelta(days=rng.randint(0, 364)),
+         rng.choice(['Food', 'Transport', 'Bills', 'Other']), int(rng.lognormvariate(7, 1)))
+        for n in range(5000)
+    ]
+    columns = columns_for(rows)
+    for trend in (True, False):
+        expected = score_python(columns, TODAY, trend=trend, **OPTIONS)
+        assert score_numpy(columns, TODAY, trend=trend, **OPTIONS) == expected
+    assert any(result['anomalies'] for result in expected)
+
+
+def test_projection_moving_average_and_anomaly():
+    rows = [(1, n, TODAY - timedelta(days=n), 'Food', 1000) for n in range(60)]
+    rows.append((1, 100, TODAY - timedelta(days=1), 'Food', 1010))
+    rows.append((1, 101, TODAY, 'Food', 50000))
+    for scorer in (score_numpy, score_python):
+        [result] = scorer(columns_for(rows), TODAY, **OPTIONS)
+        [food] = result['categories']
+        window_total = 30 * 1000 + 1010 + 50000
+        assert food['moving_average_cents'] == round(window_total / 30, 2)
+        assert food['month_to_date_cents'] == 20 * 1000 + 1010 + 50000
+        assert result['days_left'] == 11
+        assert result['projected_cents'] == food['month_to_date_cents'] + round(window_total * 11 / 30)
+        assert len(food['trend_cents']) == 30
+        assert food['trend_cents'][-1] == food['moving_average_cents']
+        assert [anomaly['id'] for anomaly in result['anomalies']] == [101]
+
+
+def test_small_or_flat_categories_are_never_flagged():
+    rows = [(1, n, TODAY - timedelta(days=n), 'Bills', 5000) for n in range(10)]
+    rows += [(1, 10 + n, TODAY - timedelta(days=n), 'Food', 100) for n in range(3)]
+    rows.append((1, 20, TODAY, 'Food', 90000))
+    for scorer in (score_numpy, score_python):
+        assert scorer(columns_for(rows), TODAY, **OPTIONS)[0]['anomalies'] == []
+
+
+def test_no_rows():
+    empty = columns_for([])
+    assert score_numpy(empty, TODAY, **OPTIONS) == score_python(empty, TODAY, **OPTIONS) == []
@@ -0,0 +1,125 @@
+"""Keyset pagination (app/pagination.py)."""
+import random
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.models import db, User, Expense, Bill, Task
+from app.pagination import paginate_keyset
+
+PER_PAGE = 20
+
+
+@pytest.fixture(scope='module')
+def app():
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'EMAIL_WORKER_ENABLED': False,
+        'MAIL_USERNAME': None,
+    })
+    with app.app_context():
+        db.create_all()
+        user = User(first_name='Page', last_name='Tester', email='pages@example.com',
+                    password_hash='unused', email_verified=True)
+        db.session.add(user)
+        db.session.commit()
+
+        # Few distinct dates, so many rows tie on the leading sort key
+        rng = random.Random(3)
+        start = date(2026, 1, 1)
+        for _ in range(400):
+            day = start + timedelta(days=rng.randint(0, 40))
+            db.session.add(Expense(user_id=user.id, category='Food', amount_cents=100, date=day))
+            db.session.add(Bill(user_id=user.id, name='Rent', amount_cents=100, due_date=day))
+            db.session.add(Task(user_id=user.id, title='Chore', completed=rng.random() < 0.5,
+                                due_date=None if rng.random() < 0.2 else day))
+        db.session.commit()
+        app.user_id = user.id
+    with app.app_context():
+        yield app
+
+
+def sorted_ids(model, user_id):
+    """Expected order, sorted in Python with SQLite's NULL placement"""
+    rows = model.for_user(user_id).all()
+    for column, descending in reversed(model.sort_keys()):
+        # NULLs sort first ascending and last descending
+        rows.sort(key=lambda row: (getattr(row, column.key) is not None, getattr(row, column.key) or 0),
+                  reverse=descending)
+    return [row.id for row in rows]
+
+
+def walk(model, user_id, **cursor):
+    page = paginate_keyset(model.for_user(user_id), model.sort_keys(), per_page=PER_PAGE, **cursor)
+    return page, [row.id for row in page]
+
+
+@pytest.mark.parametrize('model', [Expense, Bill, Task])
+def test_pages_cover_every_row_in_order(app, model):
+    expected = sorted_ids(model, app.user_id)
+    pages = []
+    page, ids = walk(model, app.user_id)
+    pages.append(ids)
+    while page.has_next:
+        page, ids = walk(model, app.user_id, after=page.next_cursor)
+        pages.append(ids)
+    assert [row_id for ids in pages for row_id in ids] == expected
+
+    # And back again with the before cursors
+    while page.has_prev:
+        page, ids = walk(model, app.user_id, before=page.prev_cursor)
+        pages.pop()
+        assert ids == pages[-1]
+    assert len(pages) == 1
+
+
+def query_plans(app, run):
+    """EXPLAIN QUERY PLAN of every statement ``run`` executes"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        run()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    connection = db.session.connection()
+    return [
+        [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+        for statement, parameters in statements
+    ]
+
+
+# Each list's index, and the range a page after / before a cursor must seek on
+LIST_INDEXES = [
+    (Expense, 'ix_expense_user_id_date', '(user_id=? AND date<?)', '(user_id=? AND date>?)'),
+    (Bill, 'ix_bill_user_id_due_date_paid', '(user_id=? AND due_date>?)', '(user_id=? AND due_date<?)'),
+    (Task, 'ix_task_user_id_completed_due_date',
+     '(user_id=? AND completed=? AND due_date>?)', '(user_id=? AND completed=? AND due_date<?)'),
+]
+
+
+@pytest.mark.parametrize('model, index_name, after_seek, before_seek', LIST_INDEXES)
+def test_first_page_reads_the_index(app, model, index_name, after_seek, before_seek):
+    (plan,) = query_plans(app, lambda: walk(model, app.user_id))
+    assert f'SEARCH {model.__tablename__} USING INDEX {index_name} (user_id=?)' in plan
+
+
+@pytest.mark.parametrize('model, index_name, after_seek, before_seek', LIST_INDEXES)
+def test_deep_pages_seek_on_the_index(app, model, index_name, after_seek, before_seek):
+    page, _ = walk(model, app.user_id)
+    for _ in range(3):
+        page, _ = walk(model, app.user_id, after=page.next_cursor)
+
+    for cursor, seek in ({'after': page.next_cursor}, after_seek), ({'before': page.prev_cursor}, before_seek):
+        plans = query_plans(app, lambda: walk(model, app.user_id, **cursor))
+        details = [detail for plan in plans for detail in plan]
+        assert f'SEARCH {model.__tablename__} USING INDEX {index_name} {seek}' in details
+        # No statement may fall back to reading the user's rows from the start
+        for plan in plans:
+            assert not any(detail.endswith('(user_id=?)') for detail in plan), plan
+
@@ -0,0 +1,47 @@
+"""Bounded password hashing pool (app/passwords.py)."""
+import threading
+import time
+
+import pytest
+
+from app.passwords import PasswordHasher, PasswordHasherBusy
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_callers_blocked_on_a_slot_count_as_queued():
+    hasher = PasswordHasher(rounds=4, max_workers=1, max_queue=1, policy='wait', timeout=5.0)
+    release = threading.Event()
+    threads = [threading.Thread(target=hasher._run, args=(release.wait,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        # One running, one admitted behind it, two blocked on admission
+        wait_for(lambda: hasher.stats()['active'] == 1 and hasher.stats()['queued'] == 3)
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+    stats = hasher.stats()
+    assert (stats['active'], stats['queued'], stats['completed']) == (0, 0, 4)
+
+
+def test_reject_policy_refuses_when_full():
+    hasher = PasswordHasher(rounds=4, max_workers=1, max_queue=0, policy='reject')
+    release = threading.Event()
+    thread = threading.Thread(target=hasher._run, args=(release.wait,))
+    thread.start()
+    try:
+        wait_for(lambda: hasher.stats()['active'] == 1)
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash('secret')
+        assert hasher.stats()['queued'] == 0
+    finally:
+        release.set()
+        thread.join()
+    assert hasher.stats()['rejected'] == 1
@@ -0,0 +1,82 @@
+"""Date arithmetic of recurring bills (app/recurrence.py)."""
+from datetime import date
+
+import pytest
+
+from app.recurrence import add_months, occurrences
+
+
+def test_add_months_clamps_the_31st_to_february():
+    assert add_months(date(2025, 1, 31), 1) == date(2025, 2, 28)
+    assert add_months(date(2024, 1, 31), 1) == date(2024, 2, 29)
+
+
+def test_add_months_clamps_to_30_day_months_and_crosses_years():
+    assert add_months(date(2025, 3, 31), 1) == date(2025, 4, 30)
+    assert add_months(date(2025, 11, 30), 3) == date(2026, 2, 28)
+    assert add_months(date(2025, 1, 15), -1) == date(2024, 12, 15)
+
+
+def test_monthly_on_the_31st_returns_to_the_31st_after_february():
+    dates = occurrences('monthly', 1, date(2024, 1, 31), date(2024, 1, 1), date(2024, 5, 31))
+    assert dates == [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30), date(2024, 5, 31)]
+
+    dates = occurrences('monthly', 1, date(2025, 1, 31), date(2025, 2, 1), date(2025, 3, 31))
+    assert dates == [date(2025, 2, 28), date(2025, 3, 31)]
+
+
+def test_every_two_months_from_the_31st():
+    dates = occurrences('monthly', 2, date(2025, 8, 31), date(2025, 8, 1), date(2026, 2, 28))
+    assert dates == [date(2025, 8, 31), date(2025, 10, 31), date(2025, 12, 31), date(2026, 2, 28)]
+
+
+def test_yearly_on_february_29():
+    dates = occurrences('yearly', 1, date(2024, 2, 29), date(2024, 1, 1), date(2028, 12, 31))
+    assert dates == [date(2024, 2, 29), date(2025, 2, 28), date(2026, 2, 28), date(2027, 2, 28), date(2028, 2, 29)]
+
+
+def test_every_n_days():
+    dates = occurrences('days', 10, date(2025, 1, 1), date(2025, 1, 1), date(2025, 2, 5))
+    assert dates == [date(2025, 1, 1), date(2025, 1, 11), date(2025, 1, 21), date(2025, 1, 31)]
+
+
+def test_weekly_and_every_other_week():
+    assert occurrences('weekly', 1, date(2025, 1, 6), date(2025, 1, 1), date(2025, 1, 31)) == [
+        date(2025, 1, 6), date(2025, 1, 13), date(2025, 1, 20), date(2025, 1, 27)
+    ]
+    assert occurrences('weekly', 2, date(2025, 1, 6), date(2025, 1, 1), date(2025, 1, 31)) == [
+        date(2025, 1, 6), date(2025, 1, 20)
+    ]
+
+
+def test_window_starting_mid_rule_jumps_to_the_next_occurrence():
+    assert occurrences('days', 10, date(2025, 1, 1), date(2025, 1, 12), date(2025, 1, 31)) == [
+        date(2025, 1, 21), date(2025, 1, 31)
+    ]
+    assert occurrences('monthly', 1, date(2020, 1, 31), date(2025, 2, 1), date(2025, 2, 28)) == [date(2025, 2, 28)]
+
+
+def test_window_bounds_are_inclusive():
+    assert occurrences('weekly', 1, date(2025, 1, 6), date(2025, 1, 13), date(2025, 1, 20)) == [
+        date(2025, 1, 13), date(2025, 1, 20)
+    ]
+
+
+def test_end_date_stops_the_rule():
+    assert occurrences('monthly', 1, date(2025, 1, 31), date(2025, 1, 1), date(2025, 12, 31),
+                       end_date=date(2025, 3, 31)) == [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31)]
+    assert occurrences('weekly', 1, date(2025, 1, 6), date(2025, 1, 1), date(2025, 1, 31),
+                       end_date=date(2025, 1, 19)) == [date(2025, 1, 6), date(2025, 1, 13)]
+
+
+def test_nothing_before_the_start_or_after_the_end():
+    assert occurrences('monthly', 1, date(2025, 6, 1), date(2025, 1, 1), date(2025, 5, 31)) == []
+    assert occurrences('days', 1, date(2025, 1, 1), date(2025, 3, 1), date(2025, 3, 31),
+                       end_date=date(2025, 2, 1)) == []
+
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError):
+        occurrences('fortnightly', 1, date(2025, 1, 1), date(2025, 1, 1), date(2025, 2, 1))
+    with pytest.raises(ValueError):
+        occurrences('monthly', 0, date(2025, 1, 1), date(2025, 1, 1), date(2025, 2, 1))
@@ -0,0 +1,54 @@
+"""Bill reminder digests (app/reminders.py)."""
+from datetime import date, timedelta
+
+from app import create_app
+from app.models import db, User, Bill, BillReminder, OutboxEmail
+from app.reminders import send_bill_reminders
+
+TODAY = date(2026, 3, 2)
+
+
+def make_app(**config):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'EMAIL_WORKER_ENABLED': False,
+        'MAIL_USERNAME': None,
+        **config,
+    })
+    with app.app_context():
+        db.create_all()
+        user = User(first_name='Bill', last_name='Payer', email='payer@example.com',
+                    password_hash='unused', email_verified=True)
+        db.session.add(user)
+        db.session.commit()
+        db.session.add_all([
+            Bill(user_id=user.id, name='Rent', amount_cents=120000, due_date=TODAY + timedelta(days=1)),
+            Bill(user_id=user.id, name='Phone', amount_cents=4500, due_date=TODAY + timedelta(days=2)),
+        ])
+        db.session.commit()
+    return app
+
+
+def counts():
+    return BillReminder.query.count(), OutboxEmail.query.count()
+
+
+def test_console_mode_records_nothing(capsys):
+    app = make_app()
+    with app.app_context():
+        assert send_bill_reminders(today=TODAY, days=3) == (1, 2)
+        assert counts() == (0, 0)
+        # Printed again on the next run, since nothing was recorded
+        assert send_bill_reminders(today=TODAY, days=3) == (1, 2)
+    assert capsys.readouterr().out.count('BILL REMINDER (would be sent to payer@example.com)') == 2
+
+
+def test_configured_smtp_queues_the_digest_once():
+    app = make_app(MAIL_USERNAME='mailer@example.com')
+    with app.app_context():
+        assert send_bill_reminders(today=TODAY, days=3) == (1, 2)
+        assert counts() == (2, 1)
+        assert OutboxEmail.query.one().recipients == 'payer@example.com'
+        # Already reminded: a second run sends nothing
+        assert send_bill_reminders(today=TODAY, days=3) == (0, 0)
+        assert counts() == (2, 1)
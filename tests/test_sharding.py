@@ -0,0 +1,55 @@
+"""Per-user sharding (app/sharding.py) on a fresh install."""
+import sqlite3
+from datetime import date
+
+import pytest
+
+from app import create_app
+from app.models import db, User
+
+PASSWORD = 'correct horse battery'
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'central.db'}",
+        'SHARDING_ENABLED': True,
+        'SHARD_COUNT': 2,
+        'SHARD_DATABASE_URL': f"sqlite:///{tmp_path / 'shard{shard}.db'}",
+        'WTF_CSRF_ENABLED': False,
+        'EMAIL_WORKER_ENABLED': False,
+        'MAIL_USERNAME': None,
+        'BCRYPT_ROUNDS': 4,
+    })
+    # What init_db.py does: nothing else creates the shard schemas
+    with app.app_context():
+        db.create_all()
+        for n in range(2):
+            user = User(first_name='Shard', last_name=f'User{n}', email=f'user{n}@example.com', email_verified=True)
+            user.set_password(PASSWORD)
+            db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def test_sign_in_write_and_list_on_every_shard(app, tmp_path):
+    for n in range(2):
+        client = app.test_client()
+        response = client.post('/signin', data={'email': f'user{n}@example.com', 'password': PASSWORD})
+        assert response.status_code == 302
+
+        response = client.post('/expenses', data={
+            'category': 'Food', 'amount': f'1{n}.50', 'date': date.today().isoformat(), 'notes': f'user {n}',
+        })
+        assert response.status_code == 302
+
+        listed = client.get('/api/v1/expenses').get_json()
+        assert [item['notes'] for item in listed['items']] == [f'user {n}']
+
+    # Each expense landed in its owner's shard, none in the central database
+    for shard in range(2):
+        with sqlite3.connect(tmp_path / f'shard{shard}.db') as connection:
+            assert connection.execute('SELECT user_id % 2 FROM expense').fetchall() == [(shard,)]
+    with sqlite3.connect(tmp_path / 'central.db') as connection:
+        assert connection.execute('SELECT count(*) FROM expense').fetchone() == (0,)